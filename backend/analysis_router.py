@@ -1,31 +1,132 @@
 """
 Real-time frame processing endpoint.
 Receives video frames from frontend, runs MediaPipe emotion detection, returns scores.
+cv2, NumPy and MediaPipe are loaded on the first frame (or by warm_up()),
+not at import time.
+Frames are rate-limited (rate_limits.py) before the body is decoded: per
+participant and per session when ?participant_id=&session_id= name a
+participant of a live session on this worker, otherwise per client address.
+Behind a proxy every request comes from the proxy's address; with
+TRUST_FORWARDED_FOR=1 (set by the dispatcher on its workers) the last
+X-Forwarded-For entry is used instead. Only set it when the proxy in front
+overwrites or appends to that header.
 """
 
 import base64
-import cv2
-import numpy as np
-from io import BytesIO
-from fastapi import APIRouter, HTTPException
-from emotion_detector import EmotionDetector
+import math
+import os
+import threading
+from typing import Callable, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from loop_monitor import RETRY_AFTER_S, loop_monitor
+from event_recorder import recorder
+from rate_limits import FRAME, rate_limiter
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
-try:
-    detector = EmotionDetector()
-    print("✓ EmotionDetector initialized")
-except Exception as e:
-    print(f"⚠ EmotionDetector init warning: {e}")
-    detector = EmotionDetector()
+MAX_BATCH_FRAMES = int(os.getenv("FRAME_BATCH_MAX", "8"))
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR") == "1"
+
+# Set by main.py: whether (session_id, participant_id) is a participant of a live session
+_is_participant: Callable[[str, str], bool] = lambda session_id, participant_id: False
+
+
+def set_participant_check(check: Callable[[str, str], bool]):
+    global _is_participant
+    _is_participant = check
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    """Build the shared EmotionDetector on first use."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                from emotion_detector import EmotionDetector
+                _detector = EmotionDetector()
+                print("✓ EmotionDetector initialized")
+    return _detector
+
+
+async def _loaded_detector():
+    # The first build imports MediaPipe and creates FaceMesh; keep it off the loop
+    return _detector or await run_in_threadpool(get_detector)
+
+
+def _decode_frame(frame_b64: str):
+    import cv2
+    import numpy as np
+
+    nparr = np.frombuffer(base64.b64decode(frame_b64), np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def warm_up():
+    """Load cv2/MediaPipe, build the detector and run its model ahead of the first frame."""
+    get_detector().warm_up()
+    import cv2  # noqa: F401
+
+
+def _shed_if_overloaded():
+    """Reject frame work up front while the event loop is lagging."""
+    if loop_monitor.shed_frames():
+        loop_monitor.record_shed("frame_analysis")
+        raise HTTPException(
+            status_code=503,
+            detail={"message": "Server busy, retry later", "retry_after": RETRY_AFTER_S},
+            headers={"Retry-After": str(RETRY_AFTER_S)},
+        )
+
+
+def _limit_scope(request: Request, session_id: Optional[str], participant_id: Optional[str]) -> Tuple[Optional[str], str]:
+    """
+    (session, key) for the frame buckets. Ids from the query only count when
+    they name a real participant, so made-up or rotating ids all land in the
+    bucket of the client address.
+    """
+    if session_id and participant_id and _is_participant(session_id, participant_id):
+        return session_id, participant_id
+    forwarded = request.headers.get("x-forwarded-for") if TRUST_FORWARDED_FOR else None
+    if forwarded:
+        return None, "addr:" + forwarded.rsplit(",", 1)[-1].strip()
+    return None, "addr:" + (request.client.host if request.client else "unknown")
+
+
+def _too_many(session_id: Optional[str], key: str, cost: int = 1):
+    retry_after = max(1, math.ceil(rate_limiter.retry_after(FRAME, session_id, key, cost)))
+    raise HTTPException(
+        status_code=429,
+        detail={"message": "Frame rate limit exceeded", "retry_after": retry_after},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def _reject_if_limited(session_id: Optional[str], key: str, cost: int = 1):
+    """Answer 429 unless `cost` frames fit in the participant's (and session's) buckets."""
+    if not rate_limiter.allow(FRAME, session_id, key, cost):
+        _too_many(session_id, key, cost)
+
+
+async def _json_body(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=422, detail="Expected a JSON object")
+    return data
 
 
 @router.post("/analyze-frame")
-async def analyze_frame(data: dict):
+async def analyze_frame(request: Request, participant_id: Optional[str] = None, session_id: Optional[str] = None):
     """
     Analyze a single video frame for emotions.
     
-    Request:
+    Request (POST /api/analyze-frame?participant_id=uuid&session_id=uuid):
     {
         "frame": "base64-encoded-image",
         "participant_id": "uuid"
@@ -39,9 +140,19 @@ async def analyze_frame(data: dict):
         "detected_face": true
     }
     """
+    _shed_if_overloaded()  # before spending rate-limit tokens or reading the body
+    _reject_if_limited(*_limit_scope(request, session_id, participant_id))
+    data = await _json_body(request)
+    if recorder.enabled:
+        recorder.frame(data, session_id, participant_id)
+    detector = await _loaded_detector()
+    # Decoding and inference are CPU-bound; run them off the event loop
+    return await run_in_threadpool(_analyze_frame, detector, data.get("frame", ""))
+
+
+def _analyze_frame(detector, frame_data) -> dict:
     try:
         # Decode base64 frame
-        frame_data = data.get("frame", "")
         if not frame_data:
             return {"engagement": 0.5, "confusion": 0.2, "stress": 0.1, "detected_face": False}
         
@@ -51,8 +162,7 @@ async def analyze_frame(data: dict):
         
         # Decode to numpy array
         try:
-            nparr = np.frombuffer(base64.b64decode(frame_data), np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = _decode_frame(frame_data)
         except Exception as e:
             print(f"Frame decode error: {e}")
             return {"engagement": 0.5, "confusion": 0.2, "stress": 0.1, "detected_face": False}
@@ -72,19 +182,45 @@ async def analyze_frame(data: dict):
 
 
 @router.post("/analyze-batch")
-async def analyze_batch(data: dict):
+async def analyze_batch(request: Request, participant_id: Optional[str] = None, session_id: Optional[str] = None):
     """
     Analyze multiple frames in batch (for batch processing).
+    At most FRAME_BATCH_MAX frames; each one costs a token, taken before
+    any of them is decoded.
     """
+    scope, key = _limit_scope(request, session_id, participant_id)
+    if rate_limiter.exhausted(FRAME, scope, key):
+        _too_many(scope, key)  # not even one token left: don't read the body
+    _shed_if_overloaded()
+    data = await _json_body(request)
     frames = data.get("frames", [])
-    results = []
-    for frame_b64 in frames:
+    if not isinstance(frames, list) or len(frames) > MAX_BATCH_FRAMES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FRAMES} frames per batch")
+    _reject_if_limited(scope, key, max(1, len(frames)))
+    if recorder.enabled:
+        recorder.batch(data, session_id, participant_id)
+    detector = await _loaded_detector()
+    return {"results": await run_in_threadpool(_analyze_batch, detector, frames)}
+
+
+def _analyze_batch(detector, frames: list) -> list:
+    results = [None] * len(frames)
+    decoded, positions = [], []
+    for i, frame_b64 in enumerate(frames):
         try:
-            nparr = np.frombuffer(base64.b64decode(frame_b64), np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            result = detector.detect(frame)
-            results.append(result)
+            frame = _decode_frame(frame_b64)
+            if frame is None:
+                raise ValueError("could not decode frame")
+            decoded.append(frame)
+            positions.append(i)
         except Exception as e:
-            results.append({"error": str(e)})
-    
-    return {"results": results}
+            results[i] = {"error": str(e)}
+
+    # One model call for every face in the batch
+    try:
+        for i, result in zip(positions, detector.detect_batch(decoded)):
+            results[i] = result
+    except Exception as e:
+        for i in positions:
+            results[i] = {"error": str(e)}
+    return results
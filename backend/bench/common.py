@@ -0,0 +1,92 @@
+"""
+Shared helpers for the bench/ scripts: percentiles, RSS, JSON baselines.
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+def summarize(latencies: Iterable[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+
+    def pct(q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(pct(0.50), 3),
+        "p95_ms": round(pct(0.95), 3),
+        "p99_ms": round(pct(0.99), 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """Current and peak RSS in bytes (Linux /proc, falling back to getrusage)."""
+    pid = pid or os.getpid()
+    try:
+        fields = {}
+        with open(f"/proc/{pid}/status") as fp:
+            for line in fp:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    fields[key] = int(rest.split()[0]) * 1024
+        return {"rss_bytes": fields.get("VmRSS", 0), "peak_rss_bytes": fields.get("VmHWM", 0)}
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {"rss_bytes": peak, "peak_rss_bytes": peak}
+
+
+def save_results(result: dict, path: Optional[str], name: str) -> str:
+    """Write results as JSON; by default under bench/results/ (gitignored)."""
+    if not path:
+        os.makedirs(os.path.join(os.path.dirname(__file__), "results"), exist_ok=True)
+        path = os.path.join(os.path.dirname(__file__), "results", f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as fp:
+        json.dump(result, fp, indent=2, sort_keys=True)
+    return path
+
+
+def compare(result: dict, baseline_path: str, tolerance: float = 0.2) -> List[str]:
+    """
+    Compare latency percentiles and throughput against a saved baseline.
+    Returns human-readable regressions beyond the tolerance (0.2 = 20%).
+    """
+    with open(baseline_path) as fp:
+        baseline = json.load(fp)
+
+    regressions = []
+    for kind, current in result.get("latency", {}).items():
+        before = baseline.get("latency", {}).get(kind)
+        if not before:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key in current and before.get(key) and current[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{kind} {key}: {before[key]} -> {current[key]}")
+    for kind, current in result.get("throughput", {}).items():
+        before = baseline.get("throughput", {}).get(kind)
+        if before and current < before * (1 - tolerance):
+            regressions.append(f"{kind} throughput: {before} -> {current}")
+    return regressions
+
+
+def print_report(result: dict):
+    for kind, rate in sorted(result.get("throughput", {}).items()):
+        print(f"{kind:>24}: {rate:10.1f} /s")
+    for kind, stats in sorted(result.get("latency", {}).items()):
+        if stats.get("count"):
+            print(
+                f"{kind:>24}: n={stats['count']:<7} p50={stats['p50_ms']:.2f}ms "
+                f"p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms max={stats['max_ms']:.2f}ms"
+            )
+    for key, value in sorted(result.get("memory", {}).items()):
+        print(f"{key:>24}: {value / 1e6:.1f} MB")
+    if result.get("errors"):
+        print(f"{'errors':>24}: {result['errors']}")
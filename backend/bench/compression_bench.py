@@ -0,0 +1,147 @@
+"""
+Compression ratio and CPU cost per message for /ws traffic.
+
+Captures realistic outbound messages by driving main._broadcast (signals,
+chat, joins, with full and summary-only subscribers), then replays the
+stream through each codec as one connection would see it, so deflate's
+context takeover is accounted for.
+
+Usage (from backend/):
+    python -m bench.compression_bench --participants 20 --messages 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Union
+
+from bench import fakes
+from bench.common import save_results
+from websockets.frames import TEXT, Frame
+from ws_compression import ZSTD_AVAILABLE, ThresholdPerMessageDeflate, schema_samples, train_dictionary
+
+
+class CapturingSocket:
+    def __init__(self):
+        self.texts: List[str] = []
+
+    async def send_text(self, text: str):
+        self.texts.append(text)
+
+
+async def capture(main, participants: int, messages: int) -> Dict[str, List[str]]:
+    """Outbound streams for a full subscriber and a summary-only one."""
+    from subscriptions import Subscription
+
+    session_id = "bench-compression"
+    session = main.SessionState(session_id=session_id, name="bench", created_at=time.time(), host_id="p0")
+    main.sessions[session_id] = session
+    full, summary = CapturingSocket(), CapturingSocket()
+    main.session_connections[session_id] = [full, summary]
+    main.socket_subscriptions[summary] = Subscription(summary_only=True)
+    words = "the we should plan next sprint budget review launch looks good any questions agreed thanks".split()
+    rng = random.Random(1)
+    for i in range(participants):
+        pid = f"{rng.getrandbits(128):032x}"
+        session.participants[pid] = main.ParticipantState(participant_id=pid, display_name=f"User {i}")
+        await main._broadcast(session_id, {"type": "participant_joined",
+                                           "payload": {"participant_id": pid, "display_name": f"User {i}"}})
+    pids = list(session.participants)
+    while len(full.texts) < messages:
+        pid = rng.choice(pids)
+        if rng.random() < 0.95:
+            signal = main.SignalPayload(engagement=rng.random(), confusion=rng.random(), stress=rng.random(),
+                                        energy=rng.random())
+            session.participants[pid].latest_signal = signal
+            await main._broadcast(session_id, {"type": "session_update", "payload": {
+                "participant_id": pid, "display_name": session.participants[pid].display_name,
+                "signal": signal.model_dump(), "summary": main._compute_session_summary(session),
+            }})
+        else:
+            await main._broadcast(session_id, {"type": "chat", "payload": {
+                "participant_id": pid, "message": " ".join(rng.choices(words, k=rng.randint(2, 15))),
+                "timestamp": time.time(), "sentiment": round(rng.random(), 3), "emotion": "neutral",
+                "confidence": 0.7,
+            }})
+    main.socket_subscriptions.pop(summary, None)
+    main._forget_session(session_id)
+    return {"full": full.texts, "summary_only": summary.texts}
+
+
+def deflate(level: int, window_bits: int = 15, mem_level: int = 8, context_takeover: bool = True,
+            min_bytes: int = 0) -> Callable[[], Callable[[bytes], bytes]]:
+    def make():
+        ext = ThresholdPerMessageDeflate(False, not context_takeover, 15, window_bits,
+                                         {"level": level, "memLevel": mem_level}, min_bytes=min_bytes)
+        return lambda data: bytes(ext.encode(Frame(TEXT, data)).data)
+    return make
+
+
+def zstd(level: int, dictionary: Union[bytes, None] = None) -> Callable[[], Callable[[bytes], bytes]]:
+    import zstandard
+
+    def make():
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        compressor = zstandard.ZstdCompressor(level=level, dict_data=zdict, write_checksum=False)
+        return compressor.compress
+    return make
+
+
+def measure(make: Callable[[], Callable[[bytes], bytes]], stream: List[bytes]) -> dict:
+    encode = make()
+    out = 0
+    started = time.process_time()
+    for data in stream:
+        out += len(encode(data))
+    cpu = time.process_time() - started
+    raw = sum(len(d) for d in stream)
+    return {
+        "ratio": round(out / raw, 4),
+        "bytes_per_message": round(out / len(stream), 1),
+        "cpu_us_per_message": round(cpu / len(stream) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    app = fakes.install()
+    streams = asyncio.run(capture(app, args.participants, args.messages))
+
+    codecs = {
+        "none": lambda: (lambda data: data),
+        "deflate-1": deflate(1),
+        "deflate-6": deflate(6),
+        "deflate-9": deflate(9),
+        "deflate-6 min128": deflate(6, min_bytes=128),
+        "deflate-6 no-takeover": deflate(6, context_takeover=False),
+        "deflate-6 w12 mem5": deflate(6, window_bits=12, mem_level=5),
+    }
+    if ZSTD_AVAILABLE:
+        schema_dict = train_dictionary(schema_samples())
+        codecs["zstd-3"] = zstd(3)
+        codecs["zstd-3 schema-dict"] = zstd(3, schema_dict)
+        codecs["zstd-9 schema-dict"] = zstd(9, schema_dict)
+        # Upper bound: a dictionary trained on (the first half of) the same traffic
+        sample = [t.encode("utf-8") for t in streams["full"][: len(streams["full"]) // 2]]
+        codecs["zstd-3 traffic-dict"] = zstd(3, train_dictionary(sample))
+
+    results = {}
+    for name, texts in streams.items():
+        stream = [t.encode("utf-8") for t in texts]
+        print(f"{name}: {len(stream)} messages, mean {sum(map(len, stream)) / len(stream):.0f} bytes")
+        results[name] = {}
+        for codec, make in codecs.items():
+            r = results[name][codec] = measure(make, stream)
+            print(f"  {codec:>22}: ratio {r['ratio']:.3f}  {r['bytes_per_message']:7.1f} B/msg  "
+                  f"{r['cpu_us_per_message']:6.2f} us/msg")
+    print(f"Saved {save_results({'config': vars(args), 'streams': results}, args.out, 'compression')}")
+
+
+if __name__ == "__main__":
+    main()
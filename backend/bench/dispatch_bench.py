@@ -0,0 +1,125 @@
+"""
+Dispatcher check and overhead benchmark, using local processes only.
+
+Starts the front door with N uvicorn workers sharing one SQLite store,
+creates sessions through it, verifies every session's REST and WebSocket
+traffic lands on one worker, kills a worker to check failover/restore,
+and compares request latency direct-to-worker vs through the dispatcher.
+
+Usage (from backend/):
+    python -m bench.dispatch_bench --workers 2 --sessions 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+import websockets
+
+from bench.common import summarize
+from bench.loadgen import _free_port
+from dispatcher import Dispatcher
+
+
+async def _latency(client: httpx.AsyncClient, url: str, n: int) -> dict:
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        await client.get(url)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def run(args) -> dict:
+    port = _free_port()
+    base_port = _free_port()
+    dispatcher = Dispatcher(args.workers, "127.0.0.1", port, base_port)
+    await dispatcher.start()
+    front = f"http://127.0.0.1:{port}"
+    result = {}
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            ids = []
+            seen = {}  # session -> workers that answered for it (X-ConvoWeave-Worker)
+            for i in range(args.sessions):
+                res = await client.post(f"{front}/sessions", json={"name": f"d-{i}"})
+                session_id = res.json()["session_id"]
+                ids.append(session_id)
+                seen[session_id] = {res.headers.get("x-convoweave-worker")}
+                res = await client.post(f"{front}/sessions/{session_id}/participants", json={"display_name": "x"})
+                assert "participant_id" in res.json(), res.text
+                seen[session_id].add(res.headers.get("x-convoweave-worker"))
+                res = await client.get(f"{front}/sessions/{session_id}")
+                seen[session_id].add(res.headers.get("x-convoweave-worker"))
+            for session_id in ids[:args.ws_sessions]:
+                async with websockets.connect(f"ws://127.0.0.1:{port}/ws/{session_id}/bench") as ws:
+                    seen[session_id].add(ws.response.headers.get("x-convoweave-worker"))
+                    result.setdefault("ws_first_message", json.loads(await ws.recv())["type"])
+
+            per_worker = []
+            for worker in dispatcher.workers:
+                health = (await client.get(f"http://127.0.0.1:{worker.port}/health")).json()
+                per_worker.append(health["sessions"])
+            result["sessions_per_worker"] = per_worker
+            split = [s for s, workers in seen.items() if len(workers) != 1 or None in workers]
+            result["split_sessions"] = len(split)
+            result["affinity_ok"] = not split and sum(per_worker) == args.sessions
+
+            result["latency_direct"] = await _latency(client, f"http://127.0.0.1:{dispatcher.workers[0].port}/health", args.requests)
+            result["latency_dispatched"] = await _latency(client, f"{front}/sessions/{ids[0]}", args.requests)
+
+            # Failover: kill the worker owning the first session, then hit it again
+            victim = dispatcher.route(ids[0])
+            orphaned = [s for s in ids if dispatcher.route(s) is victim]
+            victim.proc.kill()
+            victim.proc.wait()
+            started = time.time()
+            ok = 0
+            for session_id in orphaned:
+                for _ in range(100):
+                    try:
+                        res = await client.get(f"{front}/sessions/{session_id}")
+                        if res.status_code == 200:
+                            ok += 1
+                            break
+                    except httpx.HTTPError:
+                        pass
+                    await asyncio.sleep(0.05)
+            result["failover"] = {
+                "orphaned": len(orphaned),
+                "served_after_failover": ok,
+                "seconds": round(time.time() - started, 2),
+            }
+            while not victim.alive:
+                await asyncio.sleep(0.1)
+            result["worker_restarts"] = victim.restarts
+            # The restarted worker must not resurrect sessions now live on the failover worker
+            health = (await client.get(f"http://127.0.0.1:{victim.port}/health")).json()
+            result["restarted_worker_sessions"] = health["sessions"]
+    finally:
+        await dispatcher.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--ws-sessions", type=int, default=10, help="sessions whose WebSocket handshake is checked too")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["STORE_BACKEND"] = "local"
+        os.environ["LOCAL_STORE_PATH"] = os.path.join(tmp, "shared.db")
+        os.environ["LOCAL_STORE_BATCH_SIZE"] = "1"
+        result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
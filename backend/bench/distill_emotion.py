@@ -0,0 +1,187 @@
+"""
+Train the small MLP emotion backend (emotion_model.MLPModel) and save it
+int8-quantized for EMOTION_MODEL_PATH.
+
+Features come from frames recorded with EVENT_RECORD_FRAMES=1 (run through
+MediaPipe Face Mesh) and/or from synthetic faces: a frontal landmark
+template jittered in pose and expression. Targets are the heuristic's
+scores (distillation) unless --labels gives an (N, 3) .npy aligned with the
+recorded frames.
+
+Usage (from backend/):
+    python -m bench.distill_emotion --synthetic 50000 --out emotion_mlp.npz
+    python -m bench.distill_emotion --events events.jsonl --synthetic 20000 --out emotion_mlp.npz
+"""
+
+import argparse
+import base64
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from emotion_model import FEATURE_LANDMARKS, HeuristicModel, MLPModel, N_FEATURES, save_mlp
+
+# Rough frontal face in normalized image coordinates, per FEATURE_LANDMARKS
+FACE_TEMPLATE = {
+    1: (0.50, 0.55), 10: (0.50, 0.30), 13: (0.50, 0.660), 14: (0.50, 0.675),
+    33: (0.40, 0.46), 61: (0.45, 0.67), 70: (0.40, 0.425), 105: (0.43, 0.42),
+    133: (0.46, 0.46), 145: (0.43, 0.47), 152: (0.50, 0.78), 159: (0.43, 0.45),
+    234: (0.33, 0.50), 263: (0.60, 0.46), 291: (0.55, 0.67), 300: (0.60, 0.425),
+    334: (0.57, 0.42), 362: (0.54, 0.46), 374: (0.57, 0.47), 386: (0.57, 0.45),
+    454: (0.67, 0.50),
+}
+_AT = {lm: i for i, lm in enumerate(FEATURE_LANDMARKS)}
+
+
+def synthetic_features(n: int, seed: int = 0) -> np.ndarray:
+    """Template faces with random pose, scale and expression changes."""
+    rng = np.random.default_rng(seed)
+    base = np.array([FACE_TEMPLATE[lm] for lm in FEATURE_LANDMARKS], dtype=np.float64)
+    p = np.repeat(base[None], n, axis=0)
+
+    def shift(lms, axis, amount):
+        for lm in lms:
+            p[:, _AT[lm], axis] += amount
+
+    # Expression: eye openness, brow raise (with asymmetry), mouth opening, jaw width, brow spacing
+    eye = rng.uniform(-0.012, 0.02, n)
+    shift((159, 386), 1, -eye / 2)
+    shift((145, 374), 1, eye / 2)
+    brow = rng.uniform(-0.012, 0.02, n)
+    asym = rng.normal(0, 0.008, n)
+    shift((70, 105), 1, -brow - asym)
+    shift((300, 334), 1, -brow + asym)
+    shift((14,), 1, rng.exponential(0.015, n))
+    jaw = rng.uniform(-0.08, 0.05, n)
+    shift((234,), 0, -jaw)
+    shift((454,), 0, jaw)
+    spacing = rng.uniform(-0.06, 0.03, n)
+    shift((70, 105), 0, -spacing)
+    shift((300, 334), 0, spacing)
+    shift((152,), 1, rng.uniform(-0.06, 0.06, n))  # head pitch
+
+    # Pose: scale about the nose, then translate; plus landmark noise
+    nose = p[:, _AT[1]][:, None, :]
+    p = nose + (p - nose) * rng.uniform(0.6, 1.4, (n, 1, 1))
+    p += rng.uniform(-0.15, 0.15, (n, 1, 2))
+    p += rng.normal(0, 0.002, p.shape)
+    return p.reshape(n, N_FEATURES).astype(np.float32)
+
+
+def recorded_features(path: str) -> np.ndarray:
+    """Landmark features of recorded frames in which Face Mesh finds a face."""
+    import cv2
+    from emotion_detector import EmotionDetector
+    from event_recorder import BATCH, FRAME, read_events
+
+    detector = EmotionDetector()
+    if not detector.face_mesh:
+        raise SystemExit("--events needs MediaPipe Face Mesh")
+    rows = []
+    for _, kind, _, _, data in read_events(path):
+        frames = [data] if kind == FRAME else data if kind == BATCH else []
+        for frame_b64 in frames:
+            if not isinstance(frame_b64, str) or not frame_b64:
+                continue  # recorded without EVENT_RECORD_FRAMES
+            frame = cv2.imdecode(np.frombuffer(base64.b64decode(frame_b64.split(",")[-1]), np.uint8),
+                                 cv2.IMREAD_COLOR)
+            features = detector._features(frame) if frame is not None else None
+            if features is not None:
+                rows.append(features)
+    return np.array(rows, dtype=np.float32).reshape(-1, N_FEATURES)
+
+
+def train(x: np.ndarray, y: np.ndarray, hidden: List[int], epochs: int, batch_size: int = 256,
+          lr: float = 3e-3, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, List[Tuple[np.ndarray, np.ndarray]]]:
+    """Adam on MSE through the sigmoid head; returns (mean, std, layers)."""
+    rng = np.random.default_rng(seed)
+    mean, std = x.mean(axis=0), x.std(axis=0) + 1e-6
+    xs = (x - mean) / std
+    sizes = [N_FEATURES, *hidden, y.shape[1]]
+    layers = [[rng.normal(0, np.sqrt(2 / a), (a, b)).astype(np.float32), np.zeros(b, np.float32)]
+              for a, b in zip(sizes, sizes[1:])]
+    moments = [[np.zeros_like(t), np.zeros_like(t)] for layer in layers for t in layer]
+    step = 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(xs))
+        for start in range(0, len(xs), batch_size):
+            idx = order[start:start + batch_size]
+            acts = [xs[idx]]
+            for w, b in layers[:-1]:
+                acts.append(np.maximum(acts[-1] @ w + b, 0.0))
+            out = 1 / (1 + np.exp(-(acts[-1] @ layers[-1][0] + layers[-1][1])))
+            grad = 2 * (out - y[idx]) * out * (1 - out) / len(idx)
+            grads = []
+            for i in range(len(layers) - 1, -1, -1):
+                grads.append((acts[i].T @ grad, grad.sum(axis=0)))
+                if i:
+                    grad = (grad @ layers[i][0].T) * (acts[i] > 0)
+            grads.reverse()
+            step += 1
+            for k, (param, g) in enumerate(zip((t for layer in layers for t in layer),
+                                               (g for pair in grads for g in pair))):
+                m, v = moments[k]
+                m[:] = 0.9 * m + 0.1 * g
+                v[:] = 0.999 * v + 0.001 * g * g
+                param -= lr * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+        lr *= 0.95
+    return mean, std, [(w, b) for w, b in layers]
+
+
+def distill(features: np.ndarray, labels: Optional[np.ndarray], hidden: List[int], epochs: int,
+            out: str, seed: int = 0) -> dict:
+    y = labels if labels is not None else HeuristicModel().predict(features).astype(np.float32)
+    split = int(len(features) * 0.9)
+    started = time.perf_counter()
+    mean, std, layers = train(features[:split], y[:split], hidden, epochs, seed=seed)
+    train_s = time.perf_counter() - started
+    save_mlp(out, mean, std, layers, quantize=True)
+    predicted = MLPModel(out).predict(features[split:])
+    return {
+        "samples": len(features),
+        "train_s": round(train_s, 1),
+        "val_mae": [round(float(v), 4) for v in np.abs(predicted - y[split:]).mean(axis=0)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", help="recorded event log with frames (EVENT_RECORD_FRAMES=1)")
+    parser.add_argument("--labels", help="(N, 3) .npy of targets for the recorded frames")
+    parser.add_argument("--synthetic", type=int, default=50000, help="synthetic faces to add")
+    parser.add_argument("--hidden", default="32,32")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="emotion_mlp.npz")
+    args = parser.parse_args()
+
+    parts, labels = [], None
+    if args.events:
+        recorded = recorded_features(args.events)
+        print(f"{len(recorded)} recorded faces")
+        parts.append(recorded)
+        if args.labels:
+            labels = np.load(args.labels).astype(np.float32)
+            if len(labels) != len(recorded):
+                raise SystemExit(f"--labels has {len(labels)} rows for {len(recorded)} faces")
+    if args.synthetic:
+        synthetic = synthetic_features(args.synthetic, args.seed)
+        parts.append(synthetic)
+        if labels is not None:
+            labels = np.concatenate([labels, HeuristicModel().predict(synthetic).astype(np.float32)])
+    features = np.concatenate(parts)
+    if labels is not None:
+        # Keep rows paired with their labels through the shuffle
+        order = np.random.default_rng(args.seed).permutation(len(features))
+        features, labels = features[order], labels[order]
+    else:
+        features = features[np.random.default_rng(args.seed).permutation(len(features))]
+
+    hidden = [int(h) for h in args.hidden.split(",") if h]
+    result = distill(features, labels, hidden, args.epochs, args.out, args.seed)
+    print(f"Saved {args.out}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Emotion scoring throughput and latency: the original per-frame heuristic vs
+the batched backends in emotion_model.py, plus the no-MediaPipe fallback.
+
+Landmark backends are fed synthetic faces (bench.distill_emotion), so the
+numbers isolate scoring from Face Mesh; with MediaPipe installed the full
+detect() path on synthetic frames is measured too.
+
+Usage (from backend/):
+    python -m bench.emotion_bench --faces 5000
+    python -m bench.emotion_bench --model emotion_mlp.npz --onnx emotion_mlp.onnx
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Callable, List
+
+import numpy as np
+
+from bench.common import save_results, summarize
+from bench.distill_emotion import distill, synthetic_features
+from emotion_model import (
+    FEATURE_LANDMARKS, ONNXRUNTIME_AVAILABLE, FaceBoxModel, HeuristicModel, MLPModel, OnnxModel,
+)
+
+
+def legacy_heuristic(landmarks) -> dict:
+    """The scalar rules detect() ran per frame before the model backends (baseline)."""
+    avg_eye_openness = (abs(landmarks[145].y - landmarks[159].y) + abs(landmarks[374].y - landmarks[386].y)) / 2
+    head_tilt = abs(landmarks[152].y - landmarks[1].y)
+    engagement = min(1.0, max(0.0, (avg_eye_openness * 15 + head_tilt * 3) / 2))
+    avg_brow_raise = (abs(landmarks[70].y - landmarks[159].y) + abs(landmarks[300].y - landmarks[386].y)) / 2
+    brow_asymmetry = abs(landmarks[70].y - landmarks[300].y)
+    mouth_open = abs(landmarks[13].y - landmarks[14].y)
+    confusion = min(1.0, max(0.0, (avg_brow_raise * 20 + brow_asymmetry * 10 + mouth_open * 5)))
+    jaw_tension = max(0.0, 1.0 - abs(landmarks[454].x - landmarks[234].x) * 2)
+    brow_furrow = max(0.0, 1.0 - abs(landmarks[300].x - landmarks[70].x) * 3)
+    lip_tight = max(0.0, 1.0 - abs(landmarks[13].y - landmarks[14].y) * 10)
+    stress = min(1.0, max(0.0, (jaw_tension * 0.4 + brow_furrow * 0.4 + lip_tight * 0.2)))
+    return {
+        "engagement": round(float(engagement), 3),
+        "confusion": round(float(confusion), 3),
+        "stress": round(float(stress), 3),
+    }
+
+
+def as_landmarks(row: np.ndarray) -> list:
+    """Face Mesh-style landmark list (478 points) holding one feature row."""
+    landmarks = [SimpleNamespace(x=0.0, y=0.0)] * 478
+    for i, lm in enumerate(FEATURE_LANDMARKS):
+        landmarks[lm] = SimpleNamespace(x=float(row[2 * i]), y=float(row[2 * i + 1]))
+    return landmarks
+
+
+def run(call: Callable[[int], int], items: int) -> dict:
+    """call(i) scores from item i on and returns how many it scored."""
+    latencies = []
+    i = 0
+    started = time.perf_counter()
+    while i < items:
+        t0 = time.perf_counter()
+        i += call(i)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return {"faces_per_s": round(items / elapsed, 1), "call": summarize(latencies)}
+
+
+def batched(model, features: np.ndarray, batch: int) -> Callable[[int], int]:
+    def call(i: int) -> int:
+        chunk = features[i:i + batch]
+        model.predict(chunk)
+        return len(chunk)
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faces", type=int, default=5000)
+    parser.add_argument("--frames", type=int, default=200, help="frames for the fallback / detect() runs")
+    parser.add_argument("--batches", default="1,8,32")
+    parser.add_argument("--model", help="MLP .npz (default: distill one from synthetic faces)")
+    parser.add_argument("--onnx", help="ONNX model over the same features, if onnxruntime is installed")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    features = synthetic_features(args.faces, seed=1)
+    landmark_rows = [as_landmarks(row) for row in features]
+    batches = [int(b) for b in args.batches.split(",")]
+    results = {}
+
+    results["legacy_heuristic"] = run(lambda i: (legacy_heuristic(landmark_rows[i]), 1)[1], args.faces)
+    heuristic = HeuristicModel()
+    for b in batches:
+        results[f"heuristic_b{b}"] = run(batched(heuristic, features, b), args.faces)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.model
+        if not path:
+            path = os.path.join(tmp, "emotion_mlp.npz")
+            print(f"Distilled MLP: {distill(synthetic_features(50000), None, [32, 32], 20, path)}")
+        mlp = MLPModel(path)
+        for b in batches:
+            results[f"mlp_b{b}"] = run(batched(mlp, features, b), args.faces)
+        results["mlp_mae_vs_heuristic"] = [
+            round(float(v), 4) for v in np.abs(mlp.predict(features) - heuristic.predict(features)).mean(axis=0)
+        ]
+
+    if args.onnx and ONNXRUNTIME_AVAILABLE:
+        onnx = OnnxModel(args.onnx, args.threads)
+        for b in batches:
+            results[f"onnx_b{b}"] = run(batched(onnx, features, b), args.faces)
+
+    # Whole-frame paths: old random fallback vs the face-box model, and detect() with Face Mesh
+    from bench.loadgen import synthetic_frame
+    import cv2
+
+    frames = [cv2.imdecode(np.frombuffer(base64.b64decode(synthetic_frame()), np.uint8), cv2.IMREAD_COLOR)
+              for _ in range(min(args.frames, 20))]
+    frames = [frames[i % len(frames)] for i in range(args.frames)]
+    results["random_fallback"] = run(lambda i: (np.random.uniform(0.5, 0.9), np.random.uniform(0.0, 0.3),
+                                                np.random.uniform(0.0, 0.2)) and 1, args.frames)
+    facebox = FaceBoxModel()
+    if facebox.enabled:
+        results["facebox_fallback"] = run(lambda i: (facebox.score(frames[i]), 1)[1], args.frames)
+
+    from emotion_detector import EmotionDetector
+    detector = EmotionDetector()
+    if detector.face_mesh:
+        detector.warm_up()
+        results[f"detect_{detector.model.name}"] = run(lambda i: (detector.detect(frames[i]), 1)[1], args.frames)
+
+    for name, r in results.items():
+        if isinstance(r, dict):
+            print(f"{name:>20}: {r['faces_per_s']:>12.1f} faces/s  p50={r['call']['p50_ms']:.4f}ms "
+                  f"p99={r['call']['p99_ms']:.4f}ms")
+    print(f"MLP mean abs error vs heuristic (engagement, confusion, stress): {results['mlp_mae_vs_heuristic']}")
+    print(f"Saved {save_results({'config': vars(args), 'results': results}, args.out, 'emotion')}")
+
+
+if __name__ == "__main__":
+    main()
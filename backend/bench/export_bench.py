@@ -0,0 +1,132 @@
+"""
+Export throughput and peak RSS for a multi-hour session.
+Seeds a scratch SQLite store, then runs each export variant in a fresh
+process (peak RSS is per process) and compares it with the old approach of
+loading the whole session through get_session_summary().
+
+Usage (from backend/):
+    python -m bench.export_bench --hours 4 --participants 20
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.common import memory, save_results
+
+VARIANTS = ("ndjson", "csv", "ndjson+gzip", "csv+gzip", "summary_json")
+SESSION_ID = "bench-session"
+
+
+def seed(db_path: str, hours: float, participants: int, seed_value: int) -> dict:
+    from local_store import LocalStore
+    from signal_history import SignalHistory
+
+    class _Signal:
+        def __init__(self, **kw):
+            self.__dict__.update(kw)
+
+    rng = random.Random(seed_value)
+    store = LocalStore(db_path)
+    history = SignalHistory(store)
+    start = time.time() - hours * 3600
+    store.save_session(SESSION_ID, {"session_id": SESSION_ID, "name": "bench", "created_at": start, "participants": {}})
+    chat = transcript = signals = 0
+    for second in range(int(hours * 3600)):
+        now = start + second
+        for p in range(participants):
+            pid = f"participant-{p}"
+            history.record(SESSION_ID, pid, _Signal(engagement=rng.random(), confusion=rng.random(),
+                                                    stress=rng.random(), energy=None, sentiment=None), now=now)
+            signals += 1
+            if rng.random() < 0.01:
+                store.save_chat(SESSION_ID, pid, "message " * rng.randint(3, 30), now)
+                chat += 1
+            if rng.random() < 0.02:
+                store.save_transcript(SESSION_ID, {"participant_id": pid, "display_name": pid, "timestamp": now,
+                                                   "text": "spoken words " * rng.randint(5, 40), "tone": "neutral"})
+                transcript += 1
+        if second % 60 == 0:
+            history.flush(SESSION_ID, now=now)
+    history.close_session(SESSION_ID)
+    store.close()
+    return {"chat": chat, "transcript": transcript, "signals": signals}
+
+
+def run_variant(db_path: str, variant: str) -> dict:
+    from local_store import LocalStore
+    import session_export
+
+    store = LocalStore(db_path)
+    started = time.perf_counter()
+    nbytes = records = 0
+    if variant == "summary_json":
+        data = store.get_session_summary(SESSION_ID)
+        body = json.dumps(data).encode("utf-8")
+        nbytes, records = len(body), len(data["chat"]) + len(data["transcript"])
+    else:
+        fmt, _, gz = variant.partition("+")
+
+        def counted():
+            nonlocal records
+            for record in session_export.iter_records(store, SESSION_ID):
+                records += 1
+                yield record
+
+        for chunk in session_export.stream_export(counted(), fmt, gzip=bool(gz)):
+            nbytes += len(chunk)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "records": records,
+        "records_per_s": round(records / elapsed, 1),
+        "mb_per_s": round(nbytes / elapsed / 1e6, 2),
+        "output_mb": round(nbytes / 1e6, 2),
+        "peak_rss_mb": round(memory()["peak_rss_bytes"] / 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--run", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_variant(args.db, args.run)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "export.db")
+        started = time.perf_counter()
+        counts = seed(db_path, args.hours, args.participants, args.seed)
+        print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+        variants = {}
+        for variant in VARIANTS:
+            out = subprocess.run(
+                [sys.executable, "-m", "bench.export_bench", "--run", variant, "--db", db_path],
+                capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            )
+            variants[variant] = json.loads(out.stdout.strip().splitlines()[-1])
+            v = variants[variant]
+            print(f"{variant:>14}: {v['records_per_s']:>10.0f} rec/s {v['mb_per_s']:>7.1f} MB/s "
+                  f"out={v['output_mb']:.1f}MB peak_rss={v['peak_rss_mb']:.1f}MB")
+
+    result = {"config": {k: v for k, v in vars(args).items() if k not in ("run", "db")}, "counts": counts,
+              "variants": variants}
+    print(f"Saved {save_results(result, args.out, 'export')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Stand-ins for GroqAI and the persistence stores with tunable latency.
+
+Latency is injected with time.sleep, like the real SDK calls, so blocking
+behaviour on the event loop is preserved.
+"""
+
+import os
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def _wait(latency: float, jitter: float):
+    delay = latency + (random.uniform(0, jitter) if jitter else 0.0)
+    if delay > 0:
+        time.sleep(delay)
+
+
+class FakeGroqAI:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.enabled = True
+        self.latency = latency
+        self.jitter = jitter
+
+    def analyze_chat_sentiment(self, message: str) -> dict:
+        _wait(self.latency, self.jitter)
+        return {"sentiment": 0.6, "emotion": "neutral", "confidence": 0.8, "summary": "fake"}
+
+    def transcribe_audio(self, audio_path: str) -> dict:
+        _wait(self.latency, self.jitter)
+        return {"text": "fake transcription", "confidence": 0.9, "language": "en", "duration": 0}
+
+    def analyze_speech_tone(self, transcription: str) -> dict:
+        _wait(self.latency, self.jitter)
+        return {"tone": "calm", "energy": 0.5, "stress_level": 0.2, "engagement": 0.7}
+
+    def generate_meeting_summary(self, session_data: dict) -> str:
+        _wait(self.latency, self.jitter)
+        return f"Fake summary for {session_data.get('participants', 0)} participants."
+
+
+class FakeStore:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.enabled = True
+        self.latency = latency
+        self.jitter = jitter
+        self.writes = 0
+
+    def _write(self) -> bool:
+        self.writes += 1
+        _wait(self.latency, self.jitter)
+        return True
+
+    def save_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
+        return self._write()
+
+    def save_signal(self, session_id: str, participant_id: str, signal: Dict[str, Any]) -> bool:
+        return self._write()
+
+    def save_signal_rollups(self, session_id: str, resolution: int, chunk: int, blob: str) -> bool:
+        return self._write()
+
+    def save_chat(self, session_id: str, participant_id: str, message: str, timestamp: float) -> bool:
+        return self._write()
+
+    def save_transcript(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        return self._write()
+
+    def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def load_active_sessions(self) -> List[Dict[str, Any]]:
+        return []
+
+    def has_session(self, session_id: str) -> bool:
+        return False
+
+    def iter_chat(self, session_id: str, *args, **kwargs) -> Iterator[Dict[str, Any]]:
+        return iter(())
+
+    def iter_transcript(self, session_id: str, *args, **kwargs) -> Iterator[Dict[str, Any]]:
+        return iter(())
+
+    def next_rollup_chunk(self, session_id: str, resolution: int) -> int:
+        return 0
+
+    def iter_signal_rollups(self, session_id: str, *args, **kwargs) -> Iterator[str]:
+        return iter(())
+
+    def flush(self) -> bool:
+        return True
+
+    def queue_depth(self) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+
+def install(groq_latency: float = 0.0, store_latency: float = 0.0, jitter: float = 0.0):
+    """Import the app with fakes swapped in; returns the main module."""
+    # Keep the import-time default store off disk
+    os.environ.setdefault("STORE_BACKEND", "local")
+    os.environ.setdefault("LOCAL_STORE_PATH", ":memory:")
+    import main
+
+    main.groq_ai = FakeGroqAI(groq_latency, jitter)
+    main.store = FakeStore(store_latency, jitter)
+    main.signal_history.store = main.store
+    return main
@@ -0,0 +1,153 @@
+"""
+Broadcast cost with silently-dead clients, heartbeats off vs on.
+
+Each session has live participants that send signals and read everything,
+plus --dead-fraction clients that connect and then never read or write
+(like a laptop that lost Wi-Fi). Each variant runs the app in its own
+process, since the heartbeat settings are read at import.
+
+Usage (from backend/):
+    python -m bench.heartbeat_bench --sessions 10 --participants 10 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from bench.common import memory, save_results, summarize
+from bench.loadgen import Server
+
+VARIANTS = {
+    "off": {"HEARTBEAT_INTERVAL_S": "0"},
+    "on": {"HEARTBEAT_INTERVAL_S": "2", "HEARTBEAT_TIMEOUT_S": "2", "HEARTBEAT_SCAN_S": "0.5",
+           "HEARTBEAT_STALE_GRACE_S": "5"},
+}
+
+
+def _scrape(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    return 0.0
+
+
+async def _live(url: str, participant_id: str, args, latencies: List[float], stop_at: float):
+    async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+        await ws.recv()  # session_init
+
+        async def receive():
+            async for raw in ws:
+                msg = json.loads(raw)
+                payload = msg.get("payload", {})
+                if msg.get("type") == "ping":
+                    await ws.send(json.dumps({"type": "pong", "payload": payload}))
+                elif msg.get("type") == "session_update" and payload.get("participant_id") == participant_id:
+                    latencies.append(time.time() - payload["signal"]["timestamp"])
+
+        receiver = asyncio.create_task(receive())
+        await asyncio.sleep(random.uniform(0, 1 / args.signal_hz))
+        while time.time() < stop_at:
+            signal = {"engagement": random.random(), "confusion": random.random(), "stress": random.random(),
+                      "timestamp": time.time()}
+            await ws.send(json.dumps({"type": "signal", "payload": signal}))
+            await asyncio.sleep(1 / args.signal_hz)
+        await asyncio.sleep(0.5)
+        receiver.cancel()
+
+
+async def _dead(url: str, stop_at: float):
+    # max_queue=1: once one message is buffered the client stops reading the socket
+    ws = await websockets.connect(url, max_size=None, max_queue=1, ping_interval=None)
+    await asyncio.sleep(max(0.0, stop_at - time.time()) + 0.5)
+    ws.transport.abort()
+
+
+async def run_variant(args) -> dict:
+    server = Server(argparse.Namespace(uvicorn=False, port=0, groq_latency=0.0, store_latency=0.0))
+    server.start()
+    latencies: List[float] = []
+    async with httpx.AsyncClient(base_url=server.base_url, timeout=30) as client:
+        session_ids = [(await client.post("/sessions", json={"name": f"hb-{i}"})).json()["session_id"]
+                       for i in range(args.sessions)]
+        ws_base = server.base_url.replace("http", "ws")
+        stop_at = time.time() + args.duration
+        tasks = []
+        dead_per_session = round(args.participants * args.dead_fraction)
+        for session_id in session_ids:
+            for p in range(args.participants):
+                res = await client.post(f"/sessions/{session_id}/participants", json={"display_name": f"hb-{p}"})
+                pid = res.json()["participant_id"]
+                url = f"{ws_base}/ws/{session_id}/{pid}"
+                if p < dead_per_session:
+                    tasks.append(_dead(url, stop_at))
+                else:
+                    tasks.append(_live(url, pid, args, latencies, stop_at))
+        # Let the heartbeat (if any) settle before sampling the steady state
+        settle = asyncio.gather(*tasks)
+        await asyncio.sleep(args.duration * 0.8)
+        before = (await client.get("/metrics")).text
+        health = (await client.get("/health")).json()
+        summary = (await client.get(f"/sessions/{session_ids[0]}/summary")).json()
+        await asyncio.sleep(args.duration * 0.2)
+        after = (await client.get("/metrics")).text
+        rss = memory(server.pid)
+        await settle
+
+    def window(name: str) -> float:
+        return _scrape(after, name) - _scrape(before, name)
+
+    broadcasts = window("convoweave_broadcast_seconds_count")
+    server.stop()
+    return {
+        "broadcast_mean_ms": round(window("convoweave_broadcast_seconds_sum") / broadcasts * 1000, 4)
+        if broadcasts else None,
+        "fanout_mean": round(window("convoweave_broadcast_fanout_sum") / broadcasts, 2) if broadcasts else None,
+        "signal_latency": summarize(latencies[len(latencies) // 2:]),
+        "summary_participants": summary.get("participants"),
+        "dead_sockets_dropped": _scrape(after, "convoweave_heartbeat_dead_sockets_total"),
+        "heartbeat": health.get("heartbeat"),
+        "rss_mb": round(rss["rss_bytes"] / 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--participants", type=int, default=10, help="per session, dead ones included")
+    parser.add_argument("--dead-fraction", type=float, default=0.2)
+    parser.add_argument("--signal-hz", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(asyncio.run(run_variant(args))))
+        return
+
+    forwarded = [f"--{k.replace('_', '-')}={v}" for k, v in vars(args).items() if k not in ("out", "run")]
+    results: Dict[str, dict] = {}
+    for variant, env in VARIANTS.items():
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.heartbeat_bench", "--run", *forwarded],
+            capture_output=True, text=True, check=True, env={**os.environ, **env},
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        r = results[variant] = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"heartbeat {variant:>3}: broadcast {r['broadcast_mean_ms']} ms  fanout {r['fanout_mean']}  "
+              f"signal p50={r['signal_latency'].get('p50_ms')}ms p99={r['signal_latency'].get('p99_ms')}ms  "
+              f"summary participants={r['summary_participants']}  rss={r['rss_mb']}MB")
+    print(f"Saved {save_results({'config': vars(args), 'variants': results}, args.out, 'heartbeat')}")
+
+
+if __name__ == "__main__":
+    main()
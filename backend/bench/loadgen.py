@@ -0,0 +1,278 @@
+"""
+Load generator for the WebSocket and analysis endpoints.
+
+Spawns simulated participants across many sessions; each sends `signal`,
+`chat` and (host only) `stt_toggle` over /ws at configurable rates, while
+frame clients POST synthetic frames to /api/analyze-frame and
+/api/analyze-batch. GroqAI and the store are faked with tunable latency.
+
+End-to-end latency is measured from send until the sender sees its own
+event in a broadcast. Results are saved as JSON baselines.
+
+Usage (from backend/):
+    python -m bench.loadgen --sessions 50 --participants 20 --duration 30
+    python -m bench.loadgen --uvicorn --baseline bench/results/base.json
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from bench.common import compare, memory, print_report, save_results, summarize
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def synthetic_frame(width: int = 320, height: int = 240) -> str:
+    """A JPEG of noise, base64-encoded like the frontend's canvas capture."""
+    import cv2
+    import numpy as np
+
+    img = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return base64.b64encode(buf.tobytes()).decode("ascii")
+
+
+class Server:
+    """The app under test, either in this process (thread) or a uvicorn subprocess."""
+
+    def __init__(self, args):
+        self.args = args
+        self.port = args.port or _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.pid = os.getpid()
+        self._proc = None
+        self._server = None
+
+    def start(self):
+        if self.args.uvicorn:
+            self._proc = subprocess.Popen([
+                sys.executable, "-m", "bench.serve", "--port", str(self.port),
+                "--groq-latency", str(self.args.groq_latency),
+                "--store-latency", str(self.args.store_latency),
+            ])
+            self.pid = self._proc.pid
+        else:
+            import uvicorn
+            from bench import fakes
+
+            main = fakes.install(self.args.groq_latency, self.args.store_latency)
+            from ws_protocol import DeflateWebSocketProtocol
+
+            config = uvicorn.Config(main.app, host="127.0.0.1", port=self.port, log_level="warning",
+                                    ws=DeflateWebSocketProtocol)
+            self._server = uvicorn.Server(config)
+            threading.Thread(target=self._server.run, daemon=True).start()
+
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{self.base_url}/health", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("server did not start")
+
+    def stop(self):
+        if self._proc:
+            self._proc.terminate()
+            self._proc.wait(timeout=10)
+        if self._server:
+            self._server.should_exit = True
+
+
+class Stats:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.sent: Dict[str, int] = defaultdict(int)
+        self.received = 0
+        self.received_bytes = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+
+
+async def _participant(args, base_url: str, client: httpx.AsyncClient, session_id: str, index: int,
+                       stats: Stats, start_at: float, stop_at: float):
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    try:
+        res = await client.post(f"/sessions/{session_id}/participants", json={"display_name": f"bench-{index}"})
+        participant_id = res.json()["participant_id"]
+        ws_url = f"{base_url.replace('http', 'ws')}/ws/{session_id}/{participant_id}"
+        async with websockets.connect(ws_url, max_size=None, ping_interval=None) as ws:
+            await ws.recv()  # session_init
+            stt_sent = deque()
+
+            async def receive():
+                async for raw in ws:
+                    now = time.time()
+                    stats.received += 1
+                    stats.received_bytes += len(raw)
+                    msg = json.loads(raw)
+                    payload = msg.get("payload", {})
+                    kind = msg.get("type")
+                    if kind == "ping":
+                        await ws.send(json.dumps({"type": "pong", "payload": payload}))
+                    if kind == "session_update" and payload.get("participant_id") == participant_id:
+                        stats.latency["signal"].append(now - payload["signal"]["timestamp"])
+                    elif kind == "chat" and payload.get("participant_id") == participant_id:
+                        stats.latency["chat"].append(now - payload["timestamp"])
+                    elif kind == "stt_toggle" and stt_sent:
+                        stats.latency["stt_toggle"].append(now - stt_sent.popleft())
+
+            receiver = asyncio.create_task(receive())
+            rates = {"signal": args.signal_hz, "chat": args.chat_hz, "stt_toggle": args.stt_hz if index == 0 else 0}
+            next_at = {k: time.time() + random.uniform(0, 1 / r) for k, r in rates.items() if r > 0}
+            while next_at:
+                kind, when = min(next_at.items(), key=lambda kv: kv[1])
+                if when >= stop_at:
+                    break
+                await asyncio.sleep(max(0.0, when - time.time()))
+                now = time.time()
+                if kind == "signal":
+                    payload = {
+                        "engagement": random.random(), "confusion": random.random(),
+                        "stress": random.random(), "timestamp": now,
+                    }
+                elif kind == "chat":
+                    payload = {"message": f"bench message {random.randint(0, 1 << 20)}", "timestamp": now}
+                else:
+                    payload = {"enabled": random.random() < 0.5}
+                    stt_sent.append(now)
+                await ws.send(json.dumps({"type": kind, "payload": payload}))
+                stats.sent[kind] += 1
+                next_at[kind] = when + 1 / rates[kind]
+
+            # Let in-flight broadcasts drain before closing
+            await asyncio.sleep(args.drain)
+            receiver.cancel()
+    except Exception as exc:
+        stats.errors[type(exc).__name__] += 1
+
+
+async def _frame_client(args, client: httpx.AsyncClient, session_id: str, index: int, frames: List[str],
+                        stats: Stats, stop_at: float):
+    interval = 1 / args.frame_hz
+    # Frame limits are per participant only for real participants, so join like the frontend does
+    res = await client.post(f"/sessions/{session_id}/participants", json={"display_name": f"bench-frames-{index}"})
+    params = {"participant_id": res.json()["participant_id"], "session_id": session_id}
+    n = 0
+    while time.time() < stop_at:
+        started = time.time()
+        batch = args.batch_every and n % args.batch_every == args.batch_every - 1
+        kind = "analyze_batch" if batch else "analyze_frame"
+        try:
+            if batch:
+                res = await client.post("/api/analyze-batch", json={"frames": frames[:args.batch_size]}, params=params)
+            else:
+                res = await client.post("/api/analyze-frame", json={"frame": random.choice(frames), "participant_id": "bench"},
+                                        params=params)
+            if res.status_code == 200:
+                stats.latency[kind].append(time.time() - started)
+            else:
+                stats.errors[f"{kind}_{res.status_code}"] += 1
+        except Exception as exc:
+            stats.errors[type(exc).__name__] += 1
+        stats.sent[kind] += 1
+        n += 1
+        await asyncio.sleep(max(0.0, interval - (time.time() - started)))
+
+
+async def run(args, server: Server) -> dict:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.http_connections)
+    async with httpx.AsyncClient(base_url=server.base_url, limits=limits, timeout=60) as client:
+        session_ids = []
+        for i in range(args.sessions):
+            res = await client.post("/sessions", json={"name": f"bench-{i}"})
+            session_ids.append(res.json()["session_id"])
+
+        frames = [synthetic_frame() for _ in range(max(1, args.batch_size))] if args.frame_clients else []
+        t0 = time.time() + 0.5
+        stop_at = t0 + args.ramp + args.duration
+        tasks = []
+        total = args.sessions * args.participants
+        for s, session_id in enumerate(session_ids):
+            for p in range(args.participants):
+                start_at = t0 + args.ramp * (s * args.participants + p) / max(1, total)
+                tasks.append(_participant(args, server.base_url, client, session_id, p, stats, start_at, stop_at))
+        for i in range(args.frame_clients):
+            tasks.append(_frame_client(args, client, session_ids[i % len(session_ids)], i, frames, stats, stop_at))
+        await asyncio.gather(*tasks)
+        elapsed = time.time() - t0
+
+    return {
+        "name": args.name,
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "out")},
+        "elapsed_s": round(elapsed, 2),
+        "sent": dict(stats.sent),
+        "throughput": {
+            **{f"sent_{k}": round(v / args.duration, 1) for k, v in stats.sent.items()},
+            "received_messages": round(stats.received / args.duration, 1),
+        },
+        "received_bytes": stats.received_bytes,
+        "latency": {k: summarize(v) for k, v in stats.latency.items()},
+        "errors": dict(stats.errors),
+        "memory": memory(server.pid),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--name", default="loadgen")
+    parser.add_argument("--uvicorn", action="store_true", help="run the app in a uvicorn subprocess")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--participants", type=int, default=10, help="per session")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of steady load")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds to spread connects over")
+    parser.add_argument("--drain", type=float, default=1.0)
+    parser.add_argument("--signal-hz", type=float, default=1.0)
+    parser.add_argument("--chat-hz", type=float, default=0.05)
+    parser.add_argument("--stt-hz", type=float, default=0.02)
+    parser.add_argument("--frame-clients", type=int, default=4)
+    parser.add_argument("--frame-hz", type=float, default=1.0)
+    parser.add_argument("--batch-every", type=int, default=10, help="every Nth frame POST is a batch (0 = never)")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--http-connections", type=int, default=200)
+    parser.add_argument("--groq-latency", type=float, default=0.0)
+    parser.add_argument("--store-latency", type=float, default=0.0)
+    parser.add_argument("--out", help="result JSON path (default bench/results/<name>-<ts>.json)")
+    parser.add_argument("--baseline", help="compare against a saved result")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = Server(args)
+    server.start()
+    try:
+        result = asyncio.run(run(args, server))
+    finally:
+        server.stop()
+
+    print_report(result)
+    print(f"saved {save_results(result, args.out, args.name)}")
+    if args.baseline:
+        regressions = compare(result, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
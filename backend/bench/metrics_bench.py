@@ -0,0 +1,34 @@
+"""
+Per-event cost of the metrics hot path.
+
+Usage (from backend/):
+    python -m bench.metrics_bench
+"""
+
+import timeit
+
+import metrics
+
+
+def main():
+    n = 1_000_000
+    hist = metrics.Histogram("bench_seconds", "bench")
+    labelled = metrics.Histogram("bench_labelled_seconds", "bench", ("type",))
+    counter = metrics.Counter("bench_total", "bench")
+    child = labelled.labels("signal")
+
+    cases = {
+        "histogram.observe": lambda: hist.observe(0.0012),
+        "histogram.labels().observe": lambda: labelled.labels("signal").observe(0.0012),
+        "cached child.observe": lambda: child.observe(0.0012),
+        "counter.inc": counter.inc,
+        "perf_counter pair + observe": lambda: hist.observe(metrics.perf_counter() - metrics.perf_counter()),
+    }
+    baseline = min(timeit.repeat(lambda: None, number=n, repeat=3)) / n
+    for name, fn in cases.items():
+        per_call = min(timeit.repeat(fn, number=n, repeat=3)) / n - baseline
+        print(f"{name:>30}: {per_call * 1e9:7.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Flood test: does one abusive session hurt everyone else?
+
+--sessions well-behaved sessions signal at --signal-hz and measure their own
+end-to-end signal latency, while one flood session has --flooders sockets
+sending signals as fast as the connection allows and --frame-flooders
+HTTP clients posting frames back to back. Run with rate limits off and on;
+each variant runs the app in its own process, since limits are read at import.
+
+Usage (from backend/):
+    python -m bench.rate_limit_bench --sessions 10 --participants 5 --duration 15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+import websockets
+
+from bench.common import save_results, summarize
+from bench.loadgen import Server, synthetic_frame
+
+VARIANTS = {
+    "off": {"RATE_LIMITS": "0"},
+    "on": {"RATE_LIMITS": "1"},
+}
+
+LABELED = re.compile(r'^convoweave_rate_limited_total\{kind="(\w+)",scope="(\w+)"\} ([\d.e+]+)$')
+
+
+async def _victim(url: str, participant_id: str, args, latencies: List[float], stop_at: float):
+    async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+        await ws.recv()  # session_init
+
+        async def receive():
+            async for raw in ws:
+                msg = json.loads(raw)
+                payload = msg.get("payload", {})
+                if msg.get("type") == "ping":
+                    await ws.send(json.dumps({"type": "pong", "payload": payload}))
+                elif msg.get("type") == "session_update" and payload.get("participant_id") == participant_id:
+                    latencies.append(time.time() - payload["signal"]["timestamp"])
+
+        receiver = asyncio.create_task(receive())
+        await asyncio.sleep(random.uniform(0, 1 / args.signal_hz))
+        while time.time() < stop_at:
+            signal = {"engagement": random.random(), "confusion": random.random(), "stress": random.random(),
+                      "timestamp": time.time()}
+            await ws.send(json.dumps({"type": "signal", "payload": signal}))
+            await asyncio.sleep(1 / args.signal_hz)
+        await asyncio.sleep(0.5)
+        receiver.cancel()
+
+
+async def _signal_flooder(url: str, counts: Dict[str, int], stop_at: float):
+    async with websockets.connect(url, max_size=None, max_queue=None, ping_interval=None) as ws:
+        while time.time() < stop_at:
+            signal = {"engagement": random.random(), "confusion": random.random(), "stress": random.random(),
+                      "timestamp": time.time()}
+            await ws.send(json.dumps({"type": "signal", "payload": signal}))
+            counts["signals_sent"] += 1
+            if counts["signals_sent"] % 50 == 0:
+                await asyncio.sleep(0)
+
+
+async def _frame_flooder(client: httpx.AsyncClient, session_id: str, index: int, frames: List[str],
+                         counts: Dict[str, int], stop_at: float):
+    res = await client.post(f"/sessions/{session_id}/participants", json={"display_name": f"frames-{index}"})
+    params = {"participant_id": res.json()["participant_id"], "session_id": session_id}
+    while time.time() < stop_at:
+        res = await client.post("/api/analyze-frame", json={"frame": random.choice(frames)}, params=params)
+        counts[f"frames_{res.status_code}"] += 1
+
+
+async def run_variant(args) -> dict:
+    server = Server(argparse.Namespace(uvicorn=False, port=0, groq_latency=0.0, store_latency=0.0))
+    server.start()
+    latencies: List[float] = []
+    counts: Dict[str, int] = defaultdict(int)
+    frames = [synthetic_frame() for _ in range(4)] if args.frame_flooders else []
+    limits = httpx.Limits(max_connections=args.frame_flooders + 10)
+    async with httpx.AsyncClient(base_url=server.base_url, timeout=60, limits=limits) as client:
+        ws_base = server.base_url.replace("http", "ws")
+
+        async def join(session_id: str, name: str) -> Tuple[str, str]:
+            res = await client.post(f"/sessions/{session_id}/participants", json={"display_name": name})
+            return f"{ws_base}/ws/{session_id}/{res.json()['participant_id']}", res.json()["participant_id"]
+
+        tasks = []
+        stop_at = time.time() + 1 + args.duration
+        for i in range(args.sessions):
+            session_id = (await client.post("/sessions", json={"name": f"victim-{i}"})).json()["session_id"]
+            for p in range(args.participants):
+                url, pid = await join(session_id, f"v{p}")
+                tasks.append(_victim(url, pid, args, latencies, stop_at))
+        flood_id = (await client.post("/sessions", json={"name": "flood"})).json()["session_id"]
+        for p in range(args.participants):
+            url, pid = await join(flood_id, f"f{p}")
+            tasks.append(_victim(url, pid, args, [], stop_at) if p >= args.flooders
+                         else _signal_flooder(url, counts, stop_at))
+        for i in range(args.frame_flooders):
+            tasks.append(_frame_flooder(client, flood_id, i, frames, counts, stop_at))
+        await asyncio.gather(*tasks, return_exceptions=True)
+        metrics_text = (await client.get("/metrics")).text
+    server.stop()
+
+    limited = {}
+    for line in metrics_text.splitlines():
+        m = LABELED.match(line)
+        if m:
+            limited[f"{m.group(1)}_{m.group(2)}"] = float(m.group(3))
+    return {
+        "victim_signal_latency": summarize(latencies),
+        "flood": dict(counts),
+        "rate_limited": limited,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10, help="well-behaved sessions")
+    parser.add_argument("--participants", type=int, default=5, help="per session, flood session included")
+    parser.add_argument("--signal-hz", type=float, default=2.0)
+    parser.add_argument("--flooders", type=int, default=2, help="signal-flooding sockets in the flood session")
+    parser.add_argument("--frame-flooders", type=int, default=4, help="back-to-back frame POST clients")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(asyncio.run(run_variant(args))))
+        return
+
+    forwarded = [f"--{k.replace('_', '-')}={v}" for k, v in vars(args).items() if k not in ("out", "run")]
+    results: Dict[str, dict] = {}
+    for variant, env in VARIANTS.items():
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.rate_limit_bench", "--run", *forwarded],
+            capture_output=True, text=True, check=True, env={**os.environ, **env},
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        r = results[variant] = json.loads(out.stdout.strip().splitlines()[-1])
+        lat = r["victim_signal_latency"]
+        print(f"limits {variant:>3}: victim signal p50={lat.get('p50_ms')}ms p99={lat.get('p99_ms')}ms "
+              f"(n={lat.get('count')})  flood {r['flood']}  limited {r['rate_limited']}")
+    print(f"Saved {save_results({'config': vars(args), 'variants': results}, args.out, 'rate_limits')}")
+
+
+if __name__ == "__main__":
+    main()
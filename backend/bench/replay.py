@@ -0,0 +1,240 @@
+"""
+Replay a recorded event log (see event_recorder.py) against the app.
+
+Each recorded session is recreated, each recorded WebSocket reconnects
+with its original participant id and resends its messages verbatim, and
+frame requests are re-issued, all on the original timeline scaled by
+--speed (0 = as fast as possible). GroqAI and the store are faked.
+
+Latency per event type is measured as in loadgen: from send until the
+sender sees its own event broadcast (signal -> session_update, chat ->
+chat, stt_toggle -> stt_toggle), or the HTTP round trip for frames.
+
+Usage (from backend/):
+    EVENT_RECORD_PATH=/tmp/events.log python -m uvicorn main:app   # record
+    python -m bench.replay /tmp/events.log --speed 10
+    python -m bench.replay /tmp/events.log --speed 0 --baseline bench/results/replay-base.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+
+from bench.common import compare, memory, print_report, save_results, summarize
+from bench.loadgen import Server, Stats, synthetic_frame
+from event_recorder import BATCH, FRAME, WS_CLOSE, WS_MESSAGE, WS_OPEN, read_events
+
+ECHOES = {"session_update": "signal", "chat": "chat", "stt_toggle": "stt_toggle"}
+
+
+class Replayer:
+    def __init__(self, args, base_url: str, client: httpx.AsyncClient, stats: Stats):
+        self.args = args
+        self.base_url = base_url
+        self.client = client
+        self.stats = stats
+        self.sessions: Dict[str, asyncio.Future] = {}
+        self.connections: Dict[Tuple[str, str], asyncio.Queue] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.frames: List[str] = []
+
+    def _session(self, recorded_id: str) -> asyncio.Future:
+        """Recreate a recorded session once; resolves to its new id."""
+        if recorded_id not in self.sessions:
+            async def create():
+                res = await self.client.post("/sessions", json={"name": f"replay-{recorded_id[:8]}"})
+                return res.json()["session_id"]
+            self.sessions[recorded_id] = asyncio.ensure_future(create())
+        return self.sessions[recorded_id]
+
+    def _open(self, session_id: str, participant_id: str) -> asyncio.Queue:
+        key = (session_id, participant_id)
+        queue = self.connections.get(key)
+        if queue is None:
+            queue = self.connections[key] = asyncio.Queue()
+            self.tasks.append(asyncio.ensure_future(self._connection(self._session(session_id), participant_id, queue)))
+        return queue
+
+    async def _connection(self, session_future: asyncio.Future, participant_id: str, queue: asyncio.Queue):
+        stats = self.stats
+        pending: Dict[str, Deque[float]] = defaultdict(deque)
+        try:
+            session_id = await session_future
+            url = f"{self.base_url.replace('http', 'ws')}/ws/{session_id}/{participant_id}"
+            async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+                await ws.recv()  # session_init
+
+                async def receive():
+                    async for raw in ws:
+                        now = time.perf_counter()
+                        stats.received += 1
+                        stats.received_bytes += len(raw)
+                        msg = json.loads(raw)
+                        if msg.get("type") == "ping":
+                            await ws.send(json.dumps({"type": "pong", "payload": msg.get("payload", {})}))
+                            continue
+                        kind = ECHOES.get(msg.get("type"))
+                        if kind is None or not pending[kind]:
+                            continue
+                        if kind == "stt_toggle":
+                            stats.latency[kind].append(now - pending[kind].popleft())
+                        elif msg.get("payload", {}).get("participant_id") == participant_id:
+                            if kind == "signal":
+                                # Updates may be coalesced under lag: one update answers all pending signals
+                                stats.latency[kind].append(now - pending[kind][0])
+                                pending[kind].clear()
+                            else:
+                                stats.latency[kind].append(now - pending[kind].popleft())
+
+                receiver = asyncio.ensure_future(receive())
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    kind, raw = item
+                    pending[kind].append(time.perf_counter())
+                    await ws.send(raw)
+                    stats.sent[kind] += 1
+                await asyncio.sleep(self.args.drain)
+                receiver.cancel()
+        except Exception as exc:
+            stats.errors[type(exc).__name__] += 1
+
+    def _frame(self, data) -> str:
+        if isinstance(data, str) and data:
+            return data
+        return random.choice(self.frames)
+
+    async def _post_frame(self, kind: str, path: str, body: dict, session_id: Optional[str],
+                          participant_id: Optional[str]):
+        started = time.perf_counter()
+        try:
+            params = {"participant_id": participant_id} if participant_id else {}
+            if session_id:
+                params["session_id"] = await self._session(session_id)
+            res = await self.client.post(path, json=body, params=params)
+            if res.status_code == 200:
+                self.stats.latency[kind].append(time.perf_counter() - started)
+            else:
+                self.stats.errors[f"{kind}_{res.status_code}"] += 1
+        except Exception as exc:
+            self.stats.errors[type(exc).__name__] += 1
+        self.stats.sent[kind] += 1
+
+    def dispatch(self, event: list):
+        _, kind, session_id, participant_id, data = event
+        if kind == WS_OPEN:
+            self._open(session_id, participant_id)
+        elif kind == WS_MESSAGE:
+            try:
+                msg_type = json.loads(data).get("type", "unknown")
+            except (ValueError, AttributeError):
+                msg_type = "invalid"
+            self._open(session_id, participant_id).put_nowait((msg_type, data))
+        elif kind == WS_CLOSE:
+            queue = self.connections.pop((session_id, participant_id), None)
+            if queue is not None:
+                queue.put_nowait(None)
+        elif kind == FRAME:
+            body = {"frame": self._frame(data), "participant_id": participant_id}
+            self.tasks.append(asyncio.ensure_future(
+                self._post_frame("analyze_frame", "/api/analyze-frame", body, session_id, participant_id)
+            ))
+        elif kind == BATCH:
+            body = {"frames": [self._frame(f) for f in data]}
+            self.tasks.append(asyncio.ensure_future(
+                self._post_frame("analyze_batch", "/api/analyze-batch", body, session_id, participant_id)
+            ))
+
+    async def run(self, events: List[list]) -> float:
+        if any(e[1] in (FRAME, BATCH) and not isinstance(e[4], str) for e in events):
+            self.frames = [synthetic_frame() for _ in range(8)]
+        t0_recorded = events[0][0]
+        t0 = time.perf_counter()
+        for event in events:
+            if self.args.speed > 0:
+                delay = (event[0] - t0_recorded) / self.args.speed - (time.perf_counter() - t0)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self.dispatch(event)
+        for queue in self.connections.values():
+            queue.put_nowait(None)
+        await asyncio.gather(*self.tasks)
+        return time.perf_counter() - t0
+
+
+async def replay(args, server: Server, events: List[list]) -> dict:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.http_connections)
+    async with httpx.AsyncClient(base_url=server.base_url, limits=limits, timeout=60) as client:
+        elapsed = await Replayer(args, server.base_url, client, stats).run(events)
+
+    recorded_s = events[-1][0] - events[0][0]
+    return {
+        "name": args.name,
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "out")},
+        "recorded_s": round(recorded_s, 2),
+        "elapsed_s": round(elapsed, 2),
+        "sent": dict(stats.sent),
+        "throughput": {
+            **{f"sent_{k}": round(v / elapsed, 1) for k, v in stats.sent.items()},
+            "received_messages": round(stats.received / elapsed, 1),
+        },
+        "received_bytes": stats.received_bytes,
+        "latency": {k: summarize(v) for k, v in stats.latency.items()},
+        "errors": dict(stats.errors),
+        "memory": memory(server.pid),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="event log written with EVENT_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="timeline multiplier, e.g. 1 or 10; 0 = max speed")
+    parser.add_argument("--name", default="replay")
+    parser.add_argument("--uvicorn", action="store_true", help="run the app in a uvicorn subprocess")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--drain", type=float, default=1.0)
+    parser.add_argument("--http-connections", type=int, default=200)
+    parser.add_argument("--groq-latency", type=float, default=0.0)
+    parser.add_argument("--store-latency", type=float, default=0.0)
+    parser.add_argument("--out", help="result JSON path (default bench/results/<name>-<ts>.json)")
+    parser.add_argument("--baseline", help="compare against a saved result")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    events = sorted(read_events(args.log), key=lambda e: e[0])
+    if not events:
+        sys.exit(f"No events in {args.log}")
+    print(f"Replaying {len(events)} events ({events[-1][0] - events[0][0]:.1f}s recorded) at "
+          f"{'max speed' if args.speed <= 0 else f'{args.speed:g}x'}")
+
+    # Never record the replay itself
+    os.environ.pop("EVENT_RECORD_PATH", None)
+    server = Server(args)
+    server.start()
+    try:
+        result = asyncio.run(replay(args, server, events))
+    finally:
+        server.stop()
+
+    print_report(result)
+    print(f"saved {save_results(result, args.out, args.name)}")
+    if args.baseline:
+        regressions = compare(result, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
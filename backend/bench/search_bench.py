@@ -0,0 +1,98 @@
+"""
+Full-text search over a large session: incremental index vs. linear scan.
+Reports index build rate, query latency and index memory.
+
+Usage (from backend/):
+    python -m bench.search_bench --messages 100000 --queries 500
+"""
+
+import argparse
+import random
+import time
+
+from bench.common import memory, print_report, save_results, summarize
+from search_index import CHAT, TRANSCRIPT, SessionSearchIndex, tokenize
+
+WORDS = (
+    "budget roadmap launch customer feedback design review sprint deadline hiring onboarding metrics revenue "
+    "pricing demo partner contract support outage incident latency migration database frontend backend mobile "
+    "release beta testing security audit compliance marketing campaign analytics dashboard retention churn "
+    "quarter planning offsite workshop interview candidate promotion feature request bug priority estimate"
+).split()
+FILLER = "the we should and to a it is for on that this with".split()
+
+
+def synthetic_entries(n: int, participants: int, seed: int):
+    rng = random.Random(seed)
+    ts = time.time() - n
+    for i in range(n):
+        words = [rng.choice(WORDS) if rng.random() < 0.5 else rng.choice(FILLER) for _ in range(rng.randint(4, 24))]
+        yield (CHAT if i % 4 else TRANSCRIPT, f"p{i % participants}", " ".join(words), ts + i)
+
+
+def linear_search(entries, query: str, k: int):
+    """Baseline: tokenize and score every entry on each query (term-overlap count)."""
+    terms = set(tokenize(query))
+    scored = []
+    for kind, pid, text, ts in entries:
+        tokens = tokenize(text)
+        score = sum(1 for t in tokens if t in terms)
+        if score:
+            scored.append((score, ts, kind, pid, text))
+    scored.sort(reverse=True)
+    return len(scored), scored[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--linear-queries", type=int, default=20, help="the scan baseline is slow; sample fewer")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    entries = list(synthetic_entries(args.messages, args.participants, args.seed))
+    rng = random.Random(args.seed + 1)
+    queries = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(args.queries)]
+
+    rss_before = memory()["rss_bytes"]
+    index = SessionSearchIndex()
+    started = time.perf_counter()
+    for kind, pid, text, ts in entries:
+        index.add(kind, pid, text, ts)
+    build_s = time.perf_counter() - started
+    index_bytes = memory()["rss_bytes"] - rss_before
+
+    indexed, filtered, linear = [], [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, args.k)
+        indexed.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        index.search(q, args.k, participant_id="p3", kind=CHAT)
+        filtered.append(time.perf_counter() - t0)
+    for q in queries[:args.linear_queries]:
+        t0 = time.perf_counter()
+        linear_search(entries, q, args.k)
+        linear.append(time.perf_counter() - t0)
+
+    result = {
+        "config": vars(args),
+        "throughput": {"index_adds": round(args.messages / build_s, 1)},
+        "latency": {
+            "indexed_query": summarize(indexed),
+            "indexed_filtered": summarize(filtered),
+            "linear_scan": summarize(linear),
+        },
+        "memory": {"index_rss_delta_bytes": index_bytes},
+        "index": {"docs": len(index), "terms": len(index.postings)},
+    }
+    print_report(result)
+    print(f"Saved {save_results(result, args.out, 'search')}")
+
+
+if __name__ == "__main__":
+    main()
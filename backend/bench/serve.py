@@ -0,0 +1,30 @@
+"""
+Run the app under uvicorn with faked GroqAI/store, for out-of-process benches.
+
+Usage (from backend/):
+    python -m bench.serve --port 8765 --groq-latency 0.2 --store-latency 0.005
+"""
+
+import argparse
+
+import uvicorn
+
+from bench import fakes
+from ws_protocol import DeflateWebSocketProtocol
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--groq-latency", type=float, default=0.0)
+    parser.add_argument("--store-latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+
+    main_module = fakes.install(args.groq_latency, args.store_latency, args.jitter)
+    uvicorn.run(main_module.app, host=args.host, port=args.port, log_level="warning", ws=DeflateWebSocketProtocol)
+
+
+if __name__ == "__main__":
+    main()
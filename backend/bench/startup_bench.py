@@ -0,0 +1,74 @@
+"""
+Cold-start benchmark: `import main` time and first-request latency.
+
+Each run is a fresh interpreter, so nothing is cached between samples.
+
+Usage (from backend/):
+    python -m bench.startup_bench --runs 5
+    python -m bench.startup_bench --warmup emotion,groq,tts
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from bench.loadgen import synthetic_frame
+
+PROBE = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+import main
+out = {"import_s": time.perf_counter() - t0}
+from fastapi.testclient import TestClient
+
+frame = os.environ["BENCH_FRAME"]
+requests = [
+    ("health", lambda c: c.get("/health")),
+    ("first_analyze_frame", lambda c: c.post("/api/analyze-frame", json={"frame": frame})),
+    ("second_analyze_frame", lambda c: c.post("/api/analyze-frame", json={"frame": frame})),
+    ("first_summary_tts", lambda c: c.post(f"/sessions/{c.post('/sessions', json={}).json()['session_id']}/generate-summary")),
+]
+with TestClient(main.app) as client:
+    time.sleep(float(os.environ.get("BENCH_SETTLE_S", "0")))
+    for name, call in requests:
+        t = time.perf_counter()
+        call(client)
+        out[f"{name}_s"] = time.perf_counter() - t
+print("BENCH " + json.dumps(out))
+"""
+
+
+def run_once(env: dict) -> dict:
+    proc = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, timeout=300)
+    for line in proc.stdout.splitlines():
+        if line.startswith("BENCH "):
+            return json.loads(line[6:])
+    raise RuntimeError(proc.stderr[-2000:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", default="", help="WARMUP_SUBSYSTEMS for the app, e.g. emotion,groq,tts")
+    parser.add_argument("--settle", type=float, default=0.0, help="seconds to wait after startup before requests")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "STORE_BACKEND": "local",
+        "LOCAL_STORE_PATH": ":memory:",
+        "WARMUP_SUBSYSTEMS": args.warmup,
+        "BENCH_SETTLE_S": str(args.settle),
+        "BENCH_FRAME": synthetic_frame(),
+    }
+    samples = [run_once(env) for _ in range(args.runs)]
+    for key in samples[0]:
+        values = [s[key] * 1000 for s in samples]
+        print(f"{key:>26}: median {statistics.median(values):8.1f} ms  min {min(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
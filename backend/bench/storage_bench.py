@@ -0,0 +1,78 @@
+"""
+LocalStore benchmark: batched write throughput and cold-restore time.
+
+Usage (from backend/):
+    python -m bench.storage_bench --sessions 10000 --chat 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from local_store import LocalStore
+
+
+def run(n_sessions: int, chat_per_session: int, transcript_per_session: int, db_path: str) -> dict:
+    store = LocalStore(db_path)
+    now = time.time()
+
+    started = time.perf_counter()
+    for i in range(n_sessions):
+        sid = f"session-{i}"
+        store.save_session(sid, {
+            "session_id": sid,
+            "name": f"Bench {i}",
+            "created_at": now,
+            "ended_at": None,
+            "participants": {f"p{j}": {"participant_id": f"p{j}", "display_name": f"User {j}"} for j in range(4)},
+            "transcript": [],
+            "stt_enabled": False,
+        })
+    session_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = 0
+    for i in range(n_sessions):
+        sid = f"session-{i}"
+        for j in range(chat_per_session):
+            store.save_chat(sid, f"p{j % 4}", f"message {j} about pricing and roadmap", now + j)
+            rows += 1
+        for j in range(transcript_per_session):
+            store.save_transcript(sid, {"participant_id": f"p{j % 4}", "timestamp": now + j, "text": f"spoken line {j}"})
+            rows += 1
+    store.flush()
+    rows_s = time.perf_counter() - started
+    store.close()
+
+    # Cold restore: fresh connection, as on process start
+    started = time.perf_counter()
+    restored = LocalStore(db_path).load_active_sessions()
+    restore_s = time.perf_counter() - started
+
+    return {
+        "sessions": n_sessions,
+        "session_writes_per_s": round(n_sessions / session_s),
+        "rows": rows,
+        "row_writes_per_s": round(rows / rows_s),
+        "restored_sessions": len(restored),
+        "cold_restore_s": round(restore_s, 3),
+        "db_bytes": os.path.getsize(db_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--chat", type=int, default=20)
+    parser.add_argument("--transcript", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run(args.sessions, args.chat, args.transcript, os.path.join(tmp, "bench.db"))
+    for key, value in result.items():
+        print(f"{key:>22}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Outbound broadcast bytes per session under different subscription mixes.
+
+Drives session_update broadcasts through main._broadcast in real time
+(every participant signalling at --signal-hz) to in-process sockets that
+only count bytes, so the numbers isolate routing and encoding.
+
+Usage (from backend/):
+    python -m bench.subscription_bench --participants 20 --duration 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from bench import fakes
+from bench.common import save_results, summarize
+
+MIXES = {
+    "all_full": lambda i: None,
+    "attendees_summary_only": lambda i: None if i == 0 else {"summary_only": True},
+    "attendees_summary_2hz": lambda i: None if i == 0 else {"summary_only": True, "max_hz": 2},
+    "host_two_participants": lambda i: {"participants": "p1,p2"} if i == 0 else {"summary_only": True},
+}
+
+
+class CountingSocket:
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        self.messages += 1
+        self.bytes += len(text)
+
+
+async def run_mix(main, mix: str, args) -> dict:
+    from subscriptions import Subscription
+
+    session_id = f"bench-{mix}"
+    session = main.SessionState(session_id=session_id, name=mix, created_at=time.time(),
+                                host_id="p0", host_display_name="host")
+    main.sessions[session_id] = session
+    sockets = []
+    for i in range(args.participants):
+        pid = f"p{i}"
+        session.participants[pid] = main.ParticipantState(participant_id=pid, display_name=f"user {i}")
+        ws = CountingSocket()
+        spec = MIXES[mix](i)
+        if spec:
+            subscription = Subscription()
+            subscription.update(spec)
+            main.socket_subscriptions[ws] = subscription
+        sockets.append(ws)
+    main.session_connections[session_id] = sockets
+
+    interval = 1.0 / (args.signal_hz * args.participants)
+    latencies = []
+    started = time.perf_counter()
+    next_at = started
+    while time.perf_counter() - started < args.duration:
+        pid = f"p{random.randrange(args.participants)}"
+        signal = main.SignalPayload(engagement=random.random(), confusion=random.random(), stress=random.random())
+        session.participants[pid].latest_signal = signal
+        t0 = time.perf_counter()
+        await main._broadcast(session_id, {
+            "type": "session_update",
+            "payload": {
+                "participant_id": pid,
+                "display_name": session.participants[pid].display_name,
+                "signal": signal.model_dump(),
+                "summary": main._compute_session_summary(session),
+            },
+        })
+        latencies.append(time.perf_counter() - t0)
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    elapsed = time.perf_counter() - started
+
+    for ws in sockets:
+        main.socket_subscriptions.pop(ws, None)
+    main._forget_session(session_id)
+    return {
+        "broadcasts": len(latencies),
+        "bytes_per_session_s": round(sum(ws.bytes for ws in sockets) / elapsed, 1),
+        "messages_per_session_s": round(sum(ws.messages for ws in sockets) / elapsed, 1),
+        "host_bytes_s": round(sockets[0].bytes / elapsed, 1),
+        "broadcast": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--signal-hz", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    app = fakes.install()
+    results = {}
+    for mix in MIXES:
+        results[mix] = asyncio.run(run_mix(app, mix, args))
+        r = results[mix]
+        print(f"{mix:>24}: {r['bytes_per_session_s'] / 1024:8.1f} KiB/s  {r['messages_per_session_s']:7.1f} msg/s  "
+              f"host {r['host_bytes_s'] / 1024:6.1f} KiB/s  broadcast p50={r['broadcast']['p50_ms']:.3f}ms")
+    baseline = results["all_full"]["bytes_per_session_s"]
+    for mix, r in results.items():
+        r["bytes_vs_all_full"] = round(r["bytes_per_session_s"] / baseline, 3) if baseline else None
+    print(f"Saved {save_results({'config': vars(args), 'mixes': results}, args.out, 'subscriptions')}")
+
+
+if __name__ == "__main__":
+    main()
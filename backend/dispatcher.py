@@ -0,0 +1,319 @@
+"""
+Session-affinity launcher and front door for multi-process deployments.
+- Spawns N uvicorn workers (main:app) on local ports and restarts any that die
+- Proxies TCP connections, routing by session_id taken from /sessions/{id}/...,
+  /ws/{id}/... or a ?session_id= query, via a consistent-hash ring
+- POST /sessions gets its id assigned here (X-Session-Id) so the new session
+  is created on the worker that will own it
+- Sessions stay pinned to the worker that served them; when a worker dies its
+  sessions move to the next live worker on the ring (and restore from the
+  store there), and new sessions reach it again once it is back
+- A restarted worker skips the startup restore: its old sessions are live on
+  the failover worker, and anything still routed to it restores on demand
+- Workers tag responses with X-ConvoWeave-Worker (WorkerHeaderMiddleware)
+- X-Forwarded-For is replaced with the client's address, since workers only
+  see the dispatcher's; they trust it (TRUST_FORWARDED_FOR) for rate limits
+
+Usage (from backend/):
+    python dispatcher.py --workers 4 --port 8000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import os
+import re
+import subprocess
+import sys
+import time
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+VNODES = 64
+MAX_HEAD_BYTES = 64 * 1024
+MAX_PINNED_SESSIONS = 100_000
+PIPE_CHUNK = 64 * 1024
+
+_SESSION_PATH = re.compile(r"^/(?:sessions|ws)/([^/?#]+)")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring over worker indexes, with virtual nodes."""
+
+    def __init__(self, nodes: int, vnodes: int = VNODES):
+        points = sorted((_hash(f"worker-{n}#{v}"), n) for n in range(nodes) for v in range(vnodes))
+        self._keys = [p for p, _ in points]
+        self._nodes = [n for _, n in points]
+        self.size = nodes
+
+    def owner(self, key: str, alive: Optional[List[bool]] = None) -> Optional[int]:
+        """First live node clockwise from hash(key)."""
+        start = bisect_right(self._keys, _hash(key))
+        for i in range(len(self._keys)):
+            node = self._nodes[(start + i) % len(self._keys)]
+            if alive is None or alive[node]:
+                return node
+        return None
+
+
+WORKER_HEADER = b"x-convoweave-worker"
+
+
+def owns_session(session_id: str) -> bool:
+    """Whether this worker owns a session on the full ring (True when not dispatched)."""
+    workers = os.getenv("CONVOWEAVE_WORKERS")
+    if not workers:
+        return True
+    return HashRing(int(workers)).owner(session_id) == int(os.getenv("CONVOWEAVE_WORKER_ID", "0"))
+
+
+def restarted_worker() -> bool:
+    """Whether the dispatcher respawned this worker after it died."""
+    return os.getenv("CONVOWEAVE_WORKER_RESTART") == "1"
+
+
+class WorkerHeaderMiddleware:
+    """ASGI middleware naming the worker on HTTP responses and WebSocket accepts."""
+
+    def __init__(self, app):
+        self.app = app
+        worker_id = os.getenv("CONVOWEAVE_WORKER_ID")
+        self.header = (WORKER_HEADER, worker_id.encode()) if worker_id and os.getenv("CONVOWEAVE_WORKERS") else None
+
+    async def __call__(self, scope, receive, send):
+        if self.header is None or scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        async def tagged(message):
+            if message["type"] in ("http.response.start", "websocket.accept"):
+                message = {**message, "headers": [*message.get("headers", []), self.header]}
+            await send(message)
+
+        await self.app(scope, receive, tagged)
+
+
+def session_from_target(target: str) -> Optional[str]:
+    parts = urlsplit(target)
+    match = _SESSION_PATH.match(parts.path)
+    if match:
+        return match.group(1)
+    query = parse_qs(parts.query).get("session_id")
+    return query[0] if query else None
+
+
+def _rewrite_head(head: bytes, set_headers: Dict[bytes, bytes]) -> bytes:
+    """Replace (or add) headers in a raw HTTP/1.x request head."""
+    lines = head[:-4].split(b"\r\n")
+    names = {k.lower() for k in set_headers}
+    kept = [lines[0]] + [l for l in lines[1:] if l.split(b":", 1)[0].strip().lower() not in names]
+    kept += [k + b": " + v for k, v in set_headers.items()]
+    return b"\r\n".join(kept) + b"\r\n\r\n"
+
+
+class Worker:
+    def __init__(self, index: int, port: int):
+        self.index = index
+        self.port = port
+        self.proc: Optional[subprocess.Popen] = None
+        self.alive = False
+        self.restarts = 0
+
+
+class Dispatcher:
+    def __init__(self, workers: int, host: str = "0.0.0.0", port: int = 8000, base_port: int = 9100,
+                 app: str = "main:app"):
+        self.host = host
+        self.port = port
+        self.app = app
+        self.workers = [Worker(i, base_port + i) for i in range(workers)]
+        self.ring = HashRing(workers)
+        self.pinned: "OrderedDict[str, int]" = OrderedDict()
+        self._round_robin = itertools.cycle(range(workers))
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    # ----------------------------
+    # Workers
+    # ----------------------------
+
+    def _spawn(self, worker: Worker, restart: bool = False):
+        env = {
+            **os.environ,
+            "CONVOWEAVE_WORKER_ID": str(worker.index),
+            "CONVOWEAVE_WORKERS": str(len(self.workers)),
+            "CONVOWEAVE_WORKER_RESTART": "1" if restart else "0",
+            "TRUST_SESSION_ID_HEADER": "1",
+            "TRUST_FORWARDED_FOR": "1",
+        }
+        worker.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--host", "127.0.0.1",
+             "--port", str(worker.port), "--log-level", "warning",
+             "--ws", "ws_protocol:DeflateWebSocketProtocol"],
+            env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+
+    async def _ready(self, worker: Worker, timeout: float = 60.0) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if worker.proc.poll() is not None:
+                return False
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", worker.port)
+                writer.close()
+                return True
+            except OSError:
+                await asyncio.sleep(0.1)
+        return False
+
+    async def _start_worker(self, worker: Worker, restart: bool = False):
+        self._spawn(worker, restart)
+        worker.alive = await self._ready(worker)
+        state = "up" if worker.alive else "failed to start"
+        print(f"✓ Worker {worker.index} on :{worker.port} {state}")
+
+    async def _supervise(self, interval: float = 1.0):
+        while True:
+            await asyncio.sleep(interval)
+            for worker in self.workers:
+                if worker.proc is not None and worker.proc.poll() is None:
+                    continue
+                # Take it off the ring first so its sessions fail over immediately
+                worker.alive = False
+                worker.restarts += 1
+                print(f"⚠ Worker {worker.index} exited; restarting")
+                await self._start_worker(worker, restart=True)
+
+    # ----------------------------
+    # Routing
+    # ----------------------------
+
+    def route(self, session_id: Optional[str]) -> Optional[Worker]:
+        alive = [w.alive for w in self.workers]
+        if session_id is None:
+            for _ in range(len(self.workers)):
+                worker = self.workers[next(self._round_robin)]
+                if worker.alive:
+                    return worker
+            return None
+
+        index = self.pinned.get(session_id)
+        if index is None or not alive[index]:
+            index = self.ring.owner(session_id, alive)
+            if index is None:
+                return None
+            self.pinned[session_id] = index
+            if len(self.pinned) > MAX_PINNED_SESSIONS:
+                self.pinned.popitem(last=False)
+        else:
+            self.pinned.move_to_end(session_id)
+        return self.workers[index]
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while True:
+            chunk = await reader.read(PIPE_CHUNK)
+            if not chunk:
+                return
+            writer.write(chunk)
+            await writer.drain()
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        upstream_writer = None
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+            request_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+            method, target, _ = request_line.split(" ", 2)
+            lowered = head.lower()
+            upgrade = b"\r\nupgrade:" in lowered
+
+            session_id = session_from_target(target)
+            peer = client_writer.get_extra_info("peername")
+            # Overwrite whatever the client sent: workers trust this header
+            extra: Dict[bytes, bytes] = {b"X-Forwarded-For": (peer[0] if peer else "unknown").encode()}
+            if method == "POST" and urlsplit(target).path.rstrip("/") == "/sessions":
+                session_id = str(uuid.uuid4())
+                extra[b"X-Session-Id"] = session_id.encode()
+            if not upgrade:
+                # One request per upstream connection: the next request on a
+                # keep-alive connection may belong to a different session
+                extra[b"Connection"] = b"close"
+            head = _rewrite_head(head, extra)
+
+            worker = self.route(session_id)
+            if worker is None:
+                client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await client_writer.drain()
+                return
+
+            upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", worker.port)
+            upstream_writer.write(head)
+            to_upstream = asyncio.ensure_future(self._pipe(client_reader, upstream_writer))
+            to_client = asyncio.ensure_future(self._pipe(upstream_reader, client_writer))
+            _, pending = await asyncio.wait({to_upstream, to_client}, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            for writer in (upstream_writer, client_writer):
+                if writer is not None:
+                    writer.close()
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+
+    async def start(self):
+        await asyncio.gather(*(self._start_worker(w) for w in self.workers))
+        self._supervisor = asyncio.ensure_future(self._supervise())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEAD_BYTES)
+        print(f"✓ Dispatcher on {self.host}:{self.port} -> {len(self.workers)} workers")
+
+    async def stop(self):
+        if self._supervisor:
+            self._supervisor.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for worker in self.workers:
+            worker.alive = False
+            if worker.proc and worker.proc.poll() is None:
+                worker.proc.terminate()
+        for worker in self.workers:
+            if worker.proc:
+                try:
+                    worker.proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    worker.proc.kill()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--base-port", type=int, default=9100, help="workers listen on base-port + index")
+    args = parser.parse_args()
+    try:
+        asyncio.run(Dispatcher(args.workers, args.host, args.port, args.base_port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
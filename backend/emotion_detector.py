@@ -1,11 +1,22 @@
 """
-Facial emotion detection using MediaPipe + simple heuristics.
-In production, replace with actual ML model (e.g., DeepFace, FER2013).
+Facial emotion detection: MediaPipe Face Mesh landmarks scored by a
+pluggable model backend (emotion_model.py: hand-tuned heuristic, quantized
+NumPy MLP or ONNX). Without MediaPipe, frames are scored by a deterministic
+face-box model instead.
+detect()/detect_batch() are called from threadpool threads; Face Mesh (which
+tracks across frames) and the face-box cascade run one frame at a time.
 """
 
+import threading
+from time import perf_counter
+from typing import List, Optional
+
 import cv2
 import numpy as np
 
+from emotion_model import N_FEATURES, NO_FACE, OUTPUTS, FaceBoxModel, landmark_features, load_model
+from metrics import EMOTION_BATCH_SIZE, EMOTION_DETECT_SECONDS, EMOTION_MODEL_SECONDS, timed
+
 try:
     from mediapipe.python.solutions import face_mesh as mp_face_mesh
     from mediapipe.python.solutions import drawing_utils as mp_drawing
@@ -25,6 +36,9 @@ class EmotionDetector:
     def __init__(self):
         self.face_mesh = None
         self.drawing = None
+        self.model = None
+        self.fallback: Optional[FaceBoxModel] = None
+        self._lock = threading.Lock()
         
         if MEDIAPIPE_AVAILABLE:
             try:
@@ -41,92 +55,64 @@ class EmotionDetector:
                 print(f"Error initializing MediaPipe: {e}")
                 self.face_mesh = None
 
+        if self.face_mesh:
+            self.model = load_model()
+        else:
+            self.fallback = FaceBoxModel()
+
+    def _features(self, frame) -> Optional[np.ndarray]:
+        """Landmark feature vector for the first face, or None if there is none."""
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with self._lock:
+            results = self.face_mesh.process(rgb_frame)
+        if not results.multi_face_landmarks:
+            return None
+        return landmark_features(results.multi_face_landmarks[0].landmark)
+
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        started = perf_counter()
+        scores = self.model.predict(features)
+        EMOTION_MODEL_SECONDS.labels(self.model.name).observe(perf_counter() - started)
+        EMOTION_BATCH_SIZE.observe(len(features))
+        return scores
+
+    @staticmethod
+    def _result(scores) -> dict:
+        return {name: round(float(v), 3) for name, v in zip(OUTPUTS, scores)}
+
+    @timed(EMOTION_DETECT_SECONDS)
     def detect(self, frame):
         """
         Analyze frame and return engagement, confusion, stress scores (0-1).
         Returns: {"engagement": float, "confusion": float, "stress": float}
         """
         if not self.face_mesh:
-            # Fallback: return random but plausible values
-            return {
-                "engagement": np.random.uniform(0.5, 0.9),
-                "confusion": np.random.uniform(0.0, 0.3),
-                "stress": np.random.uniform(0.0, 0.2),
-            }
-        
-        h, w, c = frame.shape
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
-
-        if not results.multi_face_landmarks or len(results.multi_face_landmarks) == 0:
-            return {"engagement": 0.0, "confusion": 0.0, "stress": 0.0}
+            with self._lock:
+                return self.fallback.score(frame)
 
-        landmarks = results.multi_face_landmarks[0].landmark
+        features = self._features(frame)
+        if features is None:
+            return dict(NO_FACE)
+        return self._result(self._predict(features[None])[0])
 
-        # Extract key points (normalized 0-1 coords)
-        left_eye = np.array([[lm.x, lm.y] for lm in [landmarks[33], landmarks[133]]])
-        right_eye = np.array([[lm.x, lm.y] for lm in [landmarks[362], landmarks[263]]])
-        mouth = np.array([[landmarks[13].x, landmarks[13].y]])
-        nose = np.array([[landmarks[1].x, landmarks[1].y]])
+    def detect_batch(self, frames: List[np.ndarray]) -> List[dict]:
+        """detect() for several frames, with one model call for all faces found."""
+        if not self.face_mesh:
+            with self._lock:
+                return [self.fallback.score(frame) for frame in frames]
 
-        # Enhanced heuristics with better responsiveness
-        
-        # Engagement: eye openness + attention (wider range)
-        left_eye_open = abs(landmarks[145].y - landmarks[159].y)  # left eye vertical
-        right_eye_open = abs(landmarks[374].y - landmarks[386].y)  # right eye vertical
-        avg_eye_openness = (left_eye_open + right_eye_open) / 2
-        
-        # Head tilt (more forward = more engaged)
-        nose_y = landmarks[1].y
-        chin_y = landmarks[152].y
-        head_tilt = abs(chin_y - nose_y)
-        
-        # Combine eye openness + head position (amplified for visibility)
-        engagement = min(1.0, max(0.0, (avg_eye_openness * 15 + head_tilt * 3) / 2))
-        
-        # Confusion: eyebrow raise + asymmetry + mouth shape
-        left_brow_y = landmarks[70].y
-        right_brow_y = landmarks[300].y
-        left_eye_top = landmarks[159].y
-        right_eye_top = landmarks[386].y
-        
-        # Distance between eyebrows and eyes (raised = confused)
-        left_brow_raise = abs(left_brow_y - left_eye_top)
-        right_brow_raise = abs(right_brow_y - right_eye_top)
-        avg_brow_raise = (left_brow_raise + right_brow_raise) / 2
-        
-        # Eyebrow asymmetry
-        brow_asymmetry = abs(left_brow_y - right_brow_y)
-        
-        # Mouth shape (slightly open = confused)
-        mouth_open = abs(landmarks[13].y - landmarks[14].y)
-        
-        confusion = min(1.0, max(0.0, (avg_brow_raise * 20 + brow_asymmetry * 10 + mouth_open * 5)))
-        
-        # Stress: jaw tension + eyebrow furrow + mouth tightness
-        # Jaw width (tense jaw = narrower)
-        left_jaw = landmarks[234].x
-        right_jaw = landmarks[454].x
-        jaw_width = abs(right_jaw - left_jaw)
-        jaw_tension = max(0.0, 1.0 - jaw_width * 2)  # inverted (narrower = more stress)
-        
-        # Eyebrow furrow (inner brows closer = stress)
-        inner_left_brow = landmarks[70].x
-        inner_right_brow = landmarks[300].x
-        brow_furrow = max(0.0, 1.0 - abs(inner_right_brow - inner_left_brow) * 3)
-        
-        # Lip tightness
-        upper_lip = landmarks[13].y
-        lower_lip = landmarks[14].y
-        lip_tight = max(0.0, 1.0 - abs(upper_lip - lower_lip) * 10)
-        
-        stress = min(1.0, max(0.0, (jaw_tension * 0.4 + brow_furrow * 0.4 + lip_tight * 0.2)))
+        features = [self._features(frame) for frame in frames]
+        found = [f for f in features if f is not None]
+        scores = iter(self._predict(np.stack(found)) if found else ())
+        return [self._result(next(scores)) if f is not None else dict(NO_FACE) for f in features]
 
-        return {
-            "engagement": round(float(engagement), 3),
-            "confusion": round(float(confusion), 3),
-            "stress": round(float(stress), 3),
-        }
+    def warm_up(self):
+        """Run the model (or fallback) once so the first real frame pays no setup cost."""
+        if self.model is not None:
+            self.model.predict(np.zeros((1, N_FEATURES), dtype=np.float32))
+            self.model.predict(np.zeros((8, N_FEATURES), dtype=np.float32))
+        if self.fallback is not None:
+            self.fallback.score(np.zeros((240, 320, 3), dtype=np.uint8))
 
     def draw(self, frame):
         """Draw landmarks on frame for debugging."""
@@ -135,7 +121,8 @@ class EmotionDetector:
             
         h, w, c = frame.shape
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
+        with self._lock:
+            results = self.face_mesh.process(rgb_frame)
         if results.multi_face_landmarks:
             for landmarks in results.multi_face_landmarks:
                 self.drawing.draw_landmarks(frame, landmarks, mp_face_mesh.FACEMESH_TESSELATION)
@@ -0,0 +1,218 @@
+"""
+Pluggable scoring backends for EmotionDetector.
+- A backend maps a batch of face-landmark feature vectors, shape (N, F), to
+  engagement / confusion / stress scores, shape (N, 3), in [0, 1]
+- EMOTION_MODEL picks one: heuristic (the hand-tuned landmark rules), mlp
+  (a small int8-quantized MLP run with NumPy, from an .npz written by
+  save_mlp; see bench/distill_emotion.py), onnx (any ONNX model over the
+  same features, needs `onnxruntime`), or auto: by EMOTION_MODEL_PATH's
+  extension, heuristic when unset
+- EMOTION_MODEL_THREADS caps intra-op threads (ONNX Runtime, or NumPy's BLAS
+  through `threadpoolctl` when installed); tiny batches run fastest on one
+- Without MediaPipe there are no landmarks: FaceBoxModel scores whole frames
+  deterministically from OpenCV's Haar face detector instead
+"""
+
+import os
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+EMOTION_MODEL = os.getenv("EMOTION_MODEL", "auto")
+EMOTION_MODEL_PATH = os.getenv("EMOTION_MODEL_PATH", "")
+EMOTION_MODEL_THREADS = int(os.getenv("EMOTION_MODEL_THREADS", "1"))
+
+OUTPUTS = ("engagement", "confusion", "stress")
+
+# MediaPipe Face Mesh indices the features are built from (x, y each)
+FEATURE_LANDMARKS = (1, 10, 13, 14, 33, 61, 70, 105, 133, 145, 152, 159, 234, 263, 291, 300, 334, 362, 374, 386, 454)
+N_FEATURES = 2 * len(FEATURE_LANDMARKS)
+_AT = {lm: i for i, lm in enumerate(FEATURE_LANDMARKS)}
+
+
+def landmark_features(landmarks) -> np.ndarray:
+    """Feature vector (normalized x, y per FEATURE_LANDMARKS) from one face's landmarks."""
+    return np.array([(landmarks[i].x, landmarks[i].y) for i in FEATURE_LANDMARKS], dtype=np.float32).ravel()
+
+
+# ----------------------------
+# Landmark backends
+# ----------------------------
+
+class HeuristicModel:
+    """The original hand-tuned rules, vectorized over the batch."""
+
+    name = "heuristic"
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        p = np.asarray(features, dtype=np.float64).reshape(len(features), -1, 2)
+        x = lambda lm: p[:, _AT[lm], 0]
+        y = lambda lm: p[:, _AT[lm], 1]
+
+        # Engagement: eye openness + head tilt (more forward = more engaged)
+        avg_eye_openness = (np.abs(y(145) - y(159)) + np.abs(y(374) - y(386))) / 2
+        head_tilt = np.abs(y(152) - y(1))
+        engagement = (avg_eye_openness * 15 + head_tilt * 3) / 2
+
+        # Confusion: eyebrow raise + asymmetry + slightly open mouth
+        avg_brow_raise = (np.abs(y(70) - y(159)) + np.abs(y(300) - y(386))) / 2
+        brow_asymmetry = np.abs(y(70) - y(300))
+        mouth_open = np.abs(y(13) - y(14))
+        confusion = avg_brow_raise * 20 + brow_asymmetry * 10 + mouth_open * 5
+
+        # Stress: jaw tension (narrower) + eyebrow furrow + lip tightness
+        jaw_tension = np.maximum(0.0, 1.0 - np.abs(x(454) - x(234)) * 2)
+        brow_furrow = np.maximum(0.0, 1.0 - np.abs(x(300) - x(70)) * 3)
+        lip_tight = np.maximum(0.0, 1.0 - mouth_open * 10)
+        stress = jaw_tension * 0.4 + brow_furrow * 0.4 + lip_tight * 0.2
+
+        return np.clip(np.stack([engagement, confusion, stress], axis=1), 0.0, 1.0)
+
+
+class MLPModel:
+    """ReLU MLP with a sigmoid head; int8 weights are dequantized once at load."""
+
+    name = "mlp"
+
+    def __init__(self, path: str):
+        with np.load(path) as data:
+            self.mean = data["mean"].astype(np.float32)
+            self.scale = (1.0 / data["std"]).astype(np.float32)
+            self.layers: List[Tuple[np.ndarray, np.ndarray]] = []
+            i = 0
+            while f"w{i}" in data:
+                w = data[f"w{i}"].astype(np.float32)
+                if f"w{i}_scale" in data:
+                    w *= data[f"w{i}_scale"].astype(np.float32)
+                self.layers.append((np.ascontiguousarray(w), data[f"b{i}"].astype(np.float32)))
+                i += 1
+        if not self.layers or self.layers[0][0].shape[0] != N_FEATURES or self.layers[-1][0].shape[1] != len(OUTPUTS):
+            raise ValueError(f"{path}: expected a {N_FEATURES} -> {len(OUTPUTS)} MLP")
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        h = (np.asarray(features, dtype=np.float32) - self.mean) * self.scale
+        for w, b in self.layers[:-1]:
+            h = np.maximum(h @ w + b, 0.0)
+        w, b = self.layers[-1]
+        return 1.0 / (1.0 + np.exp(-(h @ w + b)))
+
+
+def save_mlp(path: str, mean: np.ndarray, std: np.ndarray, layers: Sequence[Tuple[np.ndarray, np.ndarray]],
+             quantize: bool = True):
+    """Write weights in MLPModel's format; int8 with a per-output-unit scale when quantizing."""
+    arrays = {"mean": np.asarray(mean, np.float32), "std": np.asarray(std, np.float32)}
+    for i, (w, b) in enumerate(layers):
+        w = np.asarray(w, np.float32)
+        if quantize:
+            scale = np.maximum(np.abs(w).max(axis=0), 1e-8) / 127.0
+            arrays[f"w{i}"] = np.round(w / scale).astype(np.int8)
+            arrays[f"w{i}_scale"] = scale.astype(np.float32)
+        else:
+            arrays[f"w{i}"] = w
+        arrays[f"b{i}"] = np.asarray(b, np.float32)
+    np.savez(path, **arrays)
+
+
+class OnnxModel:
+    """Any ONNX model taking float32 (N, N_FEATURES) and returning (N, 3)."""
+
+    name = "onnx"
+
+    def __init__(self, path: str, threads: int = EMOTION_MODEL_THREADS):
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        out = self.session.run(None, {self.input_name: np.asarray(features, dtype=np.float32)})[0]
+        return np.clip(out, 0.0, 1.0)
+
+
+def load_model(kind: str = EMOTION_MODEL, path: str = EMOTION_MODEL_PATH, threads: int = EMOTION_MODEL_THREADS):
+    """The configured landmark backend, or the heuristic if it can't be loaded."""
+    if kind == "auto":
+        kind = ("onnx" if path.endswith(".onnx") else "mlp") if path else "heuristic"
+    try:
+        if kind == "mlp":
+            if THREADPOOLCTL_AVAILABLE:
+                threadpool_limits(threads)
+            model = MLPModel(path)
+        elif kind == "onnx":
+            if not ONNXRUNTIME_AVAILABLE:
+                raise ImportError("onnxruntime is not installed")
+            model = OnnxModel(path, threads)
+        else:
+            model = HeuristicModel()
+    except Exception as e:
+        print(f"⚠ Emotion model '{kind}' unavailable ({e}); using heuristic")
+        return HeuristicModel()
+    print(f"✓ Emotion model: {model.name}" + (f" ({path})" if model.name != "heuristic" else ""))
+    return model
+
+
+# ----------------------------
+# Frame fallback (no MediaPipe)
+# ----------------------------
+
+NO_FACE = {"engagement": 0.0, "confusion": 0.0, "stress": 0.0}
+# Confusion and stress can't be read off a face box; report the usual resting values
+CONFUSION_PRIOR = 0.2
+STRESS_PRIOR = 0.1
+
+
+class FaceBoxModel:
+    """
+    Engagement from the largest detected face's size and centering; fixed
+    confusion/stress priors. Deterministic: the same frame always scores the
+    same, and a frame without a face scores as no face.
+    """
+
+    name = "facebox"
+
+    def __init__(self, width: int = 160):
+        import cv2
+
+        self.cv2 = cv2
+        self.width = width
+        cascades = getattr(getattr(cv2, "data", None), "haarcascades", "")
+        path = os.path.join(cascades, "haarcascade_frontalface_default.xml")
+        self.cascade = cv2.CascadeClassifier(path) if os.path.exists(path) else None
+        self.enabled = self.cascade is not None and not self.cascade.empty()
+        if not self.enabled:
+            print("⚠ Haar face cascade not found; frames will score as no face")
+
+    def score(self, frame) -> dict:
+        if not self.enabled or frame is None:
+            return dict(NO_FACE)
+        cv2 = self.cv2
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, round(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=4, minSize=(20, 20))
+        if len(faces) == 0:
+            return dict(NO_FACE)
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        sh, sw = gray.shape
+        size = min(1.0, (fw * fh) / (sw * sh) / 0.15)
+        off_center = np.hypot((fx + fw / 2) / sw - 0.5, (fy + fh / 2) / sh - 0.5) / 0.7071
+        engagement = 0.3 + 0.4 * size + 0.3 * (1.0 - off_center)
+        return {
+            "engagement": round(float(min(1.0, engagement)), 3),
+            "confusion": CONFUSION_PRIOR,
+            "stress": STRESS_PRIOR,
+        }
@@ -0,0 +1,92 @@
+"""
+Opt-in recorder of inbound session traffic, for replaying real sessions.
+- Enabled by EVENT_RECORD_PATH; appends one compact JSON array per event:
+    [timestamp, kind, session_id, participant_id, data]
+- WebSocket opens, messages (verbatim) and closes; frame analysis requests
+- Frame images are only kept with EVENT_RECORD_FRAMES=1, otherwise just their
+  size, and replay substitutes synthetic frames
+Replay a log with bench/replay.py.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+RECORD_PATH = os.getenv("EVENT_RECORD_PATH")
+RECORD_FRAMES = os.getenv("EVENT_RECORD_FRAMES") == "1"
+FLUSH_INTERVAL_S = 1.0
+
+WS_OPEN = "open"
+WS_MESSAGE = "ws"
+WS_CLOSE = "close"
+FRAME = "frame"
+BATCH = "batch"
+
+
+class EventRecorder:
+    def __init__(self, path: Optional[str] = RECORD_PATH, frames: bool = RECORD_FRAMES):
+        self.enabled = bool(path)
+        self.path = path
+        self.frames = frames
+        self.events = 0
+        self._fp = None
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+        if self.enabled:
+            self._fp = open(path, "a", encoding="utf-8", buffering=1 << 16)
+            print(f"✓ Recording session events to {path}")
+
+    def _write(self, kind: str, session_id: Optional[str], participant_id: Optional[str], data: Any = None):
+        now = time.time()
+        line = json.dumps([round(now, 4), kind, session_id, participant_id, data], separators=(",", ":"))
+        with self._lock:
+            if self._fp is None:
+                return
+            self._fp.write(line + "\n")
+            self.events += 1
+            if now - self._last_flush >= FLUSH_INTERVAL_S:
+                self._fp.flush()
+                self._last_flush = now
+
+    def ws_open(self, session_id: str, participant_id: str):
+        self._write(WS_OPEN, session_id, participant_id)
+
+    def ws_message(self, session_id: str, participant_id: str, raw: str):
+        self._write(WS_MESSAGE, session_id, participant_id, raw)
+
+    def ws_close(self, session_id: str, participant_id: str):
+        self._write(WS_CLOSE, session_id, participant_id)
+
+    def _frame_data(self, frame: Any) -> Any:
+        # Recorded before validation, so entries may be anything JSON allows
+        if self.frames:
+            return frame
+        return len(frame) if isinstance(frame, str) else 0
+
+    def frame(self, data: dict, session_id: Optional[str] = None, participant_id: Optional[str] = None):
+        participant_id = participant_id or data.get("participant_id")
+        self._write(FRAME, session_id, participant_id, self._frame_data(data.get("frame")))
+
+    def batch(self, data: dict, session_id: Optional[str] = None, participant_id: Optional[str] = None):
+        self._write(BATCH, session_id, participant_id, [self._frame_data(f) for f in data.get("frames", [])])
+
+    def close(self):
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+
+def read_events(path: str) -> Iterator[List[Any]]:
+    """Events from a recorded log, skipping a torn final line."""
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+recorder = EventRecorder()
@@ -5,9 +5,11 @@ Stores sessions, participants, signals, chat logs with auto-expiry.
 
 import os
 import json
-from typing import Dict, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 from datetime import datetime, timedelta
 
+from metrics import STORE_WRITE_SECONDS, timed
+
 try:
     import firebase_admin
     from firebase_admin import db, credentials
@@ -29,12 +31,13 @@ class FirebaseStore:
             db_url = os.getenv("FIREBASE_DB_URL")
             firebase_admin.initialize_app(cred, {"databaseURL": db_url})
 
+    @timed(STORE_WRITE_SECONDS.labels("firebase", "save_session"))
     def save_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
-        """Save session to Firebase (or mock)."""
+        """Save the session snapshot; update(), so the chat/transcript pushed under it survive."""
         if not self.enabled:
             return True  # mock success
         try:
-            db.reference(f"sessions/{session_id}").set({
+            db.reference(f"sessions/{session_id}").update({
                 **session_data,
                 "saved_at": datetime.utcnow().isoformat(),
             })
@@ -43,6 +46,7 @@ class FirebaseStore:
             print(f"Firebase save error: {e}")
             return False
 
+    @timed(STORE_WRITE_SECONDS.labels("firebase", "save_signal"))
     def save_signal(self, session_id: str, participant_id: str, signal: Dict[str, Any]) -> bool:
         """Append signal to participant's history."""
         if not self.enabled:
@@ -54,6 +58,19 @@ class FirebaseStore:
             print(f"Firebase signal error: {e}")
             return False
 
+    @timed(STORE_WRITE_SECONDS.labels("firebase", "save_signal_rollups"))
+    def save_signal_rollups(self, session_id: str, resolution: int, chunk: int, blob: str) -> bool:
+        """Store one compressed columnar rollup chunk (see signal_history.py)."""
+        if not self.enabled:
+            return True
+        try:
+            db.reference(f"signal_history/{session_id}/{resolution}s/{chunk}").set(blob)
+            return True
+        except Exception as e:
+            print(f"Firebase rollup error: {e}")
+            return False
+
+    @timed(STORE_WRITE_SECONDS.labels("firebase", "save_chat"))
     def save_chat(self, session_id: str, participant_id: str, message: str, timestamp: float) -> bool:
         """Append chat message."""
         if not self.enabled:
@@ -69,12 +86,121 @@ class FirebaseStore:
             print(f"Firebase chat error: {e}")
             return False
 
+    @timed(STORE_WRITE_SECONDS.labels("firebase", "save_transcript"))
+    def save_transcript(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        """Append transcript entry."""
+        if not self.enabled:
+            return True
+        try:
+            db.reference(f"sessions/{session_id}/transcript").push(entry)
+            return True
+        except Exception as e:
+            print(f"Firebase transcript error: {e}")
+            return False
+
+    def load_active_sessions(self) -> List[Dict[str, Any]]:
+        """Sessions that have not ended, for restore at startup."""
+        if not self.enabled or not firebase_admin._apps:
+            return []
+        try:
+            data = db.reference("sessions").get() or {}
+            return [s for s in data.values() if isinstance(s, dict) and not s.get("ended_at")]
+        except Exception as e:
+            print(f"Firebase restore error: {e}")
+            return []
+
+    def flush(self) -> bool:
+        """Writes are not buffered; nothing to do."""
+        return True
+
+    def queue_depth(self) -> int:
+        return 0
+
+    def close(self):
+        pass
+
     def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve session summary."""
-        if not self.enabled:
+        if not self.enabled or not firebase_admin._apps:
             return None
         try:
-            return db.reference(f"sessions/{session_id}").get().val()
+            return db.reference(f"sessions/{session_id}").get()
         except Exception as e:
             print(f"Firebase get error: {e}")
             return None
+
+    # ----------------------------
+    # Paged reads (export)
+    # ----------------------------
+
+    def has_session(self, session_id: str) -> bool:
+        if not self.enabled or not firebase_admin._apps:
+            return False
+        try:
+            return db.reference(f"sessions/{session_id}/created_at").get() is not None
+        except Exception as e:
+            print(f"Firebase get error: {e}")
+            return False
+
+    def _paged(self, path: str, since: Optional[float], until: Optional[float], page_size: int) -> Iterator[Dict[str, Any]]:
+        """Walk push-id keys (chronological) a page at a time, filtering on timestamp."""
+        if not self.enabled or not firebase_admin._apps:
+            return
+        ref = db.reference(path)
+        last_key = None
+        while True:
+            try:
+                query = ref.order_by_key()
+                if last_key is None:
+                    page = query.limit_to_first(page_size).get() or {}
+                else:
+                    page = query.start_at(last_key).limit_to_first(page_size + 1).get() or {}
+                    page.pop(last_key, None)
+            except Exception as e:
+                print(f"Firebase read error: {e}")
+                return
+            for key, item in page.items():
+                last_key = key
+                ts = (item or {}).get("timestamp") or 0.0
+                if (since is None or ts >= since) and (until is None or ts <= until):
+                    yield item
+            if len(page) < page_size:
+                return
+
+    def iter_chat(self, session_id: str, since: Optional[float] = None, until: Optional[float] = None,
+                  page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        yield from self._paged(f"sessions/{session_id}/chat", since, until, page_size)
+
+    def iter_transcript(self, session_id: str, since: Optional[float] = None, until: Optional[float] = None,
+                        page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        yield from self._paged(f"sessions/{session_id}/transcript", since, until, page_size)
+
+    def next_rollup_chunk(self, session_id: str, resolution: int) -> Optional[int]:
+        """Chunk number after the last stored one (0 when there are none, None if unreadable)."""
+        if not self.enabled or not firebase_admin._apps:
+            return 0
+        try:
+            keys = db.reference(f"signal_history/{session_id}/{resolution}s").get(shallow=True)
+        except Exception as e:
+            print(f"Firebase read error: {e}")
+            return None
+        if not keys:
+            return 0
+        # Integer keys from 0 come back as a list
+        return len(keys) if isinstance(keys, list) else max(int(k) for k in keys) + 1
+
+    def iter_signal_rollups(self, session_id: str, resolution: int, max_chunk: Optional[int] = None) -> Iterator[str]:
+        """Stored rollup blobs in chunk order, one read per chunk."""
+        if not self.enabled or not firebase_admin._apps:
+            return
+        chunk = 0
+        while max_chunk is None or chunk < max_chunk:
+            try:
+                blob = db.reference(f"signal_history/{session_id}/{resolution}s/{chunk}").get()
+            except Exception as e:
+                print(f"Firebase read error: {e}")
+                return
+            if blob is None:
+                return
+            yield blob
+            chunk += 1
@@ -6,7 +6,8 @@ Groq AI Integration for ConvoWeave.
 
 import os
 from dotenv import load_dotenv
-from groq import Groq
+
+from metrics import GROQ_SECONDS, timed
 
 # Load environment variables from .env file
 load_dotenv()
@@ -24,9 +25,21 @@ else:
 class GroqAI:
     def __init__(self):
         self.enabled = GROQ_ENABLED
+        self._client = None
+
+    @property
+    def client(self):
+        """Groq SDK client, imported and built on first use."""
+        if self._client is None:
+            from groq import Groq
+            self._client = Groq(api_key=GROQ_API_KEY)
+        return self._client
+
+    def warm_up(self):
         if self.enabled:
-            self.client = Groq(api_key=GROQ_API_KEY)
+            self.client
 
+    @timed(GROQ_SECONDS.labels("analyze_chat_sentiment"))
     def analyze_chat_sentiment(self, message: str) -> dict:
         """
         Use Groq LLM to analyze chat message sentiment and emotion.
@@ -77,6 +90,7 @@ Respond with ONLY a JSON object (no markdown):
                 "summary": "Analysis failed",
             }
 
+    @timed(GROQ_SECONDS.labels("transcribe_audio"))
     def transcribe_audio(self, audio_path: str) -> dict:
         """
         Transcribe audio using Groq Whisper.
@@ -118,6 +132,7 @@ Respond with ONLY a JSON object (no markdown):
                 "duration": 0,
             }
 
+    @timed(GROQ_SECONDS.labels("analyze_speech_tone"))
     def analyze_speech_tone(self, transcription: str) -> dict:
         """
         Analyze speech tone/energy/stress from transcription.
@@ -168,6 +183,7 @@ Respond with ONLY a JSON object (no markdown):
                 "engagement": 0.6,
             }
 
+    @timed(GROQ_SECONDS.labels("generate_meeting_summary"))
     def generate_meeting_summary(self, session_data: dict) -> str:
         """
         Generate a comprehensive meeting summary using Groq LLM.
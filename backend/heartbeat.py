@@ -0,0 +1,168 @@
+"""
+Application-level heartbeats for /ws.
+- One timer task per worker scans every socket each HEARTBEAT_SCAN_S; sockets
+  are kept in an OrderedDict in last-seen order, so a scan stops at the first
+  socket that has been heard from recently
+- Any inbound message counts as a sign of life; sockets quiet for
+  HEARTBEAT_INTERVAL_S get a `ping` and must answer (`pong`, or anything
+  else) within HEARTBEAT_TIMEOUT_S
+- Sockets that miss the deadline are handed to on_dead, which drops them from
+  broadcasts and marks their participant stale (out of the summary); a stale
+  participant that has not reconnected after HEARTBEAT_STALE_GRACE_S is
+  handed to on_expire for removal
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+HEARTBEAT_INTERVAL_S = float(os.getenv("HEARTBEAT_INTERVAL_S", "15"))
+HEARTBEAT_TIMEOUT_S = float(os.getenv("HEARTBEAT_TIMEOUT_S", "10"))
+HEARTBEAT_SCAN_S = float(os.getenv("HEARTBEAT_SCAN_S", "1"))
+HEARTBEAT_STALE_GRACE_S = float(os.getenv("HEARTBEAT_STALE_GRACE_S", "30"))
+
+PING_TEXT = json.dumps({"type": "ping", "payload": {}})
+
+PINGS_TOTAL = metrics.counter("convoweave_heartbeat_pings_total", "Heartbeat pings sent")
+DEAD_TOTAL = metrics.counter("convoweave_heartbeat_dead_sockets_total", "Sockets dropped for missing a heartbeat")
+EXPIRED_TOTAL = metrics.counter(
+    "convoweave_stale_participants_expired_total", "Stale participants removed after the grace period"
+)
+
+
+class HeartbeatMonitor:
+    def __init__(
+        self,
+        on_dead: Callable[[Any, str, str], Awaitable[None]],
+        on_expire: Callable[[str, str], Awaitable[None]],
+        interval: float = HEARTBEAT_INTERVAL_S,
+        timeout: float = HEARTBEAT_TIMEOUT_S,
+    ):
+        self.enabled = interval > 0
+        self.on_dead = on_dead
+        self.on_expire = on_expire
+        self.interval = interval
+        self.timeout = timeout
+        self.last_seen: "OrderedDict[Any, float]" = OrderedDict()
+        self.owners: Dict[Any, Tuple[str, str]] = {}
+        self.pinged: Dict[Any, float] = {}
+        self.stale: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        metrics.gauge("convoweave_stale_participants", "Participants marked stale by the heartbeat", fn=lambda: len(self.stale))
+
+    # ----------------------------
+    # Bookkeeping (hot path)
+    # ----------------------------
+
+    def register(self, ws, session_id: str, participant_id: str, now: Optional[float] = None):
+        self.owners[ws] = (session_id, participant_id)
+        self.stale.pop((session_id, participant_id), None)
+        self.seen(ws, now)
+
+    def seen(self, ws, now: Optional[float] = None):
+        self.last_seen[ws] = time.time() if now is None else now
+        self.last_seen.move_to_end(ws)
+        self.pinged.pop(ws, None)
+
+    def forget(self, ws):
+        self.last_seen.pop(ws, None)
+        self.owners.pop(ws, None)
+        self.pinged.pop(ws, None)
+
+    def mark_stale(self, session_id: str, participant_id: str, now: Optional[float] = None):
+        key = (session_id, participant_id)
+        self.stale[key] = time.time() if now is None else now
+        self.stale.move_to_end(key)
+
+    def has_live_socket(self, session_id: str, participant_id: str, sockets) -> bool:
+        return any(self.owners.get(ws) == (session_id, participant_id) for ws in sockets)
+
+    # ----------------------------
+    # Scanning
+    # ----------------------------
+
+    def due(self, now: float) -> Tuple[List[Any], List[Any], List[Tuple[str, str]]]:
+        """(sockets to ping, sockets past their pong deadline, stale participants past the grace period)."""
+        to_ping, dead = [], []
+        for ws, last in self.last_seen.items():
+            if now - last < self.interval:
+                break
+            sent = self.pinged.get(ws)
+            if sent is None:
+                to_ping.append(ws)
+            elif now - sent >= self.timeout:
+                dead.append(ws)
+        expired = []
+        for key, since in self.stale.items():
+            if now - since < HEARTBEAT_STALE_GRACE_S:
+                break
+            expired.append(key)
+        return to_ping, dead, expired
+
+    async def _ping(self, ws) -> bool:
+        try:
+            await asyncio.wait_for(ws.send_text(PING_TEXT), self.timeout)
+            return True
+        except Exception:
+            return False
+
+    async def scan(self, now: Optional[float] = None) -> int:
+        """One pass; returns the number of sockets dropped."""
+        now = time.time() if now is None else now
+        to_ping, dead, expired = self.due(now)
+        if to_ping:
+            for ws in to_ping:
+                self.pinged[ws] = now
+            PINGS_TOTAL.inc(len(to_ping))
+            sent = await asyncio.gather(*(self._ping(ws) for ws in to_ping))
+            dead += [ws for ws, ok in zip(to_ping, sent) if not ok]
+
+        for ws in dead:
+            owner = self.owners.get(ws)
+            self.forget(ws)
+            if owner is None:
+                continue
+            DEAD_TOTAL.inc()
+            try:
+                await self.on_dead(ws, *owner)
+            except Exception as e:
+                print(f"⚠ Dropping dead socket failed: {e}")
+
+        for key in expired:
+            self.stale.pop(key, None)
+            EXPIRED_TOTAL.inc()
+            try:
+                await self.on_expire(*key)
+            except Exception as e:
+                print(f"⚠ Removing stale participant failed: {e}")
+        return len(dead)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SCAN_S)
+            await self.scan()
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "sockets": len(self.last_seen),
+            "awaiting_pong": len(self.pinged),
+            "stale_participants": len(self.stale),
+        }
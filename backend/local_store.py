@@ -0,0 +1,339 @@
+"""
+Local embedded storage backend for ConvoWeave.
+Same interface as FirebaseStore, backed by SQLite in WAL mode.
+- Chat, transcript and signal rows are buffered and inserted in batches, by
+  size or age; main.py also flushes on a LOCAL_STORE_BATCH_INTERVAL_S timer
+- Indexed on (session_id, timestamp) for per-session range reads
+- load_active_sessions() restores live sessions into memory at startup
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from metrics import STORE_WRITE_SECONDS, timed
+
+DEFAULT_DB_PATH = "convoweave.db"
+BATCH_SIZE = int(os.getenv("LOCAL_STORE_BATCH_SIZE", "256"))
+BATCH_INTERVAL_S = float(os.getenv("LOCAL_STORE_BATCH_INTERVAL_S", "1.0"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at REAL,
+    ended_at REAL,
+    host_id TEXT,
+    host_display_name TEXT,
+    data TEXT,
+    saved_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_active ON sessions(ended_at, created_at);
+
+CREATE TABLE IF NOT EXISTS chat (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    participant_id TEXT,
+    message TEXT,
+    timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_session_ts ON chat(session_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS transcript (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    timestamp REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transcript_session_ts ON transcript(session_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    participant_id TEXT,
+    timestamp REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_signals_session_ts ON signals(session_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS signal_rollups (
+    session_id TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    chunk INTEGER NOT NULL,
+    blob TEXT,
+    PRIMARY KEY (session_id, resolution, chunk)
+);
+"""
+
+
+class LocalStore:
+    def __init__(self, db_path: Optional[str] = None):
+        self.enabled = True
+        self.db_path = db_path or os.getenv("LOCAL_STORE_PATH", DEFAULT_DB_PATH)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._pending: Dict[str, List[tuple]] = {"chat": [], "transcript": [], "signals": []}
+        self._pending_count = 0
+        self._last_flush = time.time()
+
+    # ----------------------------
+    # Batching
+    # ----------------------------
+
+    def _queue(self, table: str, row: tuple):
+        with self._lock:
+            self._pending[table].append(row)
+            self._pending_count += 1
+            if self._pending_count >= BATCH_SIZE or time.time() - self._last_flush >= BATCH_INTERVAL_S:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.time()
+        if not self._pending_count:
+            return
+        cur = self._conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            if self._pending["chat"]:
+                cur.executemany(
+                    "INSERT INTO chat (session_id, participant_id, message, timestamp) VALUES (?, ?, ?, ?)",
+                    self._pending["chat"],
+                )
+            if self._pending["transcript"]:
+                cur.executemany(
+                    "INSERT INTO transcript (session_id, timestamp, data) VALUES (?, ?, ?)",
+                    self._pending["transcript"],
+                )
+            if self._pending["signals"]:
+                cur.executemany(
+                    "INSERT INTO signals (session_id, participant_id, timestamp, data) VALUES (?, ?, ?, ?)",
+                    self._pending["signals"],
+                )
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        for rows in self._pending.values():
+            rows.clear()
+        self._pending_count = 0
+
+    @timed(STORE_WRITE_SECONDS.labels("local", "flush"))
+    def flush(self) -> bool:
+        """Write any buffered rows now."""
+        try:
+            with self._lock:
+                self._flush_locked()
+            return True
+        except Exception as e:
+            print(f"Local store flush error: {e}")
+            return False
+
+    def queue_depth(self) -> int:
+        return self._pending_count
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    # ----------------------------
+    # FirebaseStore interface
+    # ----------------------------
+
+    @timed(STORE_WRITE_SECONDS.labels("local", "save_session"))
+    def save_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
+        """Upsert the session snapshot."""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions "
+                    "(session_id, name, created_at, ended_at, host_id, host_display_name, data, saved_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        session_id,
+                        session_data.get("name"),
+                        session_data.get("created_at"),
+                        session_data.get("ended_at"),
+                        session_data.get("host_id"),
+                        session_data.get("host_display_name"),
+                        json.dumps(session_data),
+                        time.time(),
+                    ),
+                )
+            return True
+        except Exception as e:
+            print(f"Local store save error: {e}")
+            return False
+
+    @timed(STORE_WRITE_SECONDS.labels("local", "save_signal"))
+    def save_signal(self, session_id: str, participant_id: str, signal: Dict[str, Any]) -> bool:
+        try:
+            self._queue("signals", (session_id, participant_id, signal.get("timestamp", time.time()), json.dumps(signal)))
+            return True
+        except Exception as e:
+            print(f"Local store signal error: {e}")
+            return False
+
+    @timed(STORE_WRITE_SECONDS.labels("local", "save_signal_rollups"))
+    def save_signal_rollups(self, session_id: str, resolution: int, chunk: int, blob: str) -> bool:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signal_rollups (session_id, resolution, chunk, blob) VALUES (?, ?, ?, ?)",
+                    (session_id, resolution, chunk, blob),
+                )
+            return True
+        except Exception as e:
+            print(f"Local store rollup error: {e}")
+            return False
+
+    @timed(STORE_WRITE_SECONDS.labels("local", "save_chat"))
+    def save_chat(self, session_id: str, participant_id: str, message: str, timestamp: float) -> bool:
+        try:
+            self._queue("chat", (session_id, participant_id, message, timestamp))
+            return True
+        except Exception as e:
+            print(f"Local store chat error: {e}")
+            return False
+
+    @timed(STORE_WRITE_SECONDS.labels("local", "save_transcript"))
+    def save_transcript(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        try:
+            self._queue("transcript", (session_id, entry.get("timestamp", time.time()), json.dumps(entry)))
+            return True
+        except Exception as e:
+            print(f"Local store transcript error: {e}")
+            return False
+
+    def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the session snapshot with its chat and transcript."""
+        self.flush()
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                if row is None:
+                    return None
+                data = json.loads(row[0])
+                data["chat"] = [
+                    {"participant_id": pid, "message": msg, "timestamp": ts}
+                    for pid, msg, ts in self._conn.execute(
+                        "SELECT participant_id, message, timestamp FROM chat WHERE session_id = ? ORDER BY timestamp",
+                        (session_id,),
+                    )
+                ]
+                data["transcript"] = [
+                    json.loads(d)
+                    for (d,) in self._conn.execute(
+                        "SELECT data FROM transcript WHERE session_id = ? ORDER BY timestamp",
+                        (session_id,),
+                    )
+                ]
+            return data
+        except Exception as e:
+            print(f"Local store get error: {e}")
+            return None
+
+    def load_active_sessions(self) -> List[Dict[str, Any]]:
+        """
+        Load every session that has not ended, with chat and transcript
+        attached, using one scan per table rather than one query per session.
+        """
+        self.flush()
+        try:
+            with self._lock:
+                active: Dict[str, Dict[str, Any]] = {}
+                for sid, data in self._conn.execute("SELECT session_id, data FROM sessions WHERE ended_at IS NULL"):
+                    session = json.loads(data)
+                    session["chat"] = []
+                    session["transcript"] = []
+                    active[sid] = session
+                if not active:
+                    return []
+                for sid, pid, msg, ts in self._conn.execute(
+                    "SELECT c.session_id, c.participant_id, c.message, c.timestamp FROM chat c "
+                    "JOIN sessions s ON s.session_id = c.session_id "
+                    "WHERE s.ended_at IS NULL ORDER BY c.session_id, c.timestamp"
+                ):
+                    active[sid]["chat"].append({"participant_id": pid, "message": msg, "timestamp": ts})
+                for sid, data in self._conn.execute(
+                    "SELECT t.session_id, t.data FROM transcript t "
+                    "JOIN sessions s ON s.session_id = t.session_id "
+                    "WHERE s.ended_at IS NULL ORDER BY t.session_id, t.timestamp"
+                ):
+                    active[sid]["transcript"].append(json.loads(data))
+            return list(active.values())
+        except Exception as e:
+            print(f"Local store restore error: {e}")
+            return []
+
+    # ----------------------------
+    # Paged reads (export)
+    # ----------------------------
+
+    def has_session(self, session_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone() is not None
+
+    def _paged(self, table: str, columns: str, session_id: str, since: Optional[float], until: Optional[float],
+               page_size: int) -> Iterator[tuple]:
+        """Keyset pagination on (timestamp, id); the lock is held per page, not per export."""
+        ts, row_id = (-math.inf if since is None else since), -1
+        until = math.inf if until is None else until
+        sql = (
+            f"SELECT id, timestamp, {columns} FROM {table} "
+            "WHERE session_id = ? AND (timestamp, id) > (?, ?) AND timestamp <= ? "
+            "ORDER BY timestamp, id LIMIT ?"
+        )
+        while True:
+            try:
+                with self._lock:
+                    page = self._conn.execute(sql, (session_id, ts, row_id, until, page_size)).fetchall()
+            except Exception as e:
+                print(f"Local store read error: {e}")
+                return
+            yield from page
+            if len(page) < page_size:
+                return
+            row_id, ts = page[-1][0], page[-1][1]
+
+    def iter_chat(self, session_id: str, since: Optional[float] = None, until: Optional[float] = None,
+                  page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        for _, ts, pid, msg in self._paged("chat", "participant_id, message", session_id, since, until, page_size):
+            yield {"participant_id": pid, "message": msg, "timestamp": ts}
+
+    def iter_transcript(self, session_id: str, since: Optional[float] = None, until: Optional[float] = None,
+                        page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        for _, _, data in self._paged("transcript", "data", session_id, since, until, page_size):
+            yield json.loads(data)
+
+    def next_rollup_chunk(self, session_id: str, resolution: int) -> int:
+        """Chunk number after the last stored one (0 when there are none)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(chunk) FROM signal_rollups WHERE session_id = ? AND resolution = ?",
+                (session_id, resolution),
+            ).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def iter_signal_rollups(self, session_id: str, resolution: int, max_chunk: Optional[int] = None) -> Iterator[str]:
+        """Stored rollup blobs in chunk order, one at a time (chunks < max_chunk if given)."""
+        chunk = -1
+        limit = math.inf if max_chunk is None else max_chunk
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT chunk, blob FROM signal_rollups WHERE session_id = ? AND resolution = ? AND chunk > ? "
+                    "ORDER BY chunk LIMIT 1",
+                    (session_id, resolution, chunk),
+                ).fetchone()
+            if row is None or row[0] >= limit:
+                return
+            chunk = row[0]
+            yield row[1]
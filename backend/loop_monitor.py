@@ -0,0 +1,125 @@
+"""
+Event-loop lag monitor and adaptive load shedding for ConvoWeave.
+- A background task measures how late its own wake-ups are (scheduling delay)
+- Smoothed lag maps to a degradation level, shed in order:
+    1 THROTTLED       session_update broadcasts are rate-limited per session
+    2 SHEDDING_FRAMES frame analysis is rejected with a Retry-After hint
+    3 DEFERRING_LLM   LLM enrichment is skipped in favour of cheap heuristics
+- Levels drop back only after lag stays low for a cooldown (hysteresis)
+"""
+
+import asyncio
+import os
+import time
+from typing import Optional
+
+import metrics
+
+NORMAL = 0
+THROTTLED = 1
+SHEDDING_FRAMES = 2
+DEFERRING_LLM = 3
+
+LEVEL_NAMES = {
+    NORMAL: "normal",
+    THROTTLED: "throttled",
+    SHEDDING_FRAMES: "shedding_frames",
+    DEFERRING_LLM: "deferring_llm",
+}
+
+INTERVAL_S = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")) / 1000
+THRESHOLDS_S = {
+    THROTTLED: float(os.getenv("LOOP_LAG_THROTTLE_MS", "50")) / 1000,
+    SHEDDING_FRAMES: float(os.getenv("LOOP_LAG_SHED_FRAMES_MS", "150")) / 1000,
+    DEFERRING_LLM: float(os.getenv("LOOP_LAG_DEFER_LLM_MS", "400")) / 1000,
+}
+COOLDOWN_S = float(os.getenv("LOOP_LAG_COOLDOWN_S", "5"))
+SESSION_UPDATE_MIN_INTERVAL_S = float(os.getenv("SESSION_UPDATE_THROTTLE_S", "0.5"))
+RETRY_AFTER_S = int(os.getenv("FRAME_RETRY_AFTER_S", "2"))
+
+LOOP_LAG_SECONDS = metrics.histogram("convoweave_loop_lag_seconds", "Event-loop scheduling delay")
+LOOP_LAG_GAUGE = metrics.gauge("convoweave_loop_lag_smoothed_seconds", "Smoothed event-loop lag")
+DEGRADATION_LEVEL = metrics.gauge("convoweave_degradation_level", "0 normal, 1 throttled, 2 shedding frames, 3 deferring LLM")
+SHED_TOTAL = metrics.counter("convoweave_shed_total", "Work shed under loop lag, by kind", ("kind",))
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = INTERVAL_S, alpha: float = 0.3):
+        self.interval = interval
+        self.alpha = alpha
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.level = NORMAL
+        self._calm_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.observe(max(0.0, time.perf_counter() - expected))
+
+    def observe(self, lag: float, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        LOOP_LAG_SECONDS.observe(lag)
+        self.lag = self.alpha * lag + (1 - self.alpha) * self.lag
+        self.max_lag = max(self.max_lag, lag)
+        LOOP_LAG_GAUGE.set(self.lag)
+
+        target = NORMAL
+        for level, threshold in THRESHOLDS_S.items():
+            if self.lag >= threshold:
+                target = level
+
+        if target >= self.level:
+            self.level = target
+            self._calm_since = None
+        else:
+            # Step down one level at a time once lag has stayed low
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= COOLDOWN_S:
+                self.level -= 1
+                self._calm_since = now
+        DEGRADATION_LEVEL.set(self.level)
+
+    # ----------------------------
+    # Shedding decisions
+    # ----------------------------
+
+    def throttle_interval(self) -> float:
+        """Minimum seconds between session_update broadcasts (0 = unthrottled)."""
+        return SESSION_UPDATE_MIN_INTERVAL_S if self.level >= THROTTLED else 0.0
+
+    def shed_frames(self) -> bool:
+        return self.level >= SHEDDING_FRAMES
+
+    def defer_llm(self) -> bool:
+        return self.level >= DEFERRING_LLM
+
+    def record_shed(self, kind: str):
+        SHED_TOTAL.labels(kind).inc()
+
+    def status(self) -> dict:
+        return {
+            "level": self.level,
+            "state": LEVEL_NAMES[self.level],
+            "loop_lag_ms": round(self.lag * 1000, 2),
+            "max_loop_lag_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_monitor = LoopLagMonitor()
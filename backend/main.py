@@ -10,20 +10,95 @@ from __future__ import annotations
 
 import asyncio
 import json
+import os
 import time
 import uuid
-from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set, Tuple
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, File, UploadFile, Form
+from fastapi import FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, File, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from firebase_store import FirebaseStore
-from analysis_router import router as analysis_router
-from groq_ai import GroqAI
-from tts_module import text_to_speech
-
-
-app = FastAPI(title="ConvoWeave Backend", version="0.1.0")
+from starlette.concurrency import run_in_threadpool
+from local_store import BATCH_INTERVAL_S as STORE_FLUSH_INTERVAL_S, LocalStore
+from analysis_router import router as analysis_router, set_participant_check
+from groq_ai import groq_ai
+from tts_module import text_to_speech, tts_cache
+from signal_history import RESOLUTIONS, SignalHistory
+from loop_monitor import loop_monitor
+from event_recorder import recorder
+from session_events import SessionEventLog
+from subscriptions import FULL, Subscription, summary_variant
+from ws_compression import ignored_deflate_settings, zstd_codec
+from search_index import CHAT, TRANSCRIPT, SearchIndex
+import session_export
+from dispatcher import WorkerHeaderMiddleware, owns_session, restarted_worker
+from heartbeat import HeartbeatMonitor
+from rate_limits import CHAT as CHAT_LIMIT, SIGNAL as SIGNAL_LIMIT, rate_limiter
+from session_reaper import CHAT_OVERHEAD_BYTES, IDLE, EMPTY, TRANSCRIPT_OVERHEAD_BYTES, SessionReaper
+import metrics
+
+
+# Set by the dispatcher on its workers: accept X-Session-Id on POST /sessions
+TRUST_SESSION_ID_HEADER = os.getenv("TRUST_SESSION_ID_HEADER") == "1"
+
+# Heavy subsystems load on first use; list them here to load them in the
+# background right after startup instead (e.g. "emotion,groq,tts")
+WARMUP_SUBSYSTEMS = [s.strip() for s in os.getenv("WARMUP_SUBSYSTEMS", "").split(",") if s.strip()]
+
+
+def _warm_up(names: List[str]):
+    import analysis_router
+    import tts_module
+    import ws_compression
+
+    loaders = {
+        "emotion": analysis_router.warm_up,
+        "groq": groq_ai.warm_up,
+        "tts": tts_module.warm_up,
+        "zstd": ws_compression.warm_up,
+    }
+    for name in names:
+        started = time.perf_counter()
+        try:
+            loaders[name]()
+            print(f"✓ Warmed up {name} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"⚠ Warm-up of {name} failed: {e}")
+
+
+async def _flush_store_periodically():
+    """Write buffered store rows and due signal rollups on a timer, so a quiet session's last rows don't wait for more traffic."""
+    while True:
+        await asyncio.sleep(STORE_FLUSH_INTERVAL_S)
+        await run_in_threadpool(signal_history.flush_due_sessions)
+        if store.queue_depth():
+            await run_in_threadpool(store.flush)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _restore_active_sessions()
+    ignored = ignored_deflate_settings()
+    if ignored:
+        print(f"⚠ {', '.join(ignored)} set but not in effect; run with --ws ws_protocol:DeflateWebSocketProtocol")
+    loop_monitor.start()
+    session_reaper.start()
+    heartbeat.start()
+    store_flusher = asyncio.create_task(_flush_store_periodically())
+    if WARMUP_SUBSYSTEMS:
+        asyncio.get_running_loop().run_in_executor(None, _warm_up, WARMUP_SUBSYSTEMS)
+    yield
+    await loop_monitor.stop()
+    await session_reaper.stop()
+    await heartbeat.stop()
+    store_flusher.cancel()
+    store.close()
+    recorder.close()
+
+
+app = FastAPI(title="ConvoWeave Backend", version="0.1.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # lock down in production
@@ -31,12 +106,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(WorkerHeaderMiddleware)
+
+def _create_store():
+    """Firebase when configured (or STORE_BACKEND=firebase), local SQLite otherwise."""
+    backend = os.getenv("STORE_BACKEND", "").lower()
+    if backend == "firebase" or (not backend and os.getenv("FIREBASE_CREDENTIALS_PATH")):
+        from firebase_store import FirebaseStore
+        return FirebaseStore()
+    print("✓ Using local SQLite store")
+    return LocalStore()
 
-# Initialize Firebase store (optional)
-firebase_store = FirebaseStore()
 
-# Initialize Groq AI
-groq_ai = GroqAI()
+# Initialize persistence (Firebase or local SQLite)
+store = _create_store()
+
+# Downsampled signal history, flushed to the store in compact rollups
+signal_history = SignalHistory(store)
 
 # Include analysis router
 app.include_router(analysis_router)
@@ -83,6 +169,8 @@ class ParticipantState(BaseModel):
     display_name: str
     latest_signal: Optional[SignalPayload] = None
     chat_history: List[ChatPayload] = []
+    # Set when the heartbeat loses the participant's socket; not persisted
+    stale: bool = Field(default=False, exclude=True)
 
 
 class SessionState(BaseModel):
@@ -103,18 +191,230 @@ class SessionState(BaseModel):
 
 sessions: Dict[str, SessionState] = {}
 session_connections: Dict[str, List[WebSocket]] = {}
+# Last session_update broadcast per session, for throttling under loop lag
+session_update_at: Dict[str, float] = {}
+# Versioned event log + cached session_init per session, for cheap reconnects
+session_events: Dict[str, SessionEventLog] = {}
+# Broadcast filters of sockets that declared one (others get everything)
+socket_subscriptions: Dict[WebSocket, Subscription] = {}
+# Sockets that asked for zstd + dictionary frames (?compress=zstd)
+zstd_sockets: Set[WebSocket] = set()
+# Restored at startup under the dispatcher but not routed here since: may be
+# live on another worker, so never persisted from this one until claimed
+unclaimed_sessions: Set[str] = set()
+# Inverted index over chat + transcript, maintained as entries are appended
+search_index = SearchIndex()
+# Frame rate limits only trust participant ids that exist here
+set_participant_check(lambda sid, pid: sid in sessions and pid in sessions[sid].participants)
+# Deferred session_update for participants whose signals are over the rate limit
+merged_signals: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+def _event_log(session_id: str) -> SessionEventLog:
+    log = session_events.get(session_id)
+    if log is None:
+        log = session_events[session_id] = SessionEventLog()
+    return log
+
+
+def _forget_session(session_id: str):
+    """Drop all in-memory state for a session."""
+    sessions.pop(session_id, None)
+    session_connections.pop(session_id, None)
+    session_update_at.pop(session_id, None)
+    session_events.pop(session_id, None)
+    session_reaper.forget(session_id)
+    unclaimed_sessions.discard(session_id)
+    search_index.retire(session_id)
+    rate_limiter.forget_session(session_id)
+    for key in [k for k in merged_signals if k[0] == session_id]:
+        merged_signals.pop(key).cancel()
+
+
+async def _evict_session(session_id: str, reason: str):
+    """
+    Persist and drop a session chosen by the reaper. TTL expiry ends the
+    session; capacity eviction leaves it restorable from the store.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return
+    if session_id in unclaimed_sessions:
+        # Nothing changed here; the stored row may belong to a live session elsewhere
+        _forget_session(session_id)
+        print(f"✓ Session {session_id[:8]} dropped ({reason}, unclaimed)")
+        return
+    if reason in (IDLE, EMPTY):
+        session.ended_at = time.time()
+    store.save_session(session_id, _snapshot(session))
+    signal_history.close_session(session_id)
+    store.flush()
+    for ws in session_connections.get(session_id, [])[:]:
+        try:
+            await ws.close(code=1001)
+        except Exception:
+            pass
+    _forget_session(session_id)
+    print(f"✓ Session {session_id[:8]} evicted ({reason})")
+
+
+# Idle TTLs and the global session/memory cap
+session_reaper = SessionReaper(
+    lambda session_id, reason: _evict_session(session_id, reason),
+    lambda session_id: bool(session_connections.get(session_id)),
+)
+
+
+# ----------------------------
+# Metrics
+# ----------------------------
+
+WS_EVENT_TYPES = ("signal", "chat", "stt_toggle", "subscribe", "pong")
+
+WS_MESSAGE_SECONDS = metrics.histogram(
+    "convoweave_ws_message_seconds", "WebSocket message handling time by event type", ("type",)
+)
+BROADCAST_SECONDS = metrics.histogram("convoweave_broadcast_seconds", "_broadcast fan-out duration")
+BROADCAST_FANOUT = metrics.histogram(
+    "convoweave_broadcast_fanout", "Sockets per broadcast", buckets=metrics.SIZE_BUCKETS
+)
+BROADCAST_BYTES = metrics.histogram(
+    "convoweave_broadcast_bytes", "Encoded broadcast message size", buckets=metrics.BYTES_BUCKETS
+)
+BROADCAST_SENT_BYTES = metrics.counter(
+    "convoweave_broadcast_sent_bytes_total", "Bytes written to sockets by broadcasts, by event type", ("type",)
+)
+BROADCAST_FILTERED = metrics.counter(
+    "convoweave_broadcast_filtered_total", "Deliveries skipped by socket subscriptions, by event type", ("type",)
+)
+SUMMARY_SECONDS = metrics.histogram("convoweave_session_summary_seconds", "_compute_session_summary time")
+SESSION_INIT_TOTAL = metrics.counter(
+    "convoweave_session_init_total", "Connect handshakes by kind (cached, built, resume)", ("kind",)
+)
+
+metrics.gauge("convoweave_active_sessions", "Sessions held in memory", fn=lambda: len(sessions))
+metrics.gauge(
+    "convoweave_active_sockets", "Open WebSocket connections",
+    fn=lambda: sum(len(c) for c in list(session_connections.values())),
+)
+metrics.gauge(
+    "convoweave_participants", "Participants across all sessions",
+    fn=lambda: sum(len(s.participants) for s in list(sessions.values())),
+)
+metrics.gauge("convoweave_store_queue_depth", "Rows buffered in the store awaiting write", fn=lambda: store.queue_depth())
+metrics.gauge("convoweave_signal_rollups_pending", "Signal rollup rows awaiting flush", fn=lambda: signal_history.pending_rows())
+metrics.gauge("convoweave_tts_renders_pending", "TTS clips being synthesized", fn=lambda: tts_cache.pending_count())
+
+
+def _load_session(session_id: str) -> Optional[SessionState]:
+    """In-memory session, restored from the store on a miss (restart or worker failover)."""
+    session = sessions.get(session_id)
+    if session is not None:
+        unclaimed_sessions.discard(session_id)  # routed here, so this worker owns it now
+        return session
+    print(f"Session {session_id} not in memory, attempting restore...")
+    data = store.get_session_summary(session_id)
+    if not data or data.get("ended_at"):
+        return None
+    session = sessions[session_id] = _restore_session({**data, "session_id": session_id})
+    session_connections.setdefault(session_id, [])
+    session_reaper.touch(session_id)
+    search_index.drop(session_id)  # any archived copy is superseded by the live index
+    _index_session(session)
+    return session
 
 
 def _ensure_session(session_id: str) -> SessionState:
-    if session_id not in sessions:
+    session = _load_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return sessions[session_id]
+    return session
+
+
+# Chat and transcript live in the store's own row tables (save_chat /
+# save_transcript) and are reattached on load; keep them out of the snapshot
+SNAPSHOT_EXCLUDE = {"transcript": True, "participants": {"__all__": {"chat_history"}}}
+
+
+def _snapshot(session: SessionState) -> dict:
+    return session.model_dump(exclude=SNAPSHOT_EXCLUDE)
+
+
+def _restore_session(data: dict) -> SessionState:
+    """Rebuild in-memory state from a stored snapshot plus its chat/transcript."""
+    participants = {
+        pid: ParticipantState(participant_id=pid, display_name=p.get("display_name") or "Guest")
+        for pid, p in (data.get("participants") or {}).items()
+    }
+    chat = data.get("chat") or []
+    if isinstance(chat, dict):  # Firebase push keys
+        chat = list(chat.values())
+    for entry in chat:
+        pid = entry.get("participant_id")
+        if pid not in participants:
+            participants[pid] = ParticipantState(participant_id=pid, display_name="Guest")
+        participants[pid].chat_history.append(ChatPayload(message=entry["message"], timestamp=entry["timestamp"]))
+    transcript = data.get("transcript") or []
+    if isinstance(transcript, dict):
+        transcript = list(transcript.values())
+    return SessionState(
+        session_id=data["session_id"],
+        name=data.get("name") or "Untitled session",
+        created_at=data.get("created_at") or time.time(),
+        participants=participants,
+        host_id=data.get("host_id"),
+        host_display_name=data.get("host_display_name"),
+        transcript=transcript,
+        stt_enabled=bool(data.get("stt_enabled", False)),
+    )
 
 
+def _index_session(session: SessionState):
+    """Index chat/transcript of a session restored from the store."""
+    for pid, participant in session.participants.items():
+        for chat in participant.chat_history:
+            search_index.add(session.session_id, CHAT, pid, chat.message, chat.timestamp, participant.display_name)
+    for entry in session.transcript:
+        if entry.get("text"):
+            search_index.add(
+                session.session_id, TRANSCRIPT, entry.get("participant_id") or "unknown",
+                entry["text"], entry.get("timestamp") or 0.0, entry.get("display_name"),
+            )
+
+
+def _restore_active_sessions():
+    if restarted_worker():
+        # Its sessions failed over and may be live elsewhere; restore on demand instead
+        return
+    started = time.perf_counter()
+    restored = 0
+    dispatched = bool(os.getenv("CONVOWEAVE_WORKERS"))
+    for data in store.load_active_sessions():
+        # Under the dispatcher, each worker restores only the sessions it owns
+        if not owns_session(data.get("session_id", "")):
+            continue
+        try:
+            session = _restore_session(data)
+        except Exception as e:
+            print(f"⚠ Could not restore session {data.get('session_id')}: {e}")
+            continue
+        sessions[session.session_id] = session
+        session_connections.setdefault(session.session_id, [])
+        session_reaper.touch(session.session_id)
+        if dispatched:
+            unclaimed_sessions.add(session.session_id)
+        _index_session(session)
+        restored += 1
+    if restored:
+        print(f"✓ Restored {restored} active sessions in {time.perf_counter() - started:.3f}s")
+
+
+@metrics.timed(SUMMARY_SECONDS)
 def _compute_session_summary(session: SessionState) -> dict:
-    signals = [p.latest_signal for p in session.participants.values() if p.latest_signal]
+    active = [p for p in session.participants.values() if not p.stale]
+    signals = [p.latest_signal for p in active if p.latest_signal]
     if not signals:
-        return {"participants": len(session.participants), "status": "waiting"}
+        return {"participants": len(active), "status": "waiting"}
 
     def avg(field: str) -> float:
         values = [getattr(s, field) for s in signals if getattr(s, field) is not None]
@@ -134,7 +434,7 @@ def _compute_session_summary(session: SessionState) -> dict:
         note = "Session steady"
 
     return {
-        "participants": len(session.participants),
+        "participants": len(active),
         "engagement": round(engagement, 3),
         "confusion": round(confusion, 3),
         "stress": round(stress, 3),
@@ -155,12 +455,32 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy", "sessions": len(sessions)}
+    degradation = loop_monitor.status()
+    return {
+        "status": "healthy" if degradation["level"] == 0 else "degraded",
+        "sessions": len(sessions),
+        "connections": sum(len(c) for c in session_connections.values()),
+        "degradation": degradation,
+        "reaper": session_reaper.stats(),
+        "heartbeat": heartbeat.stats(),
+        "rate_limits": rate_limiter.stats(),
+    }
+
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.post("/sessions")
-def create_session(body: SessionCreateRequest):
+def create_session(body: SessionCreateRequest, x_session_id: Optional[str] = Header(default=None)):
+    # The dispatcher assigns ids so the session lands on the worker that owns it
     session_id = str(uuid.uuid4())
+    if x_session_id and TRUST_SESSION_ID_HEADER and x_session_id not in sessions:
+        try:
+            session_id = str(uuid.UUID(x_session_id))
+        except ValueError:
+            pass
     sessions[session_id] = SessionState(
         session_id=session_id,
         name=body.name,
@@ -170,7 +490,8 @@ def create_session(body: SessionCreateRequest):
         host_display_name=body.host_display_name,
     )
     session_connections[session_id] = []
-    firebase_store.save_session(session_id, sessions[session_id].model_dump())
+    session_reaper.touch(session_id)
+    store.save_session(session_id, _snapshot(sessions[session_id]))
     print(f"✓ Created session: {session_id}")
     return {"session_id": session_id, "name": body.name, "host_id": body.host_id}
 
@@ -178,7 +499,7 @@ def create_session(body: SessionCreateRequest):
 @app.get("/sessions/{session_id}")
 def get_session(session_id: str):
     """Check if a session exists and is active."""
-    if session_id not in sessions:
+    if _load_session(session_id) is None:
         raise HTTPException(status_code=404, detail="Session not found or expired")
     return {
         "session_id": session_id,
@@ -191,25 +512,22 @@ def get_session(session_id: str):
 
 
 @app.post("/sessions/{session_id}/participants")
-def join_session(session_id: str, body: ParticipantJoinRequest):
-    if session_id not in sessions:
-        # Try to restore from Firebase if not in memory
-        print(f"Session {session_id} not in memory, attempting restore...")
+async def join_session(session_id: str, body: ParticipantJoinRequest):
+    # Restores from the store if not in memory
+    session = _load_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail=f"Session not found. Please create a new session.")
-    
-    session = sessions[session_id]
+    session_reaper.touch(session_id)
     participant_id = body.participant_id or str(uuid.uuid4())
     state = ParticipantState(participant_id=participant_id, display_name=body.display_name)
     session.participants[participant_id] = state
     print(f"✓ Participant {participant_id[:8]} joined session {session_id[:8]}")
+    event, text = _record_event(session_id, {
+        "type": "participant_joined",
+        "payload": {"participant_id": participant_id, "display_name": body.display_name},
+    })
     # Notify existing clients
-    try:
-        asyncio.create_task(_broadcast(session_id, {
-            "type": "participant_joined",
-            "payload": {"participant_id": participant_id, "display_name": body.display_name},
-        }))
-    except RuntimeError:
-        pass
+    await _send_to_session(session_id, text, event)
     return {"participant_id": participant_id, "session_id": session_id}
 
 
@@ -233,12 +551,96 @@ def _simple_sentiment(text: str) -> float:
     return 0.5 + (pos_count - neg_count) / (pos_count + neg_count) * 0.5
 
 
+def _build_archived_index(session_id: str, data: dict):
+    """Index an ended session's stored chat and transcript."""
+    chat = data.get("chat") or []
+    transcript = data.get("transcript") or []
+    names = {pid: (p or {}).get("display_name") for pid, p in (data.get("participants") or {}).items()}
+    return search_index.build_archived(
+        session_id,
+        chat.values() if isinstance(chat, dict) else chat,
+        transcript.values() if isinstance(transcript, dict) else transcript,
+        names,
+    )
+
+
+@app.get("/sessions/{session_id}/search")
+async def search_session(
+    session_id: str,
+    q: str = Query(min_length=1, max_length=256),
+    k: int = Query(default=10, ge=1, le=100),
+    participant_id: Optional[str] = None,
+    kind: Optional[str] = Query(default=None, pattern="^(chat|transcript)$"),
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+):
+    """Ranked search over a live or ended session's chat and transcript."""
+    # The index is only touched on the loop; just the store read goes to a thread
+    index = search_index.get(session_id)
+    if index is None and session_id not in sessions:
+        # Ended session: rebuild its index once from the store
+        data = await run_in_threadpool(store.get_session_summary, session_id)
+        if session_id in sessions:
+            index = search_index.get(session_id)  # restored while the store was read
+        elif not data:
+            raise HTTPException(status_code=404, detail="Session not found")
+        else:
+            index = _build_archived_index(session_id, data)
+    total, results = index.search(q, k, participant_id, kind, since, until) if index else (0, [])
+    return {"session_id": session_id, "query": q, "total": total, "results": results}
+
+
+@app.get("/sessions/{session_id}/export")
+async def export_session(
+    session_id: str,
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    include: str = ",".join(session_export.KINDS),
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    resolution: int = 1,
+):
+    """
+    Stream chat, transcript and signal rollups as NDJSON or CSV, paging through
+    the store. Gzip-compressed when the client sends Accept-Encoding: gzip.
+    """
+    kinds = tuple(k.strip() for k in include.split(",") if k.strip())
+    if not kinds or any(k not in session_export.KINDS for k in kinds):
+        raise HTTPException(status_code=400, detail=f"include must be a subset of {','.join(session_export.KINDS)}")
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(RESOLUTIONS)}")
+    if session_id not in sessions and not await run_in_threadpool(store.has_session, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    # Snapshot unflushed rollups, then push buffered rows to the store
+    flushed_chunks, unflushed = await run_in_threadpool(signal_history.unflushed_rows, session_id, resolution)
+    await run_in_threadpool(store.flush)
+
+    records = session_export.iter_records(
+        store, session_id, kinds, since, until, resolution,
+        flushed_chunks, unflushed,
+    )
+    gzip = session_export.accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": f'attachment; filename="session-{session_id}.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        session_export.stream_export(records, format, gzip),
+        media_type=session_export.MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
 @app.post("/sessions/{session_id}/end")
 def end_session(session_id: str):
     """End a session and prepare summary."""
     session = _ensure_session(session_id)
     session.ended_at = time.time()
-    firebase_store.save_session(session_id, session.model_dump())
+    store.save_session(session_id, _snapshot(session))
+    signal_history.close_session(session_id)
     summary = _compute_session_summary(session)
     # Broadcast session ended
     try:
@@ -261,15 +663,12 @@ def end_session(session_id: str):
             pass
 
     # Destroy session
-    if session_id in session_connections:
-        del session_connections[session_id]
-    if session_id in sessions:
-        del sessions[session_id]
+    _forget_session(session_id)
     return summary
 
 
 @app.post("/sessions/{session_id}/generate-summary")
-def generate_meeting_summary(session_id: str):
+def generate_meeting_summary(session_id: str, request: Request):
     """Generate AI-powered meeting summary."""
     session = _ensure_session(session_id)
     
@@ -299,16 +698,30 @@ def generate_meeting_summary(session_id: str):
     # Generate Groq summary
     summary_text = groq_ai.generate_meeting_summary(session_data)
     
-    # Generate audio for summary (optional TTS)
+    # Generate audio for summary (optional TTS); rendered in the background
+    # and fetched by URL so playback can start before synthesis finishes
     audio_result = text_to_speech(summary_text)
+    audio_id = audio_result.get("audio_id")
     
     return {
         "summary": summary_text,
-        "audio": audio_result.get("audio"),
+        # session_id lets the dispatcher route the fetch to the rendering worker
+        "audio": str(request.url_for("get_audio", audio_id=audio_id).include_query_params(session_id=session_id)) if audio_id else None,
         "duration": audio_result.get("duration"),
     }
 
 
+@app.get("/audio/{audio_id}")
+def get_audio(audio_id: str):
+    """Serve cached TTS audio; supports Range once rendered, streams while rendering."""
+    path = tts_cache.get(audio_id)
+    if path:
+        return FileResponse(path, media_type="audio/mpeg")
+    if tts_cache.is_pending(audio_id):
+        return StreamingResponse(tts_cache.stream_pending(audio_id), media_type="audio/mpeg")
+    raise HTTPException(status_code=404, detail="Audio not found")
+
+
 @app.post("/sessions/{session_id}/transcribe-audio")
 async def transcribe_audio(session_id: str, file: UploadFile = File(...), participant_id: Optional[str] = Form(default=None)):
     """Transcribe audio and analyze tone/emotion."""
@@ -327,7 +740,11 @@ async def transcribe_audio(session_id: str, file: UploadFile = File(...), partic
         
         # Analyze tone
         if transcription_result.get("text"):
-            tone_result = groq_ai.analyze_speech_tone(transcription_result["text"])
+            if loop_monitor.defer_llm():
+                loop_monitor.record_shed("llm_enrichment")
+                tone_result = {"tone": "neutral", "energy": 0.5, "stress_level": 0.3, "engagement": 0.6}
+            else:
+                tone_result = groq_ai.analyze_speech_tone(transcription_result["text"])
             result_payload = {
                 "text": transcription_result.get("text"),
                 "confidence": transcription_result.get("confidence"),
@@ -347,6 +764,11 @@ async def transcribe_audio(session_id: str, file: UploadFile = File(...), partic
                 "stress_level": result_payload.get("stress_level"),
             }
             session.transcript.append(entry)
+            session_reaper.touch(session_id)
+            session_reaper.account(session_id, len(entry["text"] or "") + TRANSCRIPT_OVERHEAD_BYTES)
+            if entry["text"]:
+                search_index.add(session_id, TRANSCRIPT, entry["participant_id"], entry["text"], entry["timestamp"], entry["display_name"])
+            store.save_transcript(session_id, entry)
             await _broadcast(session_id, {"type": "transcript", "payload": entry})
             return result_payload
         else:
@@ -365,76 +787,399 @@ async def transcribe_audio(session_id: str, file: UploadFile = File(...), partic
 # ----------------------------
 
 
+def _record_event(session_id: str, message: dict) -> Tuple[dict, str]:
+    """Stamp an event with the next session version, log it for replay, and encode it."""
+    log = _event_log(session_id)
+    version = log.next_version()
+    event = {**message, "version": version}
+    text = json.dumps(event)
+    log.record(version, text)
+    return event, text
+
+
+def _session_init_text(session: SessionState) -> str:
+    """Encoded session_init, rebuilt only when the session version has moved."""
+    log = _event_log(session.session_id)
+    text = log.snapshot()
+    if text is not None:
+        SESSION_INIT_TOTAL.labels("cached").inc()
+        return text
+    SESSION_INIT_TOTAL.labels("built").inc()
+    text = json.dumps({
+        "type": "session_init",
+        "payload": {
+            "session": {
+                "id": session.session_id,
+                "name": session.name,
+                "host_id": session.host_id,
+                "host_display_name": session.host_display_name,
+            },
+            "participants": {pid: p.display_name for pid, p in session.participants.items()},
+            "summary": _compute_session_summary(session),
+            "stt_enabled": session.stt_enabled,
+            "transcript": session.transcript[-50:],
+            "epoch": log.epoch,
+            "version": log.version,
+        },
+    })
+    log.store_snapshot(text)
+    return text
+
+
 async def _broadcast(session_id: str, message: dict):
     """Send message to all clients in a session; drop closed connections."""
+    event, text = _record_event(session_id, message)
+    await _send_to_session(session_id, text, event)
+
+
+async def _send_to_session(session_id: str, text: str, event: Optional[dict] = None):
+    """
+    Route an encoded event to the session's sockets by their subscriptions.
+    Each variant (full / summary-only) is encoded at most once.
+    """
+    started = time.perf_counter()
+    connections = session_connections.get(session_id, [])
+    event_type = event["type"] if event else "unknown"
+    sender = event["payload"].get("participant_id") if event else None
+    variants = {FULL: text}
+    zstd_variants = {}
+    now = time.time()
     dead = []
-    for ws in session_connections.get(session_id, []):
+    sent = sent_bytes = 0
+    for ws in connections:
+        subscription = socket_subscriptions.get(ws)
+        variant = subscription.variant(event_type, sender, now) if subscription and event else FULL
+        if variant is None:
+            BROADCAST_FILTERED.labels(event_type).inc()
+            continue
+        out = variants.get(variant)
+        if out is None:
+            out = variants[variant] = json.dumps(summary_variant(event))
+        if ws in zstd_sockets:
+            if variant not in zstd_variants:
+                zstd_variants[variant] = zstd_codec.encode(out)
+            out = zstd_variants[variant]
         try:
-            await ws.send_text(json.dumps(message))
+            if isinstance(out, bytes):
+                await ws.send_bytes(out)
+            else:
+                await ws.send_text(out)
+            sent += 1
+            sent_bytes += len(out)
         except Exception:
             dead.append(ws)
-    if dead:
+    BROADCAST_SECONDS.observe(time.perf_counter() - started)
+    BROADCAST_FANOUT.observe(sent)
+    BROADCAST_BYTES.observe(len(text))
+    BROADCAST_SENT_BYTES.labels(event_type).inc(sent_bytes)
+    if dead and session_id in session_connections:
         session_connections[session_id] = [ws for ws in session_connections[session_id] if ws not in dead]
 
 
+async def _send_direct(ws: WebSocket, text: str):
+    """Send to one socket, zstd-compressed if it asked for that."""
+    out = zstd_codec.encode(text) if ws in zstd_sockets else text
+    if isinstance(out, bytes):
+        await ws.send_bytes(out)
+    else:
+        await ws.send_text(out)
+
+
+async def _replay(ws: WebSocket, texts: List[str]):
+    """Resend logged events to one socket, filtered and encoded as _send_to_session would."""
+    subscription = socket_subscriptions.get(ws)
+    now = time.time()
+    for text in texts:
+        if subscription is not None:
+            event = json.loads(text)
+            variant = subscription.variant(event["type"], event["payload"].get("participant_id"), now)
+            if variant is None:
+                BROADCAST_FILTERED.labels(event["type"]).inc()
+                continue
+            if variant != FULL:
+                text = json.dumps(summary_variant(event))
+        await _send_direct(ws, text)
+
+
+@app.get("/ws/zstd-dictionary")
+async def zstd_dictionary():
+    """The dictionary ?compress=zstd frames are compressed with."""
+    if not zstd_codec.enabled:
+        raise HTTPException(status_code=404, detail="zstd compression not available")
+    if not zstd_codec.loaded:
+        await run_in_threadpool(zstd_codec.load)
+    return Response(
+        content=zstd_codec.dictionary,
+        media_type="application/octet-stream",
+        headers={"X-Zstd-Dictionary-Id": str(zstd_codec.dict_id), "Cache-Control": "public, max-age=3600"},
+    )
+
+
+async def _close_quietly(ws: WebSocket, code: int, reason: str):
+    # A dead peer never completes the close handshake; don't wait on it
+    try:
+        await asyncio.wait_for(ws.close(code=code, reason=reason), 5)
+    except Exception:
+        pass
+
+
+async def _remove_participant(session: SessionState, participant_id: str):
+    """Drop a participant, tell the others, and end the session once it is empty."""
+    session_id = session.session_id
+    if participant_id in session.participants:
+        del session.participants[participant_id]
+        signal_history.close_participant(session_id, participant_id)
+        rate_limiter.forget_participant(session_id, participant_id)
+        _cancel_merged_signal(session_id, participant_id)
+        print(f"✓ Participant {participant_id[:8]} disconnected from session {session_id[:8]}")
+        # Broadcast participant left
+        await _broadcast(session_id, {
+            "type": "participant_left",
+            "payload": {"participant_id": participant_id},
+        })
+
+    # Clean up empty sessions
+    if len(session.participants) == 0:
+        print(f"✓ Session {session_id[:8]} ended (no participants)")
+        session.ended_at = time.time()
+        store.save_session(session_id, _snapshot(session))
+        signal_history.close_session(session_id)
+        _forget_session(session_id)
+
+
+async def _publish_signal(session: SessionState, participant_id: str, signal: SignalPayload):
+    """Record a participant's signal and broadcast the session_update for it."""
+    session_id = session.session_id
+    signal_history.record(session_id, participant_id, signal)
+
+    # Under loop lag, coalesce updates: the next one carries the fresh summary
+    throttle = loop_monitor.throttle_interval()
+    now = time.time()
+    if throttle and now - session_update_at.get(session_id, 0.0) < throttle:
+        loop_monitor.record_shed("session_update")
+        _event_log(session_id).invalidate()
+        return
+    session_update_at[session_id] = now
+    summary = _compute_session_summary(session)
+    await _broadcast(session_id, {
+        "type": "session_update",
+        "payload": {
+            "participant_id": participant_id,
+            "display_name": session.participants[participant_id].display_name,
+            "signal": signal.model_dump(),
+            "summary": summary,
+        },
+    })
+
+
+async def _flush_merged_signal(session_id: str, participant_id: str):
+    """Publish the latest of a run of rate-limited signals once the buckets allow it."""
+    while True:
+        await asyncio.sleep(max(0.01, rate_limiter.retry_after(SIGNAL_LIMIT, session_id, participant_id)))
+        session = sessions.get(session_id)
+        participant = session.participants.get(participant_id) if session else None
+        if participant is None:
+            merged_signals.pop((session_id, participant_id), None)
+            return
+        if rate_limiter.allow(SIGNAL_LIMIT, session_id, participant_id):
+            break
+    merged_signals.pop((session_id, participant_id), None)
+    await _publish_signal(session, participant_id, participant.latest_signal)
+
+
+def _merge_signal(session_id: str, participant_id: str):
+    # latest_signal already holds the merged state; make sure it goes out eventually
+    _event_log(session_id).invalidate()
+    if (session_id, participant_id) not in merged_signals:
+        merged_signals[(session_id, participant_id)] = asyncio.create_task(
+            _flush_merged_signal(session_id, participant_id)
+        )
+
+
+def _cancel_merged_signal(session_id: str, participant_id: str):
+    task = merged_signals.pop((session_id, participant_id), None)
+    if task is not None:
+        task.cancel()
+
+
+async def _socket_closed(ws: WebSocket, session: SessionState, participant_id: str):
+    """A socket's handler is done: detach it and drop its participant if no other socket holds them."""
+    session_id = session.session_id
+    if sessions.get(session_id) is not session:
+        return  # already ended or evicted
+    if ws in session_connections.get(session_id, []):
+        session_connections[session_id].remove(ws)
+    participant = session.participants.get(participant_id)
+    if participant is not None and participant.stale:
+        return  # dropped by the heartbeat; kept until it reconnects or the grace period ends
+    if heartbeat.has_live_socket(session_id, participant_id, session_connections.get(session_id, [])):
+        return  # an old socket closing after the participant reconnected
+    await _remove_participant(session, participant_id)
+
+
+async def _set_stale(session: SessionState, participant_id: str, stale: bool):
+    participant = session.participants.get(participant_id)
+    if participant is None or participant.stale == stale:
+        return
+    participant.stale = stale
+    await _broadcast(session.session_id, {
+        "type": "participant_status",
+        "payload": {
+            "participant_id": participant_id,
+            "stale": stale,
+            "summary": _compute_session_summary(session),
+        },
+    })
+
+
+async def _socket_dead(ws: WebSocket, session_id: str, participant_id: str):
+    """Heartbeat timeout: stop broadcasting to the socket and mark its participant stale."""
+    connections = session_connections.get(session_id, [])
+    if ws in connections:
+        connections.remove(ws)
+    socket_subscriptions.pop(ws, None)
+    zstd_sockets.discard(ws)
+    asyncio.create_task(_close_quietly(ws, 4000, "heartbeat timeout"))
+    session = sessions.get(session_id)
+    if session is None or heartbeat.has_live_socket(session_id, participant_id, connections):
+        return
+    print(f"⚠ Participant {participant_id[:8]} missed heartbeat in session {session_id[:8]}; marked stale")
+    heartbeat.mark_stale(session_id, participant_id)
+    await _set_stale(session, participant_id, True)
+
+
+async def _stale_expired(session_id: str, participant_id: str):
+    session = sessions.get(session_id)
+    participant = session.participants.get(participant_id) if session else None
+    if participant is not None and participant.stale:
+        await _remove_participant(session, participant_id)
+
+
+# One timer task per worker pings quiet sockets and drops unresponsive ones
+heartbeat = HeartbeatMonitor(_socket_dead, _stale_expired)
+
+
 @app.websocket("/ws/{session_id}/{participant_id}")
-async def websocket_endpoint(ws: WebSocket, session_id: str, participant_id: str):
+async def websocket_endpoint(
+    ws: WebSocket,
+    session_id: str,
+    participant_id: str,
+    epoch: Optional[str] = None,
+    since: Optional[int] = None,
+    summary_only: bool = False,
+    participants: Optional[str] = None,
+    events: Optional[str] = None,
+    max_hz: Optional[float] = None,
+    compress: Optional[str] = None,
+):
+    """
+    Reconnecting clients may pass ?epoch=&since= from the last event they saw;
+    if the event log still covers the gap they get a session_resume followed
+    by the missed events instead of a full session_init.
+
+    Broadcast filters (see subscriptions.py) may be set with ?summary_only=,
+    participants=, events=, max_hz= or later with a `subscribe` message.
+
+    ?compress=zstd switches larger messages to binary zstd frames using the
+    dictionary from /ws/zstd-dictionary (see ws_compression.py).
+
+    The server sends `ping` to quiet sockets; clients answer with `pong`
+    (see heartbeat.py).
+    """
     session = _ensure_session(session_id)
     await ws.accept()
+    try:
+        subscription = Subscription(summary_only, participants, events, max_hz)
+    except ValueError as e:
+        await ws.send_text(json.dumps({"type": "error", "payload": {"message": str(e), "kind": "subscribe"}}))
+        await _close_quietly(ws, 1008, "invalid subscription")
+        return
+    if compress == "zstd" and zstd_codec.enabled:
+        if not zstd_codec.loaded:
+            await run_in_threadpool(zstd_codec.load)
+        zstd_sockets.add(ws)
+        await ws.send_text(json.dumps({"type": "compression", "payload": zstd_codec.describe()}))
+    if not subscription.is_default():
+        socket_subscriptions[ws] = subscription
 
     # Track connection for broadcast
     session_connections[session_id].append(ws)
+    session_reaper.touch(session_id)
+    heartbeat.register(ws, session_id, participant_id)
+    if recorder.enabled:
+        recorder.ws_open(session_id, participant_id)
 
     # Ensure participant exists
     if participant_id not in session.participants:
         session.participants[participant_id] = ParticipantState(participant_id=participant_id, display_name="Guest")
-
-    # Send initial snapshot
-    await ws.send_text(json.dumps({
-        "type": "session_init",
-        "payload": {
-            "session": {
-                "id": session.session_id,
-                "name": session.name,
-                "host_id": session.host_id,
-                "host_display_name": session.host_display_name,
-            },
-            "participants": {pid: p.display_name for pid, p in session.participants.items()},
-            "summary": _compute_session_summary(session),
-            "stt_enabled": session.stt_enabled,
-            "transcript": session.transcript[-50:],
-        },
-    }))
+        _event_log(session_id).invalidate()
+    else:
+        # Back within the stale grace period
+        await _set_stale(session, participant_id, False)
+
+    missed = _event_log(session_id).since(epoch, since) if since is not None else None
+    if missed is not None:
+        SESSION_INIT_TOTAL.labels("resume").inc()
+        log = _event_log(session_id)
+        await _send_direct(ws, json.dumps({
+            "type": "session_resume",
+            "payload": {"epoch": log.epoch, "version": log.version, "missed": len(missed)},
+        }))
+        await _replay(ws, missed)
+    else:
+        # Send initial snapshot
+        await _send_direct(ws, _session_init_text(session))
 
     try:
         while True:
             raw = await ws.receive_text()
+            started = time.perf_counter()
+            if recorder.enabled:
+                recorder.ws_message(session_id, participant_id, raw)
+            heartbeat.seen(ws)
+            # Any traffic, heartbeat replies included: a session answering pongs is not idle
+            session_reaper.touch(session_id)
             data = WsEnvelope.model_validate_json(raw)
 
-            if data.type == "signal":
+            if data.type == "pong":
+                pass
+
+            elif data.type == "signal":
                 signal = SignalPayload(**data.payload)
                 session.participants[participant_id].latest_signal = signal
-                summary = _compute_session_summary(session)
-                await _broadcast(session_id, {
-                    "type": "session_update",
-                    "payload": {
-                        "participant_id": participant_id,
-                        "display_name": session.participants[participant_id].display_name,
-                        "signal": signal.model_dump(),
-                        "summary": summary,
-                    },
-                })
+                if rate_limiter.allow(SIGNAL_LIMIT, session_id, participant_id):
+                    _cancel_merged_signal(session_id, participant_id)
+                    await _publish_signal(session, participant_id, signal)
+                else:
+                    # Over the limit: only the latest state survives, published when tokens return
+                    _merge_signal(session_id, participant_id)
+
+            elif data.type == "chat" and not rate_limiter.allow(CHAT_LIMIT, session_id, participant_id):
+                await ws.send_text(json.dumps({"type": "error", "payload": {
+                    "message": "Rate limit exceeded",
+                    "kind": "chat",
+                    "retry_after": round(rate_limiter.retry_after(CHAT_LIMIT, session_id, participant_id), 3),
+                }}))
 
             elif data.type == "chat":
                 chat = ChatPayload(**data.payload)
                 session.participants[participant_id].chat_history.append(chat)
+                session_reaper.account(session_id, len(chat.message) + CHAT_OVERHEAD_BYTES)
+                search_index.add(
+                    session_id, CHAT, participant_id, chat.message, chat.timestamp,
+                    session.participants[participant_id].display_name,
+                )
                 
-                # Use Groq AI for sentiment analysis
-                sentiment_result = groq_ai.analyze_chat_sentiment(chat.message)
+                # Use Groq AI for sentiment analysis, or the local heuristic when overloaded
+                if loop_monitor.defer_llm():
+                    loop_monitor.record_shed("llm_enrichment")
+                    sentiment_result = {"sentiment": _simple_sentiment(chat.message), "emotion": "neutral", "confidence": 0.3}
+                else:
+                    sentiment_result = groq_ai.analyze_chat_sentiment(chat.message)
                 sentiment = sentiment_result.get("sentiment", 0.5)
                 emotion = sentiment_result.get("emotion", "neutral")
                 
-                firebase_store.save_chat(session_id, participant_id, chat.message, chat.timestamp)
+                store.save_chat(session_id, participant_id, chat.message, chat.timestamp)
                 await _broadcast(session_id, {
                     "type": "chat",
                     "payload": {
@@ -447,6 +1192,22 @@ async def websocket_endpoint(ws: WebSocket, session_id: str, participant_id: str
                     },
                 })
 
+            elif data.type == "subscribe":
+                subscription = socket_subscriptions.get(ws) or Subscription()
+                try:
+                    subscription.update(data.payload)
+                except ValueError as e:
+                    await ws.send_text(json.dumps({"type": "error", "payload": {
+                        "message": str(e),
+                        "kind": "subscribe",
+                    }}))
+                else:
+                    if subscription.is_default():
+                        socket_subscriptions.pop(ws, None)
+                    else:
+                        socket_subscriptions[ws] = subscription
+                    await ws.send_text(json.dumps({"type": "subscribed", "payload": subscription.describe()}))
+
             elif data.type == "stt_toggle":
                 enabled = bool(data.payload.get("enabled", False))
                 session.stt_enabled = enabled
@@ -458,30 +1219,23 @@ async def websocket_endpoint(ws: WebSocket, session_id: str, participant_id: str
             else:
                 await ws.send_text(json.dumps({"type": "error", "payload": {"message": "Unknown event type"}}))
 
+            kind = data.type if data.type in WS_EVENT_TYPES else "unknown"
+            WS_MESSAGE_SECONDS.labels(kind).observe(time.perf_counter() - started)
+
     except WebSocketDisconnect:
-        # Remove connection and participant from session
-        if ws in session_connections.get(session_id, []):
-            session_connections[session_id].remove(ws)
-        
-        # Remove participant from session
-        if participant_id in session.participants:
-            del session.participants[participant_id]
-            print(f"✓ Participant {participant_id[:8]} disconnected from session {session_id[:8]}")
-            # Broadcast participant left
-            await _broadcast(session_id, {
-                "type": "participant_left",
-                "payload": {"participant_id": participant_id},
-            })
-        
-        # Clean up empty sessions
-        if len(session.participants) == 0:
-            print(f"✓ Session {session_id[:8]} ended (no participants)")
-            if session_id in sessions:
-                del sessions[session_id]
-            if session_id in session_connections:
-                del session_connections[session_id]
+        await _socket_closed(ws, session, participant_id)
                 
     except Exception as exc:
-        await ws.send_text(json.dumps({"type": "error", "payload": {"message": str(exc)}}))
+        try:
+            await ws.send_text(json.dumps({"type": "error", "payload": {"message": str(exc)}}))
+        except Exception:
+            pass
+        # Don't leave a socket nothing reads from in the session
+        await _socket_closed(ws, session, participant_id)
+        await _close_quietly(ws, 1011, "internal error")
     finally:
-        pass
+        socket_subscriptions.pop(ws, None)
+        zstd_sockets.discard(ws)
+        heartbeat.forget(ws)
+        if recorder.enabled:
+            recorder.ws_close(session_id, participant_id)
@@ -0,0 +1,148 @@
+"""
+Token-bucket rate limits per participant and per session.
+- Every event kind (signal, chat, frame) has a participant bucket and a
+  session bucket: RATE_<KIND>_HZ / RATE_<KIND>_BURST and
+  RATE_SESSION_<KIND>_HZ / RATE_SESSION_<KIND>_BURST (HZ=0 disables one)
+- Buckets refill lazily on use; no timers. Idle buckets are evicted in
+  least-recently-used order past RATE_MAX_BUCKETS, which is safe because an
+  idle bucket has refilled to its burst anyway
+- What happens to excess is up to the caller: main.py merges excess signals
+  into the participant's latest state, rejects excess chat, and the frame
+  endpoints answer 429 before decoding anything
+- Frames from unknown participants share one bucket per client address; behind
+  a proxy that is the proxy's address unless TRUST_FORWARDED_FOR=1 (see
+  analysis_router.py)
+- RATE_LIMITS=0 turns everything off
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import metrics
+
+SIGNAL = "signal"
+CHAT = "chat"
+FRAME = "frame"
+
+PARTICIPANT = "participant"
+SESSION = "session"
+
+RATE_LIMITS_ENABLED = os.getenv("RATE_LIMITS", "1") == "1"
+MAX_BUCKETS = int(os.getenv("RATE_MAX_BUCKETS", "100000"))
+
+
+def _limit(name: str, hz: float, burst: float) -> Tuple[float, float]:
+    return float(os.getenv(f"{name}_HZ", str(hz))), float(os.getenv(f"{name}_BURST", str(burst)))
+
+
+# (rate, burst) per kind and scope
+LIMITS: Dict[str, Dict[str, Tuple[float, float]]] = {
+    SIGNAL: {PARTICIPANT: _limit("RATE_SIGNAL", 10, 20), SESSION: _limit("RATE_SESSION_SIGNAL", 200, 400)},
+    CHAT: {PARTICIPANT: _limit("RATE_CHAT", 2, 10), SESSION: _limit("RATE_SESSION_CHAT", 20, 40)},
+    FRAME: {PARTICIPANT: _limit("RATE_FRAME", 5, 10), SESSION: _limit("RATE_SESSION_FRAME", 50, 100)},
+}
+
+RATE_LIMITED_TOTAL = metrics.counter(
+    "convoweave_rate_limited_total", "Events over a rate limit, by kind and the bucket that ran out", ("kind", "scope")
+)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (after refill)."""
+        return max(0.0, (min(cost, self.burst) - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Dict[str, Tuple[float, float]]] = LIMITS, max_buckets: int = MAX_BUCKETS):
+        self.enabled = RATE_LIMITS_ENABLED
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        metrics.gauge("convoweave_rate_limit_buckets", "Token buckets held by the rate limiter", fn=lambda: len(self.buckets))
+
+    def _buckets(self, kind: str, session_id: Optional[str], participant_id: Optional[str],
+                 now: float) -> List[Tuple[str, TokenBucket]]:
+        keys = []
+        if participant_id is not None:
+            keys.append((PARTICIPANT, (kind, session_id, participant_id)))
+        if session_id is not None:
+            keys.append((SESSION, (kind, session_id)))
+        found = []
+        for scope, key in keys:
+            rate, burst = self.limits[kind][scope]
+            if rate <= 0:
+                continue
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(rate, burst, now)
+                if len(self.buckets) > self.max_buckets:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                bucket.refill(now)
+            found.append((scope, bucket))
+        return found
+
+    def allow(self, kind: str, session_id: Optional[str], participant_id: Optional[str],
+              cost: float = 1.0, now: Optional[float] = None) -> bool:
+        """Take `cost` tokens from every bucket that applies, or from none if any is short."""
+        if not self.enabled:
+            return True
+        now = time.time() if now is None else now
+        buckets = self._buckets(kind, session_id, participant_id, now)
+        for scope, bucket in buckets:
+            if bucket.tokens < min(cost, bucket.burst):
+                RATE_LIMITED_TOTAL.labels(kind, scope).inc()
+                return False
+        for _, bucket in buckets:
+            bucket.tokens -= cost
+        return True
+
+    def exhausted(self, kind: str, session_id: Optional[str], participant_id: Optional[str],
+                  now: Optional[float] = None) -> bool:
+        """True (and counted as limited) if not even one token is left; takes nothing."""
+        if not self.enabled:
+            return False
+        now = time.time() if now is None else now
+        for scope, bucket in self._buckets(kind, session_id, participant_id, now):
+            if bucket.tokens < 1:
+                RATE_LIMITED_TOTAL.labels(kind, scope).inc()
+                return True
+        return False
+
+    def retry_after(self, kind: str, session_id: Optional[str], participant_id: Optional[str],
+                    cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Seconds until `allow` would pass again."""
+        if not self.enabled:
+            return 0.0
+        now = time.time() if now is None else now
+        return max((b.wait(cost) for _, b in self._buckets(kind, session_id, participant_id, now)), default=0.0)
+
+    def forget_participant(self, session_id: str, participant_id: str):
+        for kind in self.limits:
+            self.buckets.pop((kind, session_id, participant_id), None)
+
+    def forget_session(self, session_id: str):
+        for kind in self.limits:
+            self.buckets.pop((kind, session_id), None)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "buckets": len(self.buckets)}
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,173 @@
+"""
+Incremental full-text index over session chat and transcripts.
+- One inverted index per session: token -> postings (doc ids + term counts)
+- Entries are indexed as they are appended, so queries never rescan history
+- BM25 ranking with participant / kind / time-range filters and top-k
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his
+how i if in into is it its just me more most my no nor not now of off on once only or other our out over own
+same she should so some such than that the their them then there these they this those through to too under
+until up very was we were what when where which while who whom why will with would you your
+""".split())
+
+K1 = 1.2
+B = 0.75
+
+CHAT = "chat"
+TRANSCRIPT = "transcript"
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class SessionSearchIndex:
+    def __init__(self):
+        # Document columns, indexed by doc id
+        self.kinds: List[str] = []
+        self.participants: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.timestamps: List[float] = []
+        self.texts: List[str] = []
+        self.lengths: List[int] = []
+        self.total_length = 0
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, kind: str, participant_id: str, text: str, timestamp: float, display_name: Optional[str] = None):
+        doc_id = len(self.texts)
+        tokens = tokenize(text)
+        self.kinds.append(kind)
+        self.participants.append(participant_id)
+        self.names.append(display_name)
+        self.timestamps.append(timestamp)
+        self.texts.append(text)
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        for token, tf in Counter(tokens).items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = ([], [])
+            posting[0].append(doc_id)
+            posting[1].append(tf)
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        participant_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Tuple[int, List[dict]]:
+        """Returns (number of matching entries, top-k results by BM25)."""
+        n = len(self.texts)
+        if not n:
+            return 0, []
+        avg_len = self.total_length / n or 1.0
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            doc_ids, tfs = posting
+            idf = math.log(1 + (n - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            lengths = self.lengths
+            for doc_id, tf in zip(doc_ids, tfs):
+                norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[doc_id] / avg_len))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+
+        if participant_id is not None or kind is not None or since is not None or until is not None:
+            scores = {d: s for d, s in scores.items() if self._matches(d, participant_id, kind, since, until)}
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], self.timestamps[item[0]]))
+        return len(scores), [self._result(doc_id, score) for doc_id, score in top]
+
+    def _matches(self, doc_id: int, participant_id, kind, since, until) -> bool:
+        if participant_id is not None and self.participants[doc_id] != participant_id:
+            return False
+        if kind is not None and self.kinds[doc_id] != kind:
+            return False
+        ts = self.timestamps[doc_id]
+        if since is not None and ts < since:
+            return False
+        if until is not None and ts > until:
+            return False
+        return True
+
+    def _result(self, doc_id: int, score: float) -> dict:
+        return {
+            "kind": self.kinds[doc_id],
+            "participant_id": self.participants[doc_id],
+            "display_name": self.names[doc_id],
+            "timestamp": self.timestamps[doc_id],
+            "text": self.texts[doc_id],
+            "score": round(score, 4),
+        }
+
+
+class SearchIndex:
+    """Live indexes for in-memory sessions, plus an LRU of indexes rebuilt for ended ones."""
+
+    def __init__(self, max_archived: int = 32):
+        self.live: Dict[str, SessionSearchIndex] = {}
+        self.archived: "OrderedDict[str, SessionSearchIndex]" = OrderedDict()
+        self.max_archived = max_archived
+
+    def add(self, session_id: str, kind: str, participant_id: str, text: str, timestamp: float,
+            display_name: Optional[str] = None):
+        index = self.live.get(session_id)
+        if index is None:
+            index = self.live[session_id] = SessionSearchIndex()
+        index.add(kind, participant_id, text, timestamp, display_name)
+
+    def get(self, session_id: str) -> Optional[SessionSearchIndex]:
+        index = self.live.get(session_id)
+        if index is None:
+            index = self.archived.get(session_id)
+            if index is not None:
+                self.archived.move_to_end(session_id)
+        return index
+
+    def build_archived(self, session_id: str, chat: Iterable[dict], transcript: Iterable[dict],
+                       names: Optional[Dict[str, str]] = None) -> SessionSearchIndex:
+        """Index a session that is no longer in memory, from stored chat/transcript."""
+        names = names or {}
+        entries = [(e.get("timestamp") or 0.0, CHAT, e) for e in chat] + \
+                  [(e.get("timestamp") or 0.0, TRANSCRIPT, e) for e in transcript]
+        index = SessionSearchIndex()
+        for ts, kind, entry in sorted(entries, key=lambda item: item[0]):
+            text = entry.get("message") if kind == CHAT else entry.get("text")
+            pid = entry.get("participant_id") or "unknown"
+            if text:
+                index.add(kind, pid, text, ts, entry.get("display_name") or names.get(pid))
+        self.archived[session_id] = index
+        while len(self.archived) > self.max_archived:
+            self.archived.popitem(last=False)
+        return index
+
+    def retire(self, session_id: str):
+        """Session left memory: keep its index searchable in the archived LRU."""
+        index = self.live.pop(session_id, None)
+        if index is None:
+            return
+        self.archived[session_id] = index
+        while len(self.archived) > self.max_archived:
+            self.archived.popitem(last=False)
+
+    def drop(self, session_id: str):
+        self.live.pop(session_id, None)
+        self.archived.pop(session_id, None)
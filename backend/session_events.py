@@ -0,0 +1,59 @@
+"""
+Versioned per-session event log and session_init snapshot cache.
+- Every broadcast event gets the next session version and is kept in a
+  bounded log of encoded messages
+- The encoded session_init snapshot is cached until the version moves
+  (or the session changes without an event, via invalidate())
+- Reconnecting clients that send their last-seen epoch/version get just
+  the missed events replayed, if the log still covers them
+"""
+
+import os
+import uuid
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+EVENT_LOG_SIZE = int(os.getenv("SESSION_EVENT_LOG_SIZE", "256"))
+
+
+class SessionEventLog:
+    __slots__ = ("epoch", "version", "events", "_snapshot", "_snapshot_version")
+
+    def __init__(self, maxlen: int = EVENT_LOG_SIZE):
+        # A new epoch per log, so versions from before a restart never match
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.events: Deque[Tuple[int, str]] = deque(maxlen=maxlen)
+        self._snapshot: Optional[str] = None
+        self._snapshot_version = -1
+
+    def next_version(self) -> int:
+        self.version += 1
+        return self.version
+
+    def record(self, version: int, text: str):
+        self.events.append((version, text))
+
+    def since(self, epoch: Optional[str], version: int) -> Optional[List[str]]:
+        """Encoded events after `version`, or None if a full snapshot is needed."""
+        if epoch != self.epoch or version > self.version:
+            return None
+        if version == self.version:
+            return []
+        if not self.events or self.events[0][0] > version + 1:
+            return None  # fell out of the bounded log
+        return [text for v, text in self.events if v > version]
+
+    def snapshot(self) -> Optional[str]:
+        if self._snapshot_version == self.version:
+            return self._snapshot
+        return None
+
+    def store_snapshot(self, text: str):
+        self._snapshot = text
+        self._snapshot_version = self.version
+
+    def invalidate(self):
+        """State changed without a logged event (e.g. a coalesced signal)."""
+        self._snapshot = None
+        self._snapshot_version = -1
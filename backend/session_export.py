@@ -0,0 +1,137 @@
+"""
+Streaming export of session history: chat, transcript and signal rollups.
+- Records are read from the store a page at a time and encoded as they go,
+  so memory stays flat however long the session ran
+- NDJSON (one record per line) or CSV (one fixed set of columns for all kinds)
+- Optional on-the-fly gzip; output is emitted in ~64KB chunks
+"""
+
+import csv
+import io
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from signal_history import SIGNAL_FIELDS, decode_rollups, rollup_rows
+
+PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+CHUNK_BYTES = 64 * 1024
+
+CHAT = "chat"
+TRANSCRIPT = "transcript"
+SIGNALS = "signals"
+KINDS = (CHAT, TRANSCRIPT, SIGNALS)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CSV_COLUMNS = [
+    "type", "timestamp", "participant_id", "display_name", "text",
+    "tone", "energy", "stress_level", "resolution", "count",
+] + [f"{field}_{agg}" for field in SIGNAL_FIELDS for agg in ("mean", "min", "max")]
+
+
+def _in_range(ts: float, since: Optional[float], until: Optional[float]) -> bool:
+    return (since is None or ts >= since) and (until is None or ts <= until)
+
+
+def iter_records(
+    store,
+    session_id: str,
+    kinds: Sequence[str] = KINDS,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    resolution: int = 1,
+    flushed_chunks: Optional[int] = None,
+    unflushed: Iterable[Dict[str, Any]] = (),
+) -> Iterator[Dict[str, Any]]:
+    """
+    Session records grouped by kind, each kind in time order.
+    `flushed_chunks`/`unflushed` come from SignalHistory.unflushed_rows(), taken
+    together so rollups flushed mid-export are neither missed nor duplicated.
+    """
+    if CHAT in kinds:
+        for row in store.iter_chat(session_id, since, until, PAGE_SIZE):
+            yield {"type": CHAT, **row}
+    if TRANSCRIPT in kinds:
+        for entry in store.iter_transcript(session_id, since, until, PAGE_SIZE):
+            yield {"type": TRANSCRIPT, **entry}
+    if SIGNALS in kinds:
+        for blob in store.iter_signal_rollups(session_id, resolution, flushed_chunks):
+            for row in rollup_rows(decode_rollups(blob)):
+                if _in_range(row["timestamp"], since, until):
+                    yield row
+        for row in unflushed:
+            if _in_range(row["timestamp"], since, until):
+                yield row
+
+
+def encode_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, separators=(",", ":"), default=str) + "\n"
+
+
+def encode_csv(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        if record["type"] == CHAT:
+            record = {**record, "text": record.get("message")}
+        writer.writerow(record)
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    """Coalesce small encoded pieces into ~CHUNK_BYTES writes."""
+    parts: List[str] = []
+    size = 0
+    for line in lines:
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(parts).encode("utf-8")
+            parts.clear()
+            size = 0
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip: listed (or *) with q > 0."""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    q = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return q > 0
+
+
+def _gzipped(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_export(records: Iterable[Dict[str, Any]], fmt: str = "ndjson", gzip: bool = False) -> Iterator[bytes]:
+    encoded = encode_csv(records) if fmt == "csv" else encode_ndjson(records)
+    chunks = _chunked(encoded)
+    return _gzipped(chunks) if gzip else chunks
@@ -0,0 +1,171 @@
+"""
+Idle-session reaper and memory-bounded session lifecycle.
+- Activity is tracked in an OrderedDict kept in last-activity order, so the
+  front of the dict is always the next session to expire: it behaves as a
+  timer queue with O(1) touch and no per-session timers
+- Sessions with no sockets expire after SESSION_EMPTY_TTL_S, sessions whose
+  sockets have gone quiet (no messages, no heartbeat pongs) after
+  SESSION_IDLE_TTL_S
+- touch() is also called from threadpool endpoints, so bookkeeping takes a
+  lock and sweeps work on a snapshot
+- A global cap on session count and estimated bytes evicts the least
+  recently active sessions that have no open sockets
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+SESSION_EMPTY_TTL_S = float(os.getenv("SESSION_EMPTY_TTL_S", "600"))
+SESSION_IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL_S", "1800"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_MB", "512")) * 1024 * 1024
+SWEEP_INTERVAL_S = float(os.getenv("SESSION_SWEEP_INTERVAL_S", "5"))
+
+# Rough per-entry overhead of Pydantic models / dicts on top of the text
+CHAT_OVERHEAD_BYTES = 400
+TRANSCRIPT_OVERHEAD_BYTES = 800
+SESSION_OVERHEAD_BYTES = 2000
+
+EVICTIONS_TOTAL = metrics.counter("convoweave_session_evictions_total", "Sessions evicted by reason", ("reason",))
+
+EMPTY = "empty"
+IDLE = "idle"
+CAPACITY = "capacity"
+
+
+class SessionReaper:
+    def __init__(
+        self,
+        evict: Callable[[str, str], Awaitable[None]],
+        has_connections: Callable[[str], bool],
+    ):
+        self.evict = evict
+        self.has_connections = has_connections
+        self.activity: "OrderedDict[str, float]" = OrderedDict()
+        self.sizes: Dict[str, int] = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions: Dict[str, int] = {EMPTY: 0, IDLE: 0, CAPACITY: 0}
+        self._task: Optional[asyncio.Task] = None
+        metrics.gauge("convoweave_session_estimated_bytes", "Estimated memory held by sessions", fn=lambda: self.total_bytes)
+
+    # ----------------------------
+    # Bookkeeping (hot path)
+    # ----------------------------
+
+    def touch(self, session_id: str, now: Optional[float] = None):
+        with self._lock:
+            self.activity[session_id] = time.time() if now is None else now
+            self.activity.move_to_end(session_id)
+            if session_id not in self.sizes:
+                self.sizes[session_id] = SESSION_OVERHEAD_BYTES
+                self.total_bytes += SESSION_OVERHEAD_BYTES
+
+    def account(self, session_id: str, nbytes: int):
+        with self._lock:
+            if session_id in self.sizes:
+                self.sizes[session_id] += nbytes
+                self.total_bytes += nbytes
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self.activity.pop(session_id, None)
+            self.total_bytes -= self.sizes.pop(session_id, 0)
+
+    # ----------------------------
+    # Sweeping
+    # ----------------------------
+
+    def due(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Sessions to evict now, with the reason."""
+        now = time.time() if now is None else now
+        chosen: Dict[str, str] = {}
+        oldest_allowed = now - min(SESSION_EMPTY_TTL_S, SESSION_IDLE_TTL_S)
+
+        # Snapshot oldest first; the whole order is only copied when over a cap
+        with self._lock:
+            count = len(self.activity)
+            total = self.total_bytes
+            over_cap = count > SESSION_MAX or total > SESSION_MAX_BYTES
+            if over_cap:
+                activity = list(self.activity.items())
+            else:
+                activity = []
+                for session_id, last in self.activity.items():
+                    if last > oldest_allowed:
+                        break
+                    activity.append((session_id, last))
+            sizes = {s: self.sizes.get(s, 0) for s, _ in activity}
+
+        # TTLs: walk from the least recently active until nothing can be expired
+        for session_id, last in activity:
+            if last > oldest_allowed:
+                break
+            idle_for = now - last
+            if not self.has_connections(session_id):
+                if idle_for >= SESSION_EMPTY_TTL_S:
+                    chosen[session_id] = EMPTY
+            elif idle_for >= SESSION_IDLE_TTL_S:
+                chosen[session_id] = IDLE
+
+        # Caps: evict least recently active sessions without sockets
+        count -= len(chosen)
+        total -= sum(sizes[s] for s in chosen)
+        if over_cap:
+            for session_id, _ in activity:
+                if count <= SESSION_MAX and total <= SESSION_MAX_BYTES:
+                    break
+                if session_id in chosen or self.has_connections(session_id):
+                    continue
+                chosen[session_id] = CAPACITY
+                count -= 1
+                total -= sizes[session_id]
+        return list(chosen.items())
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        evicted = 0
+        for session_id, reason in self.due(now):
+            try:
+                await self.evict(session_id, reason)
+            except Exception as e:
+                print(f"⚠ Eviction of session {session_id[:8]} failed: {e}")
+            self.forget(session_id)
+            self.evictions[reason] += 1
+            EVICTIONS_TOTAL.labels(reason).inc()
+            evicted += 1
+        return evicted
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL_S)
+            try:
+                await self.sweep()
+            except Exception as e:
+                # Keep sweeping; one bad pass must not stop eviction for good
+                print(f"⚠ Session sweep failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self.activity),
+            "estimated_mb": round(self.total_bytes / (1024 * 1024), 2),
+            "evicted": dict(self.evictions),
+        }
@@ -0,0 +1,315 @@
+"""
+Signal history persistence tier for ConvoWeave.
+- Signals are folded straight into 1s / 10s / 1min rollups (mean, min, max,
+  count); raw values are never kept
+- Closed rollups are flushed per session as compact columnar blobs, numbered
+  on from the last chunk in the store so a restored session never overwrites
+- Flushing runs off the event loop (flush_due_sessions from the store timer);
+  record() only aggregates in memory, under a lock shared with the flusher
+- Past SIGNAL_MAX_PENDING_ROWS unflushed rows per resolution (store failing),
+  the oldest are dropped and counted in convoweave_signal_rollups_dropped_total
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import metrics
+
+RESOLUTIONS = (1, 10, 60)
+SIGNAL_FIELDS = ("engagement", "confusion", "stress", "energy", "sentiment")
+
+FLUSH_INTERVAL_S = float(os.getenv("SIGNAL_FLUSH_INTERVAL_S", "30"))
+MAX_PENDING_ROWS = int(os.getenv("SIGNAL_MAX_PENDING_ROWS", "20000"))
+
+BLOB_VERSION = 1
+
+ROLLUPS_DROPPED_TOTAL = metrics.counter(
+    "convoweave_signal_rollups_dropped_total", "Rollup rows dropped unflushed past SIGNAL_MAX_PENDING_ROWS"
+)
+
+
+class _Bucket:
+    """Running aggregate for one participant over one rollup window."""
+
+    __slots__ = ("start", "count", "sums", "mins", "maxs", "counts")
+
+    def __init__(self, start: float):
+        n = len(SIGNAL_FIELDS)
+        self.start = start
+        self.count = 0
+        self.sums = [0.0] * n
+        self.mins = [None] * n
+        self.maxs = [None] * n
+        self.counts = [0] * n
+
+    def add(self, values: Tuple[Optional[float], ...]):
+        self.count += 1
+        for i, v in enumerate(values):
+            if v is None:
+                continue
+            self.sums[i] += v
+            self.counts[i] += 1
+            if self.mins[i] is None or v < self.mins[i]:
+                self.mins[i] = v
+            if self.maxs[i] is None or v > self.maxs[i]:
+                self.maxs[i] = v
+
+    def mean(self, i: int) -> Optional[float]:
+        return self.sums[i] / self.counts[i] if self.counts[i] else None
+
+
+class _ParticipantBuffer:
+    __slots__ = ("open",)
+
+    def __init__(self):
+        self.open: Dict[int, _Bucket] = {}
+
+
+class _SessionHistory:
+    __slots__ = ("participants", "pending", "chunks", "dropped", "last_flush")
+
+    def __init__(self, now: float):
+        self.participants: Dict[str, _ParticipantBuffer] = {}
+        self.pending: Dict[int, Deque[Tuple[str, _Bucket]]] = {res: deque() for res in RESOLUTIONS}
+        # Next chunk number per resolution; read from the store on first use
+        self.chunks: Dict[int, Optional[int]] = {res: None for res in RESOLUTIONS}
+        self.dropped = 0
+        self.last_flush = now
+
+    def queue(self, resolution: int, participant_id: str, bucket: _Bucket):
+        pending = self.pending[resolution]
+        if len(pending) >= MAX_PENDING_ROWS:
+            pending.popleft()
+            self.dropped += 1
+            ROLLUPS_DROPPED_TOTAL.inc()
+        pending.append((participant_id, bucket))
+
+
+def _r(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def encode_rollups(resolution: int, rows: List[Tuple[str, _Bucket]]) -> str:
+    """Pack rollup rows into a zlib-compressed, base64 columnar JSON blob."""
+    participants: List[str] = []
+    index: Dict[str, int] = {}
+    columns: Dict[str, Any] = {
+        "v": BLOB_VERSION,
+        "resolution": resolution,
+        "participants": participants,
+        "t": [],
+        "p": [],
+        "count": [],
+    }
+    for field in SIGNAL_FIELDS:
+        columns[field] = {"mean": [], "min": [], "max": []}
+
+    for pid, bucket in rows:
+        if pid not in index:
+            index[pid] = len(participants)
+            participants.append(pid)
+        columns["t"].append(bucket.start)
+        columns["p"].append(index[pid])
+        columns["count"].append(bucket.count)
+        for i, field in enumerate(SIGNAL_FIELDS):
+            col = columns[field]
+            col["mean"].append(_r(bucket.mean(i)))
+            col["min"].append(_r(bucket.mins[i]))
+            col["max"].append(_r(bucket.maxs[i]))
+
+    raw = json.dumps(columns, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+
+
+def decode_rollups(blob: str) -> Dict[str, Any]:
+    """Inverse of encode_rollups, for post-meeting analytics."""
+    return json.loads(zlib.decompress(base64.b64decode(blob)).decode("utf-8"))
+
+
+def _bucket_row(resolution: int, participant_id: str, bucket: _Bucket) -> Dict[str, Any]:
+    row = {"type": "signal", "resolution": resolution, "timestamp": bucket.start,
+           "participant_id": participant_id, "count": bucket.count}
+    for i, field in enumerate(SIGNAL_FIELDS):
+        row[f"{field}_mean"] = _r(bucket.mean(i))
+        row[f"{field}_min"] = _r(bucket.mins[i])
+        row[f"{field}_max"] = _r(bucket.maxs[i])
+    return row
+
+
+def rollup_rows(columns: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Expand a decoded rollup blob back into one flat dict per row."""
+    resolution = columns["resolution"]
+    participants = columns["participants"]
+    for j, start in enumerate(columns["t"]):
+        row = {"type": "signal", "resolution": resolution, "timestamp": start,
+               "participant_id": participants[columns["p"][j]], "count": columns["count"][j]}
+        for field in SIGNAL_FIELDS:
+            col = columns[field]
+            row[f"{field}_mean"] = col["mean"][j]
+            row[f"{field}_min"] = col["min"][j]
+            row[f"{field}_max"] = col["max"][j]
+        yield row
+
+
+class SignalHistory:
+    def __init__(self, store):
+        self.store = store
+        self.sessions: Dict[str, _SessionHistory] = {}
+        # Guards buffers (signal path vs. flusher); _flushing keeps flushes from racing on chunk numbers
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+
+    def _chunk(self, session_id: str, history: _SessionHistory, resolution: int) -> Optional[int]:
+        """Next chunk number to write, or None while the store can't say (retried next flush)."""
+        chunk = history.chunks[resolution]
+        if chunk is None:
+            chunk = self.store.next_rollup_chunk(session_id, resolution)
+            with self._lock:
+                if history.chunks[resolution] is None:
+                    history.chunks[resolution] = chunk
+                chunk = history.chunks[resolution]
+        return chunk
+
+    def record(self, session_id: str, participant_id: str, signal: Any, now: Optional[float] = None):
+        """Fold a signal into every rollup resolution."""
+        now = time.time() if now is None else now
+        values = tuple(getattr(signal, field, None) for field in SIGNAL_FIELDS)
+        with self._lock:
+            history = self.sessions.get(session_id)
+            if history is None:
+                history = self.sessions[session_id] = _SessionHistory(now)
+            buf = history.participants.get(participant_id)
+            if buf is None:
+                buf = history.participants[participant_id] = _ParticipantBuffer()
+
+            for res in RESOLUTIONS:
+                start = float(int(now // res) * res)
+                bucket = buf.open.get(res)
+                if bucket is not None and bucket.start != start:
+                    history.queue(res, participant_id, bucket)
+                    bucket = None
+                if bucket is None:
+                    bucket = buf.open[res] = _Bucket(start)
+                bucket.add(values)
+
+    def unflushed_rows(self, session_id: str, resolution: int) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        """
+        Rollup rows not yet in the store (pending and still-open buckets), plus
+        the next chunk number at this resolution: every stored chunk below it
+        is final (None when the session has no live history, or the store
+        can't say, i.e. every stored chunk is final).
+        """
+        history = self.sessions.get(session_id)
+        if not history:
+            return None, []
+        # Hold the flush lock so rows can't land in the store between the two reads
+        with self._flushing:
+            chunk = self._chunk(session_id, history, resolution)
+            with self._lock:
+                rows = [_bucket_row(resolution, pid, bucket) for pid, bucket in history.pending[resolution]]
+                for pid, buf in history.participants.items():
+                    bucket = buf.open.get(resolution)
+                    if bucket is not None:
+                        rows.append(_bucket_row(resolution, pid, bucket))
+        return chunk, rows
+
+    def pending_rows(self) -> int:
+        return sum(len(rows) for h in list(self.sessions.values()) for rows in h.pending.values())
+
+    def close_participant(self, session_id: str, participant_id: str):
+        """Move a leaving participant's open buckets into the flush queue."""
+        with self._lock:
+            history = self.sessions.get(session_id)
+            if not history:
+                return
+            buf = history.participants.pop(participant_id, None)
+            if buf is None:
+                return
+            for res, bucket in buf.open.items():
+                history.queue(res, participant_id, bucket)
+
+    def _close_expired(self, history: _SessionHistory, now: float):
+        """Queue buckets whose window has passed, so quiet participants' rollups still flush."""
+        for pid, buf in history.participants.items():
+            for res, bucket in list(buf.open.items()):
+                if bucket.start + res <= now:
+                    history.queue(res, pid, bucket)
+                    del buf.open[res]
+
+    def flush_due(self, session_id: str, now: Optional[float] = None) -> bool:
+        history = self.sessions.get(session_id)
+        if not history:
+            return False
+        now = time.time() if now is None else now
+        return now - history.last_flush >= FLUSH_INTERVAL_S
+
+    def flush(self, session_id: str, final: bool = False, now: Optional[float] = None) -> int:
+        """
+        Write pending rollups for a session, one blob per resolution.
+        Returns the number of store writes issued.
+        """
+        with self._flushing:
+            return self._flush(session_id, final, now)
+
+    def _flush(self, session_id: str, final: bool, now: Optional[float]) -> int:
+        history = self.sessions.get(session_id)
+        if not history:
+            return 0
+        now = time.time() if now is None else now
+        history.last_flush = now
+
+        with self._lock:
+            if final:
+                for pid in list(history.participants):
+                    buf = history.participants.pop(pid)
+                    for res, bucket in buf.open.items():
+                        history.queue(res, pid, bucket)
+            else:
+                self._close_expired(history, now)
+
+        writes = 0
+        for res in RESOLUTIONS:
+            pending = history.pending[res]
+            if not pending:
+                continue
+            chunk = self._chunk(session_id, history, res)
+            if chunk is None:
+                continue
+            with self._lock:
+                rows = list(pending)
+            blob = encode_rollups(res, rows)
+            writes += 1
+            if self.store.save_signal_rollups(session_id, res, chunk, blob):
+                written = {id(bucket) for _, bucket in rows}
+                with self._lock:
+                    history.chunks[res] = chunk + 1
+                    # Rows queued during the write stay; any of ours dropped meanwhile are already gone
+                    while pending and id(pending[0][1]) in written:
+                        pending.popleft()
+        if history.dropped:
+            print(f"⚠ Dropped {history.dropped} unflushed signal rollups for session {session_id[:8]}")
+            history.dropped = 0
+        return writes
+
+    def flush_due_sessions(self, now: Optional[float] = None) -> int:
+        """Flush every session past FLUSH_INTERVAL_S; blocking, so run it off the event loop."""
+        now = time.time() if now is None else now
+        writes = 0
+        for session_id in list(self.sessions):
+            if self.flush_due(session_id, now):
+                writes += self.flush(session_id, now=now)
+        return writes
+
+    def close_session(self, session_id: str) -> int:
+        """Final flush, then release all buffers for the session."""
+        with self._flushing:
+            writes = self._flush(session_id, True, None)
+            with self._lock:
+                self.sessions.pop(session_id, None)
+        return writes
@@ -0,0 +1,110 @@
+"""
+Per-socket subscriptions for session broadcasts.
+- Declared at connect (?summary_only=1&participants=a,b&events=chat,session_update&max_hz=2)
+  or later with a `subscribe` message carrying the same fields
+- events: only these broadcast types are delivered (default: all)
+- session_update comes in two encodings: full (with the sender's signal) and
+  summary-only; summary_only, or a participants list that excludes the
+  sender, gets the summary-only one
+- max_hz caps session_update per socket; the summary is cumulative, so a
+  skipped update is superseded by the next one
+- A malformed `subscribe` raises ValueError and changes nothing; main.py
+  answers it with an error message. Connect-time values go through the same
+  checks, and main.py closes the socket with 1008 when they fail
+"""
+
+import math
+from typing import Any, FrozenSet, List, Optional, Union
+
+FULL = "full"
+SUMMARY = "summary"
+
+SESSION_UPDATE = "session_update"
+MAX_LIST_ITEMS = 256
+
+
+def _check_names(field: str, value: Any):
+    if value is not None and not isinstance(value, (str, list)):
+        raise ValueError(f"{field} must be a list, a comma-separated string or null")
+
+
+def _names(value: Any) -> Optional[FrozenSet[str]]:
+    """None (= everything) from null; a set from a list or a comma-separated string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    return frozenset(str(v).strip() for v in list(value)[:MAX_LIST_ITEMS] if str(v).strip())
+
+
+class Subscription:
+    __slots__ = ("summary_only", "participants", "events", "min_interval", "last_update_at")
+
+    def __init__(
+        self,
+        summary_only: bool = False,
+        participants: Optional[Union[str, List[str]]] = None,
+        events: Optional[Union[str, List[str]]] = None,
+        max_hz: Optional[float] = None,
+    ):
+        self.summary_only = False
+        self.participants: Optional[FrozenSet[str]] = None
+        self.events: Optional[FrozenSet[str]] = None
+        self.min_interval = 0.0
+        self.last_update_at = 0.0
+        self.update({"summary_only": summary_only, "participants": participants, "events": events, "max_hz": max_hz})
+
+    def update(self, spec: dict):
+        """Apply a `subscribe` payload; fields left out keep their value, null resets them."""
+        if not isinstance(spec, dict):
+            raise ValueError("subscribe payload must be an object")
+        if "summary_only" in spec and not isinstance(spec["summary_only"], (bool, int, type(None))):
+            raise ValueError("summary_only must be a boolean")
+        for field in ("participants", "events"):
+            if field in spec:
+                _check_names(field, spec[field])
+        max_hz = spec.get("max_hz")
+        if max_hz is not None and (
+            isinstance(max_hz, bool) or not isinstance(max_hz, (int, float)) or not math.isfinite(max_hz) or max_hz < 0
+        ):
+            raise ValueError("max_hz must be a non-negative number or null")
+
+        if "summary_only" in spec:
+            self.summary_only = bool(spec["summary_only"])
+        if "participants" in spec:
+            self.participants = _names(spec["participants"])
+        if "events" in spec:
+            self.events = _names(spec["events"])
+        if "max_hz" in spec:
+            max_hz = float(max_hz or 0)
+            self.min_interval = 1.0 / max_hz if max_hz > 0 else 0.0
+
+    def is_default(self) -> bool:
+        return not self.summary_only and self.participants is None and self.events is None and not self.min_interval
+
+    def variant(self, event_type: str, participant_id: Optional[str], now: float) -> Optional[str]:
+        """Which encoding of an event this socket gets, or None to skip it."""
+        if self.events is not None and event_type not in self.events:
+            return None
+        if event_type != SESSION_UPDATE:
+            return FULL
+        if self.min_interval:
+            if now - self.last_update_at < self.min_interval:
+                return None
+            self.last_update_at = now
+        if self.summary_only or (self.participants is not None and participant_id not in self.participants):
+            return SUMMARY
+        return FULL
+
+    def describe(self) -> dict:
+        return {
+            "summary_only": self.summary_only,
+            "participants": sorted(self.participants) if self.participants is not None else None,
+            "events": sorted(self.events) if self.events is not None else None,
+            "max_hz": round(1.0 / self.min_interval, 3) if self.min_interval else None,
+        }
+
+
+def summary_variant(message: dict) -> dict:
+    """session_update without the per-participant signal dump."""
+    return {**message, "payload": {k: v for k, v in message["payload"].items() if k != "signal"}}
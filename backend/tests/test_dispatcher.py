@@ -0,0 +1,170 @@
+"""
+Dispatcher routing and failover, using local processes only.
+"""
+
+import asyncio
+import json
+import socket
+import sqlite3
+import time
+import uuid
+
+import httpx
+import websockets
+
+from dispatcher import WORKER_HEADER, Dispatcher, HashRing, WorkerHeaderMiddleware, _rewrite_head, session_from_target
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ----------------------------
+# Ring and request parsing
+# ----------------------------
+
+def test_ring_is_stable_and_fails_over_to_a_live_node():
+    ring = HashRing(4)
+    keys = [str(uuid.uuid4()) for _ in range(500)]
+    owners = [ring.owner(k) for k in keys]
+    assert owners == [HashRing(4).owner(k) for k in keys]
+    assert set(owners) == {0, 1, 2, 3}
+
+    alive = [True, False, True, True]
+    for key, owner in zip(keys, owners):
+        moved = ring.owner(key, alive)
+        # Only the dead node's keys move
+        assert moved == owner if owner != 1 else moved in (0, 2, 3)
+    assert ring.owner(keys[0], [False] * 4) is None
+
+
+def test_session_from_target():
+    assert session_from_target("/sessions/abc/participants") == "abc"
+    assert session_from_target("/ws/abc/p1?since=3") == "abc"
+    assert session_from_target("/api/analyze-frame?session_id=abc&participant_id=p") == "abc"
+    assert session_from_target("/sessions") is None
+    assert session_from_target("/health") is None
+
+
+def test_rewrite_head_replaces_and_adds_headers():
+    head = b"POST /sessions HTTP/1.1\r\nHost: x\r\nconnection: keep-alive\r\n\r\n"
+    out = _rewrite_head(head, {b"Connection": b"close", b"X-Session-Id": b"s1"})
+    lines = out[:-4].split(b"\r\n")
+    assert lines[0] == b"POST /sessions HTTP/1.1"
+    assert b"connection: keep-alive" not in lines
+    assert b"Connection: close" in lines and b"X-Session-Id: s1" in lines
+    assert out.endswith(b"\r\n\r\n")
+
+
+def test_route_pins_sessions_until_their_worker_dies():
+    dispatcher = Dispatcher(3)
+    for worker in dispatcher.workers:
+        worker.alive = True
+    session_id = str(uuid.uuid4())
+    first = dispatcher.route(session_id)
+    assert first.index == dispatcher.ring.owner(session_id)
+
+    first.alive = False
+    second = dispatcher.route(session_id)
+    assert second is not first
+
+    # Back up: the session stays where it failed over to, where it is live
+    first.alive = True
+    assert dispatcher.route(session_id) is second
+
+
+def test_worker_header_middleware(monkeypatch):
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    monkeypatch.setenv("CONVOWEAVE_WORKERS", "2")
+    monkeypatch.setenv("CONVOWEAVE_WORKER_ID", "1")
+    asyncio.run(WorkerHeaderMiddleware(app)({"type": "http"}, None, send))
+    assert (WORKER_HEADER, b"1") in sent[0]["headers"]
+
+    monkeypatch.delenv("CONVOWEAVE_WORKERS")
+    sent.clear()
+    asyncio.run(WorkerHeaderMiddleware(app)({"type": "http"}, None, send))
+    assert sent[0]["headers"] == []
+
+
+# ----------------------------
+# Workers
+# ----------------------------
+
+def _stored(db_path: str, session_id: str) -> dict:
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+    return json.loads(row[0])
+
+
+async def _until(check, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if await check():
+                return
+        except (httpx.HTTPError, OSError):
+            pass
+        await asyncio.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+async def _restart_scenario(db_path: str):
+    dispatcher = Dispatcher(2, "127.0.0.1", _free_port(), _free_port())
+    await dispatcher.start()
+    front = f"http://127.0.0.1:{dispatcher.port}"
+    try:
+        async with httpx.AsyncClient(base_url=front, timeout=30) as client:
+            res = await client.post("/sessions", json={"name": "failover"})
+            session_id = res.json()["session_id"]
+            owner = dispatcher.route(session_id)
+            assert res.headers["x-convoweave-worker"] == str(owner.index)
+
+            owner.proc.kill()
+            owner.proc.wait()
+
+            async def served():
+                return (await client.get(f"/sessions/{session_id}")).status_code == 200
+
+            await _until(served)
+            survivor = dispatcher.route(session_id)
+            assert survivor is not owner
+
+            # Keep the session live on the survivor with an open socket
+            async with websockets.connect(f"ws://127.0.0.1:{dispatcher.port}/ws/{session_id}/p1") as ws:
+                assert ws.response.headers["x-convoweave-worker"] == str(survivor.index)
+                await ws.recv()  # session_init
+
+                async def restarted():
+                    return owner.alive
+
+                await _until(restarted)
+                health = (await client.get(f"http://127.0.0.1:{owner.port}/health")).json()
+                assert health["sessions"] == 0
+
+                # Past the empty-session TTL on the restarted worker
+                await asyncio.sleep(4.0)
+                res = await client.get(f"/sessions/{session_id}")
+                assert res.status_code == 200
+                assert res.headers["x-convoweave-worker"] == str(survivor.index)
+                assert not _stored(db_path, session_id).get("ended_at")
+    finally:
+        await dispatcher.stop()
+
+
+def test_restarted_worker_does_not_end_failed_over_sessions(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "shared.db")
+    monkeypatch.setenv("STORE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORE_PATH", db_path)
+    monkeypatch.setenv("LOCAL_STORE_BATCH_SIZE", "1")
+    monkeypatch.setenv("SESSION_EMPTY_TTL_S", "3")
+    monkeypatch.setenv("SESSION_SWEEP_INTERVAL_S", "0.2")
+    asyncio.run(_restart_scenario(db_path))
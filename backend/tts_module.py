@@ -1,33 +1,218 @@
 """
 Text-to-Speech module for ConvoWeave.
 Uses gTTS for speech synthesis.
+- Rendered clips are cached on disk, keyed by hash(lang, text), with LRU eviction
+- The LRU and the TTS_CACHE_MAX_BYTES budget are per process: workers sharing
+  TTS_CACHE_DIR each count their own view of it, so the directory can grow to
+  roughly max bytes x workers
+- Synthesis runs per sentence in the background so playback can start early
+- Audio is served by id (see /audio/{audio_id} in main.py) instead of inline base64
 """
 
+import asyncio
+import hashlib
+import importlib.util
 import os
-from io import BytesIO
-import base64
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
 
-try:
-    from gtts import gTTS
-    TTS_AVAILABLE = True
-except ImportError:
+# gTTS (and its requests/bs4 stack) is imported on first synthesis
+TTS_AVAILABLE = importlib.util.find_spec("gtts") is not None
+if not TTS_AVAILABLE:
     print("⚠ gTTS not installed. TTS disabled.")
-    TTS_AVAILABLE = False
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "convoweave_tts"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+STREAM_CHUNK_BYTES = 32 * 1024
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+
+def audio_id_for(text: str, lang: str) -> str:
+    return hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def split_sentences(text: str, min_chars: int = 40) -> List[str]:
+    """Split on sentence boundaries, merging fragments too short to be worth a request."""
+    chunks: List[str] = []
+    for part in _SENTENCE_END.split(text.strip()):
+        if not part:
+            continue
+        if chunks and len(chunks[-1]) < min_chars:
+            chunks[-1] = f"{chunks[-1]} {part}"
+        else:
+            chunks.append(part)
+    return chunks
+
+
+def _process_alive(part_name: str) -> bool:
+    """Whether the process named in an '<audio_id>.<pid>.part' file is still running."""
+    try:
+        pid = int(part_name.split(".")[-2])
+    except (IndexError, ValueError):
+        return False  # pre-pid naming: always stale
+    if os.name == "nt":
+        return True  # no signal-0 probe on Windows (os.kill would send CTRL_C_EVENT); keep it
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+class TTSCache:
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # audio_id -> size, oldest first
+        self._pending: Dict[str, threading.Event] = {}
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # Seed LRU order from files left by a previous process; the directory
+        # may be shared, so only drop partial renders whose process is gone
+        existing = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".part"):
+                if not _process_alive(name):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            elif name.endswith(".mp3"):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # evicted by another process while listing
+                existing.append((st.st_mtime, name[:-4], st.st_size))
+        for _, audio_id, size in sorted(existing):
+            self._entries[audio_id] = size
+            self._total += size
+
+    def path(self, audio_id: str) -> str:
+        return os.path.join(self.directory, f"{audio_id}.mp3")
+
+    def _part_path(self, audio_id: str) -> str:
+        return os.path.join(self.directory, f"{audio_id}.{os.getpid()}.part")
+
+    def get(self, audio_id: str) -> Optional[str]:
+        """Path of a fully rendered clip, refreshing its LRU position."""
+        with self._lock:
+            if audio_id not in self._entries:
+                return None
+            self._entries.move_to_end(audio_id)
+        return self.path(audio_id)
+
+    def is_pending(self, audio_id: str) -> bool:
+        return audio_id in self._pending
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def render(self, text: str, lang: str = "en") -> str:
+        """Return the clip id, starting background synthesis if it is not cached."""
+        audio_id = audio_id_for(text, lang)
+        with self._lock:
+            if audio_id in self._entries:
+                self._entries.move_to_end(audio_id)
+                return audio_id
+            if audio_id in self._pending:
+                return audio_id
+            self._pending[audio_id] = threading.Event()
+        threading.Thread(target=self._render, args=(audio_id, text, lang), daemon=True).start()
+        return audio_id
+
+    def _render(self, audio_id: str, text: str, lang: str):
+        part = self._part_path(audio_id)
+        try:
+            from gtts import gTTS
+            with open(part, "wb") as fp:
+                # MP3 frames concatenate cleanly, so each sentence is appended
+                # and becomes streamable as soon as it is written.
+                for sentence in split_sentences(text):
+                    gTTS(text=sentence, lang=lang, slow=False).write_to_fp(fp)
+                    fp.flush()
+            size = os.path.getsize(part)
+            os.replace(part, self.path(audio_id))
+            with self._lock:
+                self._entries[audio_id] = size
+                self._total += size
+                self._evict_locked()
+        except Exception as e:
+            print(f"TTS error: {e}")
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                event = self._pending.pop(audio_id, None)
+            if event:
+                event.set()
+
+    def _evict_locked(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            audio_id, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self.path(audio_id))
+            except OSError:
+                pass
+
+    async def stream_pending(self, audio_id: str) -> AsyncIterator[bytes]:
+        """Yield a clip's bytes while it is still being synthesized."""
+        event = self._pending.get(audio_id)
+        try:
+            fp = open(self._part_path(audio_id), "rb")
+        except FileNotFoundError:
+            # Finished between the caller's check and now
+            path = self.get(audio_id)
+            if path is None:
+                return
+            fp = open(path, "rb")
+            event = None
+        with fp:
+            while True:
+                chunk = fp.read(STREAM_CHUNK_BYTES)
+                if chunk:
+                    yield chunk
+                elif event is None or event.is_set():
+                    rest = fp.read()
+                    if rest:
+                        yield rest
+                    return
+                else:
+                    await asyncio.sleep(0.05)
+
+
+tts_cache = TTSCache()
+
+
+def warm_up():
+    if TTS_AVAILABLE:
+        from gtts import gTTS  # noqa: F401
 
 
 def text_to_speech(text: str, lang: str = "en") -> dict:
     """
-    Convert text to speech and return as base64 audio.
-    
+    Render text to speech through the disk cache.
+
     Returns: {
-        "audio": "base64-encoded-audio",
+        "audio_id": cache id, served from /audio/{audio_id},
         "duration": seconds (approximate),
         "format": "mp3"
     }
     """
     if not TTS_AVAILABLE:
         return {
-            "audio": None,
+            "audio_id": None,
             "duration": 0,
             "format": "mp3",
             "error": "TTS not available",
@@ -36,30 +221,21 @@ def text_to_speech(text: str, lang: str = "en") -> dict:
     try:
         # Limit text length for API
         text = text[:500]
-        
-        # Generate speech
-        tts = gTTS(text=text, lang=lang, slow=False)
-        
-        # Convert to bytes
-        audio_bytes = BytesIO()
-        tts.write_to_fp(audio_bytes)
-        audio_bytes.seek(0)
-        
-        # Encode to base64
-        audio_b64 = base64.b64encode(audio_bytes.read()).decode("utf-8")
-        
+
+        audio_id = tts_cache.render(text, lang)
+
         # Approximate duration (rough estimate: ~150 words per minute = 2.5 chars/sec)
         duration = len(text) / 2.5
-        
+
         return {
-            "audio": f"data:audio/mp3;base64,{audio_b64}",
+            "audio_id": audio_id,
             "duration": duration,
             "format": "mp3",
         }
     except Exception as e:
         print(f"TTS error: {e}")
         return {
-            "audio": None,
+            "audio_id": None,
             "duration": 0,
             "format": "mp3",
             "error": str(e),
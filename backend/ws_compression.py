@@ -0,0 +1,208 @@
+"""
+WebSocket compression for /ws.
+- permessage-deflate (RFC 7692), negotiated in the handshake as usual, with a
+  tunable zlib level / memLevel / window and a size threshold: messages under
+  WS_COMPRESS_MIN_BYTES go out uncompressed (RSV1 clear), as do binary
+  frames, which only ever carry zstd payloads
+- Installed through uvicorn's WebSocket protocol in ws_protocol.py, which only
+  the serve entrypoints import (the dispatcher and bench.serve do this):
+    uvicorn main:app --ws ws_protocol:DeflateWebSocketProtocol
+  Without it the WS_DEFLATE_* settings are ignored; startup warns if they are set
+- Optional zstd mode (needs `zstandard`, imported on first use): sockets connecting with
+  ?compress=zstd get messages over the threshold as binary zstd frames
+  compressed with a dictionary trained on our message schema, served at
+  GET /ws/zstd-dictionary. Set WS_ZSTD_DICT_PATH to pin a dictionary
+  (e.g. `zstd --train` on captured traffic) so every worker shares one.
+"""
+
+import importlib.util
+import json
+import os
+import random
+import sys
+import threading
+from typing import List, Optional, Union
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import BINARY, TEXT, Frame
+
+# zstandard is imported when a dictionary is first trained or loaded
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+
+DEFLATE_ENABLED = os.getenv("WS_DEFLATE", "1") == "1"
+DEFLATE_LEVEL = int(os.getenv("WS_DEFLATE_LEVEL", "6"))
+DEFLATE_MEM_LEVEL = int(os.getenv("WS_DEFLATE_MEM_LEVEL", "8"))
+DEFLATE_WINDOW_BITS = int(os.getenv("WS_DEFLATE_WINDOW_BITS", "15"))
+MIN_BYTES = int(os.getenv("WS_COMPRESS_MIN_BYTES", "128"))
+DEFLATE_ENV = ("WS_DEFLATE", "WS_DEFLATE_LEVEL", "WS_DEFLATE_MEM_LEVEL", "WS_DEFLATE_WINDOW_BITS")
+
+ZSTD_LEVEL = int(os.getenv("WS_ZSTD_LEVEL", "3"))
+ZSTD_DICT_PATH = os.getenv("WS_ZSTD_DICT_PATH")
+ZSTD_DICT_SIZE = 16 * 1024
+
+
+# ----------------------------
+# permessage-deflate
+# ----------------------------
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate that leaves small text messages and binary messages uncompressed."""
+
+    def __init__(self, *args, min_bytes: int = MIN_BYTES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_bytes = min_bytes
+
+    def encode(self, frame: Frame) -> Frame:
+        # Only whole single-frame messages may skip compression
+        if frame.fin and (frame.opcode is BINARY or (frame.opcode is TEXT and len(frame.data) < self.min_bytes)):
+            return frame
+        return super().encode(frame)
+
+
+class ServerThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, min_bytes: int = MIN_BYTES, **kwargs):
+        super().__init__(**kwargs)
+        self.min_bytes = min_bytes
+
+    def process_request_params(self, params, accepted_extensions):
+        response, ext = super().process_request_params(params, accepted_extensions)
+        return response, ThresholdPerMessageDeflate(
+            ext.remote_no_context_takeover,
+            ext.local_no_context_takeover,
+            ext.remote_max_window_bits,
+            ext.local_max_window_bits,
+            ext.compress_settings,
+            min_bytes=self.min_bytes,
+        )
+
+
+def deflate_factory(
+    level: int = DEFLATE_LEVEL,
+    mem_level: int = DEFLATE_MEM_LEVEL,
+    window_bits: int = DEFLATE_WINDOW_BITS,
+    min_bytes: int = MIN_BYTES,
+) -> ServerThresholdDeflateFactory:
+    return ServerThresholdDeflateFactory(
+        min_bytes=min_bytes,
+        server_max_window_bits=window_bits if window_bits < 15 else None,
+        compress_settings={"level": level, "memLevel": mem_level},
+    )
+
+
+def ignored_deflate_settings() -> List[str]:
+    """Deflate env vars that are set while uvicorn runs its stock protocol (ws_protocol was never loaded)."""
+    if "ws_protocol" in sys.modules:
+        return []
+    return [name for name in DEFLATE_ENV + ("WS_COMPRESS_MIN_BYTES",) if name in os.environ]
+
+
+# ----------------------------
+# zstd with a shared dictionary
+# ----------------------------
+
+def schema_samples(n: int = 4000, seed: int = 0) -> List[bytes]:
+    """Synthetic broadcasts shaped like ours, encoded the way main.py encodes them."""
+    rng = random.Random(seed)
+    names = ["Guest", "Host", "Alex", "Sam", "Jordan", "Priya", "Wei", "Maria", "Tom", "Aisha"]
+    notes = ["High confusion detected", "Participants look stressed", "Strong engagement", "Session steady"]
+    tones = ["calm", "excited", "neutral", "tense"]
+    words = "the we should plan next sprint budget review launch looks good any questions agreed thanks".split()
+    samples = []
+    for version in range(1, n + 1):
+        pid = "%08x-%04x-4%03x-%04x-%012x" % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(12),
+                                              rng.getrandbits(16), rng.getrandbits(48))
+        name = rng.choice(names)
+        now = 1.7e9 + rng.random() * 1e8
+        summary = {
+            "participants": rng.randint(1, 50),
+            "engagement": round(rng.random(), 3),
+            "confusion": round(rng.random(), 3),
+            "stress": round(rng.random(), 3),
+            "note": rng.choice(notes),
+            "updated_at": now,
+        }
+        kind = rng.random()
+        if kind < 0.6:
+            payload = {"participant_id": pid, "display_name": name, "summary": summary}
+            if rng.random() < 0.5:
+                payload["signal"] = {
+                    "engagement": rng.random(), "confusion": rng.random(), "stress": rng.random(),
+                    "tone": rng.choice(tones + [None]), "energy": rng.choice([None, rng.random()]),
+                    "sentiment": rng.choice([None, rng.random()]), "timestamp": now,
+                }
+            message = {"type": "session_update", "payload": payload}
+        elif kind < 0.85:
+            message = {"type": "chat", "payload": {
+                "participant_id": pid, "message": " ".join(rng.choices(words, k=rng.randint(2, 12))),
+                "timestamp": now, "sentiment": round(rng.random(), 3), "emotion": "neutral",
+                "confidence": round(rng.random(), 3),
+            }}
+        elif kind < 0.95:
+            message = {"type": "transcript", "payload": {
+                "participant_id": pid, "display_name": name, "timestamp": now,
+                "text": " ".join(rng.choices(words, k=rng.randint(5, 30))), "tone": rng.choice(tones),
+                "energy": round(rng.random(), 3), "stress_level": round(rng.random(), 3),
+            }}
+        else:
+            message = {"type": rng.choice(["participant_joined", "participant_left"]),
+                       "payload": {"participant_id": pid, "display_name": name}}
+        samples.append(json.dumps({**message, "version": version}).encode("utf-8"))
+    return samples
+
+
+def train_dictionary(samples: List[bytes], size: int = ZSTD_DICT_SIZE) -> bytes:
+    import zstandard
+    return zstandard.train_dictionary(size, samples).as_bytes()
+
+
+class ZstdCodec:
+    """Per-process zstd encoder; the dictionary is loaded or trained on first use."""
+
+    def __init__(self, level: int = ZSTD_LEVEL, min_bytes: int = MIN_BYTES, dict_path: Optional[str] = ZSTD_DICT_PATH):
+        self.enabled = ZSTD_AVAILABLE
+        self.level = level
+        self.min_bytes = min_bytes
+        self.dict_path = dict_path
+        self.dictionary: Optional[bytes] = None
+        self.dict_id = 0
+        self._compressor = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._compressor is not None or not self.enabled:
+            return
+        with self._lock:
+            if self._compressor is not None:
+                return
+            import zstandard
+            if self.dict_path:
+                with open(self.dict_path, "rb") as fp:
+                    data = fp.read()
+            else:
+                data = train_dictionary(schema_samples())
+            zdict = zstandard.ZstdCompressionDict(data)
+            self.dictionary = data
+            self.dict_id = zdict.dict_id()
+            self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=zdict, write_checksum=False)
+            print(f"✓ zstd dictionary {self.dict_id} ready ({len(data)} bytes)")
+
+    @property
+    def loaded(self) -> bool:
+        return self._compressor is not None
+
+    def encode(self, text: str) -> Union[str, bytes]:
+        """zstd bytes for a binary frame, or the text itself when under the threshold."""
+        data = text.encode("utf-8")
+        if len(data) < self.min_bytes:
+            return text
+        return self._compressor.compress(data)
+
+    def describe(self) -> dict:
+        return {"mode": "zstd", "dictionary_id": self.dict_id, "min_bytes": self.min_bytes}
+
+
+zstd_codec = ZstdCodec()
+
+
+def warm_up():
+    zstd_codec.load()
@@ -0,0 +1,20 @@
+"""
+uvicorn WebSocket protocol with ConvoWeave's tuned permessage-deflate.
+- Builds on uvicorn's private websockets-sansio implementation, so only the
+  serve entrypoints import it (requirements.txt pins the uvicorn range):
+    uvicorn main:app --ws ws_protocol:DeflateWebSocketProtocol
+- Settings and the small-message threshold live in ws_compression.py
+"""
+
+from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+
+from ws_compression import DEFLATE_ENABLED, deflate_factory
+
+
+class DeflateWebSocketProtocol(WebSocketsSansIOProtocol):
+    """uvicorn's websockets protocol, with the tuned permessage-deflate from ws_compression."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        enabled = DEFLATE_ENABLED and self.config.ws_per_message_deflate
+        self.conn.available_extensions = [deflate_factory()] if enabled else []
@@ -151,6 +151,10 @@ export default function App() {
         socket.onmessage = (event) => {
           try {
             const msg = JSON.parse(event.data);
+            if (msg.type === "ping") {
+              socket.send(JSON.stringify({ type: "pong", payload: msg.payload || {} }));
+              return;
+            }
             if (msg.type === "session_init") {
               const mapping = msg.payload?.participants || {};
               Object.entries(mapping).forEach(([pid, name]) => registerParticipant(pid, name));
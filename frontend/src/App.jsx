@@ -125,7 +125,8 @@ export default function App() {
       ctx.drawImage(videoRef.current, 0, 0, canvas.width, canvas.height);
       const frameData = canvas.toDataURL("image/jpeg", 0.8);
 
-      const res = await fetch(`${BACKEND_URL}/api/analyze-frame`, {
+      const query = new URLSearchParams({ participant_id: participantId, session_id: sessionId });
+      const res = await fetch(`${BACKEND_URL}/api/analyze-frame?${query}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ frame: frameData, participant_id: participantId }),
@@ -157,7 +158,7 @@ export default function App() {
     } catch (err) {
       console.error("Frame analysis error:", err);
     }
-  }, [participantId]);
+  }, [participantId, sessionId]);
 
   // Auto-analyze frames when media is running
   useEffect(() => {
@@ -198,6 +199,10 @@ export default function App() {
         };
         socket.onmessage = (event) => {
           const msg = JSON.parse(event.data);
+          if (msg.type === "ping") {
+            socket.send(JSON.stringify({ type: "pong", payload: msg.payload || {} }));
+            return;
+          }
           console.log("WebSocket message:", msg);
           if (msg.type === "session_init") {
             const mapping = msg.payload?.participants || {};